@@ -1 +1,9 @@
-from .agent import root_agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # ADK loads root_agent from here; importing the agent is deferred until it is asked for
+    if name in ("agent", "root_agent"):
+        agent = importlib.import_module(".agent", __name__)
+        return agent if name == "agent" else agent.root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
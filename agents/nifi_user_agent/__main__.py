@@ -1,18 +1,34 @@
 """
 Main entry point for the NiFi A2A Agent Server using a2a-python framework.
 Run with: python -m agents.nifi_user_agent
+
+The agent card is served as soon as the server listens; the agent itself is imported and
+built in the background (see startup.py).
 """
 
+import time
+
+# Start of the startup timings reported at /startup
+STARTED = time.perf_counter()
+
+import functools
+import importlib
 import logging
+import sys
 import uvicorn
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
 
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
 
-from .agent_executor import create_nifi_agent_executor
+from . import config
+from .admission import admission
+from .prompt_builder import prompt_stats
+from .startup import DeferredApp, Startup
+from .metrics import registry
+from .tracing import tracer
 
 # Load environment variables
 load_dotenv()
@@ -23,39 +39,238 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-agent_url = "http://localhost:9999/"
+agent_url = config.A2A_PUBLIC_URL
+startup = Startup(STARTED)
+# Created by warm_up() together with the A2A app
+task_store = None
+push_dispatcher = None
 
 
 def main():
     try:
-        # Create agent card with capabilities
-        agent_card = get_agent_card()
-        
-        # Set up request handler with in-memory task store
-        request_handler = DefaultRequestHandler(
-            agent_executor=create_nifi_agent_executor(),
-            task_store=InMemoryTaskStore(),
-        )
-
-        # Create and configure the A2A server
-        server = A2AStarletteApplication(
-            agent_card=agent_card,
-            http_handler=request_handler
-        )
-
         # Start the server
-        logger.info("Starting NiFi A2A Agent Server on %s", agent_url)
-        uvicorn.run(
-            server.build(),
-            host=agent_url.split(':')[1].strip('/'),
-            port=agent_url.split(':')[-1],
-            log_level='info'
-        )
+        logger.info("Starting NiFi A2A Agent Server on %s with %d worker(s)", agent_url, config.A2A_WORKERS)
+        if config.A2A_WORKERS > 1:
+            if config.TASK_STORE == 'memory':
+                logger.warning("TASK_STORE=memory is not shared between workers; tasks/get and "
+                               "tasks/resubscribe only work on the worker that ran the task")
+            if config.PUSH_NOTIFICATIONS_ENABLED:
+                logger.warning("Push notification configs are kept by the worker that receives them; set the webhook "
+                               "in the message/send that starts a task, since tasks/pushNotificationConfig/set "
+                               "and /get may reach another worker")
+            # Each worker process imports this module and builds its own app, pool and task store
+            uvicorn.run(
+                'agents.nifi_user_agent.__main__:create_app',
+                factory=True,
+                workers=config.A2A_WORKERS,
+                host=config.A2A_HOST,
+                port=config.A2A_PORT,
+                log_level='info'
+            )
+        else:
+            uvicorn.run(
+                create_app(),
+                host=config.A2A_HOST,
+                port=config.A2A_PORT,
+                log_level='info'
+            )
 
     except Exception as e:
         logger.error(f"Failed to start NiFi A2A Agent Server: {e}")
         raise 
 
+
+def create_app():
+    """Build the Starlette app for one server process.
+
+    The agent card, /startup and the stats routes are served right away; every other request,
+    including the A2A JSON-RPC endpoint, goes to the A2A app once warm_up() has built it.
+    """
+    agent_card = get_agent_card().model_dump(mode='json', exclude_none=True)
+
+    async def agent_card_route(request):
+        return JSONResponse(agent_card)
+
+    app = Starlette(lifespan=lifespan)
+    app.add_route('/.well-known/agent.json', agent_card_route, methods=['GET'])
+    app.add_route('/startup', startup_report, methods=['GET'])
+    app.add_route('/mcp/pool', mcp_pool_stats, methods=['GET'])
+    app.add_route('/mcp/cache', tool_cache_stats, methods=['GET'])
+    app.add_route('/mcp/coalescing', single_flight_stats, methods=['GET'])
+    app.add_route('/mcp/projection', projection_stats, methods=['GET'])
+    app.add_route('/flow/index', flow_index_stats, methods=['GET'])
+    app.add_route('/prompt/stats', prompt_token_stats, methods=['GET'])
+    app.add_route('/memory', memory_stats, methods=['GET'])
+    app.add_route('/models', model_route_stats, methods=['GET'])
+    app.add_route('/responses/cache', response_cache_stats, methods=['GET'])
+    app.add_route('/admission', admission_stats, methods=['GET'])
+    app.add_route('/push', push_notification_stats, methods=['GET'])
+    app.add_route('/metrics', prometheus_metrics, methods=['GET'])
+    app.add_route('/traces', recent_traces, methods=['GET'])
+    # Requests no route above matches; routes added later (e.g. by the benchmark) still take precedence
+    app.router.default = DeferredApp(startup, warm_up)
+    return app
+
+
+@asynccontextmanager
+async def lifespan(app):
+    startup.mark("app_started")
+    if config.STARTUP_PREWARM:
+        startup.start(warm_up)
+    try:
+        yield
+    finally:
+        await startup.stop()
+        agent = sys.modules.get(f"{__package__}.agent")
+        if agent is not None:
+            if startup.ready and config.RESPONSE_CACHE_PATH:
+                agent.response_cache.save(config.RESPONSE_CACHE_PATH)
+            await agent.mcp_pool.close()
+        if push_dispatcher is not None:
+            await push_dispatcher.close()
+        if task_store is not None:
+            from .task_store import SqliteTaskStore
+            if isinstance(task_store, SqliteTaskStore):
+                await task_store.close()
+
+
+async def warm_up(startup):
+    """Import the agent and the A2A server on a worker thread, then build the A2A app and open the warm MCP sessions."""
+    global task_store, push_dispatcher
+    await startup.import_in_background()
+    from a2a.server.apps import A2AStarletteApplication
+    from .agent import mcp_pool, response_cache
+    from .agent_executor import create_nifi_agent_executor
+    from .push_notifications import NotifyingTaskStore, PushDispatcher
+    from .request_handler import ClientCallContextBuilder, NiFiRequestHandler
+    from .streaming import BoundedQueueManager
+    from .task_store import SqliteTaskStore, create_task_store
+
+    task_store = create_task_store()
+    if isinstance(task_store, SqliteTaskStore):
+        await task_store.start()
+    handler_store = task_store
+    if config.PUSH_NOTIFICATIONS_ENABLED:
+        push_dispatcher = PushDispatcher(
+            queue_size=config.PUSH_QUEUE_SIZE,
+            batch_size=config.PUSH_BATCH_SIZE,
+            max_retries=config.PUSH_MAX_RETRIES,
+            retry_delay=config.PUSH_RETRY_DELAY,
+            timeout=config.PUSH_TIMEOUT,
+        )
+        await push_dispatcher.start()
+        # Every saved task state goes through the dispatcher, whichever A2A method changed it
+        handler_store = NotifyingTaskStore(task_store, push_dispatcher)
+
+    # Set up request handler with the configured task store
+    request_handler = NiFiRequestHandler(
+        agent_executor=create_nifi_agent_executor(),
+        task_store=handler_store,
+        queue_manager=BoundedQueueManager(config.STREAM_QUEUE_SIZE),
+        push_notifier=push_dispatcher,
+    )
+    server = A2AStarletteApplication(
+        agent_card=get_agent_card(),
+        http_handler=request_handler,
+        context_builder=ClientCallContextBuilder(),
+    )
+    if config.RESPONSE_CACHE_PATH:
+        response_cache.load(config.RESPONSE_CACHE_PATH)
+    await mcp_pool.start()
+    startup.app = server.build()
+
+
+def requires_agent(handler):
+    """Route answering 503 until the agent is built, then calling handler(request, agent module)."""
+    @functools.wraps(handler)
+    async def route(request):
+        if not startup.ready:
+            return JSONResponse(startup.report(), status_code=503)
+        return await handler(request, importlib.import_module(".agent", __package__))
+    return route
+
+
+async def startup_report(request):
+    """Startup phase and import timings; 503 until the agent is ready, so it can serve as a readiness probe."""
+    return JSONResponse(startup.report(), status_code=200 if startup.ready else 503)
+
+
+@requires_agent
+async def mcp_pool_stats(request, agent):
+    """Pool hit/miss and handshake counters, used to size the MCP session pool."""
+    return JSONResponse(agent.mcp_pool.stats())
+
+
+@requires_agent
+async def tool_cache_stats(request, agent):
+    """Hit ratio, evictions and invalidations of the inspection tool cache."""
+    return JSONResponse(agent.tool_cache.stats())
+
+
+@requires_agent
+async def single_flight_stats(request, agent):
+    """Share of read-only MCP calls that joined an identical call already in flight."""
+    return JSONResponse(agent.single_flight.stats())
+
+
+@requires_agent
+async def projection_stats(request, agent):
+    """Tool results projected for the model, characters saved and payloads kept by handle."""
+    return JSONResponse(agent.projecting_client.stats())
+
+
+@requires_agent
+async def flow_index_stats(request, agent):
+    """Size of the local flow index and the age of its last full sync."""
+    return JSONResponse(agent.flow_index.stats())
+
+
+async def prompt_token_stats(request):
+    """Token cost per prompt section and per-request prompt sizes by intent."""
+    return JSONResponse(prompt_stats.stats())
+
+
+@requires_agent
+async def memory_stats(request, agent):
+    """History size per model call before and after compaction, by A2A context."""
+    return JSONResponse(agent.conversation_memory.stats())
+
+
+@requires_agent
+async def model_route_stats(request, agent):
+    """Calls, failovers, hedges, latency percentiles, tokens and cost per model tier and model."""
+    return JSONResponse(agent.route_stats.stats())
+
+
+async def admission_stats(request):
+    """Running and queued tasks, per-client counts and rejections."""
+    return JSONResponse(admission.stats())
+
+
+@requires_agent
+async def push_notification_stats(request, agent):
+    """Webhook registrations, queued notifications, deliveries, retries and drops."""
+    if push_dispatcher is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse(push_dispatcher.stats())
+
+
+@requires_agent
+async def response_cache_stats(request, agent):
+    """Hit ratio, size and evictions of the semantic response cache."""
+    return JSONResponse(agent.response_cache.stats())
+
+
+async def prometheus_metrics(request):
+    """Task, LLM and MCP latency histograms and in-flight gauges in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+
+async def recent_traces(request):
+    """Span trees of the most recent sampled tasks (TRACE_SAMPLE_RATE)."""
+    return JSONResponse(tracer.recent())
+
+
 def get_agent_card():
     """
     Field Name	Type	        Required	Description
@@ -94,7 +309,7 @@ def get_agent_capabilities():
     """
     return AgentCapabilities(
         streaming=True,
-        pushNotifications=False,
+        pushNotifications=config.PUSH_NOTIFICATIONS_ENABLED,
         stateTransitionHistory=False
     )
 
@@ -0,0 +1,168 @@
+"""
+Admission control for A2A tasks and concurrency limits for LLM and MCP calls.
+
+AdmissionController caps running tasks globally and per client. Tasks over the cap
+wait in a bounded priority queue, so short INFORMATION_ONLY/DISCOVERY requests are
+admitted before long constructions. When the queue is full, or a task waits longer than
+the queue timeout, the task is rejected immediately instead of piling up. MCP tool calls
+(ConcurrencyLimitedClient here) and model calls (ConcurrencyLimitedLlm in models.py) have
+their own limits on top of this.
+"""
+
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from . import config, metrics
+from .prompt import DISCOVERY, FLOW_CONSTRUCTION, FLOW_INSPECTION, FLOW_MANAGEMENT, INFORMATION_ONLY
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first; unclassified requests sit in the middle
+INTENT_PRIORITIES = {
+    INFORMATION_ONLY: 0,
+    DISCOVERY: 0,
+    FLOW_INSPECTION: 1,
+    FLOW_MANAGEMENT: 1,
+    FLOW_CONSTRUCTION: 2,
+}
+DEFAULT_PRIORITY = 1
+
+
+class Overloaded(Exception):
+    """The task was not admitted; the client should retry later."""
+
+
+class AdmissionController:
+    """Global and per-client task limits with a bounded priority queue."""
+
+    def __init__(self, max_concurrent=16, max_per_client=4, max_queue=64, queue_timeout=30.0):
+        self.max_concurrent = max_concurrent
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._running = 0
+        self._per_client = Counter()
+        # Sorted (priority, sequence, client_id, future); clients at their cap are skipped, not blocking others
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._admitted = 0
+        self._rejected = Counter()
+
+    def _can_run(self, client_id):
+        return self._running < self.max_concurrent and self._per_client[client_id] < self.max_per_client
+
+    def _start(self, client_id):
+        self._running += 1
+        self._per_client[client_id] += 1
+        self._admitted += 1
+
+    def _reject(self, reason, message):
+        self._rejected[reason] += 1
+        metrics.admission_rejections.inc(reason=reason)
+        raise Overloaded(message)
+
+    async def acquire(self, client_id, priority=DEFAULT_PRIORITY):
+        """Wait for a slot for one task of `client_id`; raises Overloaded when it cannot be admitted."""
+        start = time.perf_counter()
+        if self._can_run(client_id):
+            self._start(client_id)
+            metrics.admission_wait.observe(0.0, priority=priority)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full", f"server busy: {self._running} tasks running and {len(self._waiters)} queued")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._sequence), client_id, future)
+        bisect.insort(self._waiters, waiter)
+        metrics.admission_queued.set(len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up; hand the slot on
+                self.release(client_id)
+            else:
+                future.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("queue_timeout", f"server busy: not admitted within {self.queue_timeout:g}s")
+        metrics.admission_wait.observe(time.perf_counter() - start, priority=priority)
+
+    def release(self, client_id):
+        self._running -= 1
+        self._per_client[client_id] -= 1
+        if self._per_client[client_id] <= 0:
+            del self._per_client[client_id]
+        self._wake()
+
+    def _wake(self):
+        # Admit queued tasks in priority order, skipping clients that are at their own cap
+        index = 0
+        while index < len(self._waiters) and self._running < self.max_concurrent:
+            _, _, client_id, future = self._waiters[index]
+            if future.done():
+                self._waiters.pop(index)
+                continue
+            if self._per_client[client_id] >= self.max_per_client:
+                index += 1
+                continue
+            self._waiters.pop(index)
+            self._start(client_id)
+            future.set_result(None)
+        metrics.admission_queued.set(len(self._waiters))
+
+    def _remove(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        metrics.admission_queued.set(len(self._waiters))
+
+    @asynccontextmanager
+    async def slot(self, client_id, priority=DEFAULT_PRIORITY):
+        await self.acquire(client_id, priority)
+        try:
+            yield
+        finally:
+            self.release(client_id)
+
+    def stats(self):
+        return {
+            "running": self._running,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_per_client": self.max_per_client,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": dict(self._rejected),
+            "clients": dict(self._per_client),
+        }
+
+
+class ConcurrencyLimitedClient:
+    """Caps concurrent tool calls through the wrapped MCP client."""
+
+    def __init__(self, client, max_concurrent):
+        self._client = client
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def call_tool(self, name, arguments):
+        async with self._semaphore:
+            return await self._client.call_tool(name, arguments)
+
+    async def list_tools(self):
+        return await self._client.list_tools()
+
+
+admission = AdmissionController(
+    max_concurrent=config.ADMISSION_MAX_CONCURRENT_TASKS,
+    max_per_client=config.ADMISSION_MAX_TASKS_PER_CLIENT,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+)
@@ -1,29 +1,163 @@
 from google.adk.agents import Agent, LlmAgent
 from dotenv import load_dotenv
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, SseServerParams
-from contextlib import AsyncExitStack
 from .prompt import agent_prompt
-from google.adk.models.lite_llm import LiteLlm
+from . import config
+from .mcp_pool import McpSessionPool, PooledMCPToolset
+from .mcp_router import McpEndpointRouter, create_instances_tool, parse_endpoints
+from .tool_cache import ToolResultCache
+from .single_flight import SingleFlightClient
+from .projection import PayloadStore, ProjectingClient, create_fetch_tool
+from .response_cache import SemanticResponseCache, create_embedder
+from .flow_plan import create_flow_plan_tool
+from .flow_inspection import FlowInspector, create_flow_inspection_tool
+from .flow_index import FlowIndex, IndexingClient, create_flow_index_tools
+from .teardown import create_teardown_tool
+from .prompt_builder import instruction_provider, record_prompt_tokens, record_prompt_usage
+from .models import StreamingLiteLlm, limit_llm_calls
+from .memory import compact_history, conversation_memory
+from .model_router import create_model_router, route_by_intent, route_stats
+from .tracing import TracedClient, trace_llm_end, trace_llm_start
+from .admission import ConcurrencyLimitedClient
 import logging
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
-def create_mcp_toolset():
-    """Create the MCP toolset instance."""
-    return MCPToolset(
-        connection_params=SseServerParams(url="http://127.0.0.1:8050/sse")
+def _create_pool(url):
+    return McpSessionPool(
+        url=url,
+        min_size=config.MCP_POOL_MIN_SIZE,
+        max_size=config.MCP_POOL_MAX_SIZE,
+        connect_timeout=config.MCP_POOL_CONNECT_TIMEOUT,
+        health_check_interval=config.MCP_POOL_HEALTH_CHECK_INTERVAL,
+    )
+
+
+# Shared pool of warm MCP sessions, started by the A2A server on startup; with several
+# endpoints, a router over one pool per endpoint
+_endpoints = parse_endpoints(config.NIFI_MCP_ENDPOINTS)
+if len(_endpoints) > 1:
+    mcp_pool = McpEndpointRouter(
+        _endpoints,
+        _create_pool,
+        max_failures=config.MCP_ENDPOINT_MAX_FAILURES,
+        slow_after=config.MCP_ENDPOINT_SLOW_AFTER,
+        eject_seconds=config.MCP_ENDPOINT_EJECT_SECONDS,
+        health_check_interval=config.MCP_POOL_HEALTH_CHECK_INTERVAL,
     )
+else:
+    mcp_pool = _create_pool(_endpoints[0][1] if _endpoints else config.NIFI_MCP_URL)
+
+# At most MCP_MAX_CONCURRENT_CALLS tool calls reach NiFi at once; cache hits skip the limit
+limited_pool = ConcurrencyLimitedClient(mcp_pool, config.MCP_MAX_CONCURRENT_CALLS)
+
+# Concurrent identical reads (including simultaneous cache misses) share one call
+single_flight = SingleFlightClient(limited_pool)
+_reads = single_flight if config.MCP_SINGLE_FLIGHT_ENABLED else limited_pool
+
+# Cached inspection results shared by every task, invalidated by create_*/delete_* calls
+tool_cache = ToolResultCache(_reads, max_entries=config.TOOL_CACHE_MAX_ENTRIES)
+
+# Local graph of the flow, updated from every tool result
+flow_index = FlowIndex(max_age=config.FLOW_INDEX_MAX_AGE)
+
+# Client used by every tool that talks to NiFi
+_client = tool_cache if config.TOOL_CACHE_ENABLED else _reads
+if config.FLOW_INDEX_ENABLED:
+    _client = IndexingClient(_client, flow_index)
+mcp_client = TracedClient(_client)
+
+# Full payloads of projected results, read by fetch_tool_result
+payload_store = PayloadStore(max_entries=config.PROJECTION_STORE_MAX_ENTRIES)
+# Client of the MCP tools the model calls directly; local tools keep using the full results of mcp_client
+projecting_client = ProjectingClient(
+    mcp_client, payload_store, min_chars=config.PROJECTION_MIN_CHARS, page_size=config.PROJECTION_PAGE_SIZE)
+_model_client = projecting_client if config.PROJECTION_ENABLED else mcp_client
+
+
+def create_mcp_toolset():
+    """Create the MCP toolset instance backed by the shared session pool."""
+    return PooledMCPToolset(pool=mcp_pool, client=_model_client)
+
+
+def create_fetch_tools():
+    """fetch_tool_result, for the fields and items a projection leaves out."""
+    if not config.PROJECTION_ENABLED:
+        return []
+    return [create_fetch_tool(payload_store, page_size=config.PROJECTION_PAGE_SIZE)]
+
+
+def create_fast_path_tools():
+    """Only the discovery tools; the fast path never inspects or changes the flow."""
+    return [PooledMCPToolset(pool=mcp_pool, client=_model_client, tool_filter=["get_processor_types"]),
+            *create_fetch_tools()]
+
+
+def create_agent_tools():
+    """MCP toolset plus the local tools built on top of it."""
+    tools = [create_mcp_toolset(), *create_fetch_tools()]  # Pass the toolset instance, not the tools
+    if config.PLAN_EXECUTION_ENABLED:
+        tools.append(create_flow_plan_tool(mcp_client, max_concurrency=config.PLAN_MAX_CONCURRENCY,
+                                           auto_layout=config.PLAN_AUTO_LAYOUT))
+    if config.TEARDOWN_ENABLED:
+        tools.append(create_teardown_tool(
+            mcp_client, flow_index if config.FLOW_INDEX_ENABLED else None,
+            max_concurrency=config.TEARDOWN_MAX_CONCURRENCY, max_retries=config.TEARDOWN_MAX_RETRIES,
+            max_groups=config.INSPECTION_MAX_GROUPS))
+    if isinstance(mcp_pool, McpEndpointRouter) and len(mcp_pool.instances) > 1:
+        tools.append(create_instances_tool(mcp_pool))
+    if config.FLOW_INSPECTION_ENABLED:
+        tools.append(create_flow_inspection_tool(
+            mcp_client, max_concurrency=config.INSPECTION_MAX_CONCURRENCY, max_groups=config.INSPECTION_MAX_GROUPS))
+    if config.FLOW_INDEX_ENABLED:
+        inspector = FlowInspector(mcp_client, max_concurrency=config.INSPECTION_MAX_CONCURRENCY,
+                                  max_groups=config.INSPECTION_MAX_GROUPS)
+        tools.extend(create_flow_index_tools(flow_index, inspector))
+    return tools
+
+
+# Run before the prompt accounting, so it sees the history that is actually sent
+_model_callbacks = [compact_history] if config.MEMORY_ENABLED else []
+
+# Both agents share one router that picks the model tier per intent and step
+if config.MODEL_ROUTING_ENABLED:
+    model_router = create_model_router(lambda name: StreamingLiteLlm(model=name))
+    _model = _fast_model = limit_llm_calls(model_router)
+    _model_callbacks.append(route_by_intent)
+else:
+    _model = limit_llm_calls(StreamingLiteLlm(model="openai/gpt-4o-mini"))
+    _fast_model = limit_llm_calls(StreamingLiteLlm(model=config.FAST_PATH_MODEL))
 
 
 # Create the NiFi agent with MCP toolset
 root_agent = Agent(
     name="nifi_pipeline_creator_agent",
     description="A NiFi pipeline creator agent with MCP tool integration",
-    model=LiteLlm(model="openai/gpt-4o-mini"),
-    instruction=agent_prompt,
-    tools=[
-        create_mcp_toolset()  # Pass the toolset instance, not the tools
-    ],
-)
\ No newline at end of file
+    model=_model,
+    instruction=instruction_provider if config.PROMPT_COMPACTION_ENABLED else agent_prompt,
+    tools=create_agent_tools(),
+    before_model_callback=[*_model_callbacks, record_prompt_tokens, trace_llm_start],
+    after_model_callback=[record_prompt_usage, trace_llm_end],
+)
+
+
+# Lighter agent for INFORMATION_ONLY and DISCOVERY requests classified before the model call
+fast_agent = Agent(
+    name="nifi_fast_path_agent",
+    description="Answers NiFi questions and processor discovery requests",
+    model=_fast_model,
+    instruction=instruction_provider if config.PROMPT_COMPACTION_ENABLED else agent_prompt,
+    tools=create_fast_path_tools(),
+    before_model_callback=[*_model_callbacks, record_prompt_tokens, trace_llm_start],
+    after_model_callback=[record_prompt_usage, trace_llm_end],
+)
+
+# Answers to INFORMATION_ONLY and DISCOVERY requests, invalidated when the prompt or a model changes
+response_cache = SemanticResponseCache(
+    create_embedder(config.RESPONSE_CACHE_EMBEDDING_MODEL),
+    version=agent_prompt + root_agent.model.model + fast_agent.model.model,
+    threshold=config.RESPONSE_CACHE_THRESHOLD,
+    max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=config.RESPONSE_CACHE_TTL,
+)
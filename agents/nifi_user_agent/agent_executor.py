@@ -0,0 +1,198 @@
+"""
+A2A executor that runs the NiFi ADK agent for each incoming message.
+
+Every request is labelled by the local intent classifier before the agent runs. The
+intent is stored in session state, so the prompt builder only sends the sections for
+that intent. INFORMATION_ONLY and DISCOVERY requests go to the lighter fast-path agent,
+and flow requests warm the tool cache with the root process group ID while the model
+is still generating its first turn. Repeated fast-path questions are answered from the
+semantic response cache without calling the model. Model tokens and tool progress are
+published to the task's event queue as they happen (see streaming.py). Tasks wait for
+admission (see admission.py) after classification, so short fast-path requests are
+admitted first, and are rejected as busy when the server is overloaded.
+"""
+
+import asyncio
+import logging
+import uuid
+from contextlib import nullcontext
+
+from a2a.server.agent_execution import AgentExecutor, RequestContext
+from a2a.server.events import EventQueue
+from a2a.server.tasks import TaskUpdater
+from a2a.types import Part, TextPart, UnsupportedOperationError
+from a2a.utils.errors import ServerError
+from a2a.utils.task import new_task
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from . import config
+from .admission import DEFAULT_PRIORITY, INTENT_PRIORITIES, Overloaded, admission
+from .agent import fast_agent, mcp_client, response_cache, root_agent
+from .intent_classifier import IntentClassifier
+from .memory import CONTEXT_ID_STATE_KEY
+from .prompt import DISCOVERY, FLOW_INTENTS, INFORMATION_ONLY
+from .prompt_builder import INTENT_STATE_KEY
+from .streaming import TaskEventStream
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "nifi_user_agent"
+USER_ID = "a2a_client"
+
+# Intents answered by the fast-path agent
+FAST_PATH_INTENTS = (INFORMATION_ONLY, DISCOVERY)
+
+
+class NiFiAgentExecutor(AgentExecutor):
+    """Runs the ADK agent for A2A requests, routed by the locally classified intent."""
+
+    def __init__(self, agent, classifier, client, fast_agent=None, response_cache=None, streaming=True, admission=None):
+        self._session_service = InMemorySessionService()
+        self._runner = Runner(app_name=APP_NAME, agent=agent, session_service=self._session_service)
+        self._fast_runner = None
+        if fast_agent is not None:
+            self._fast_runner = Runner(app_name=APP_NAME, agent=fast_agent, session_service=self._session_service)
+        self._classifier = classifier
+        self._response_cache = response_cache
+        self._client = client
+        self._admission = admission
+        self._prefetches = set()
+        self._run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        task = context.current_task
+        if not task:
+            task = new_task(context.message)
+            await event_queue.enqueue_event(task)
+        updater = TaskUpdater(event_queue, task.id, task.contextId)
+        with tracer.task(task.id) as trace:
+            text = context.get_user_input()
+            classification = self._classifier.classify(text)
+            intent = classification.intent
+            trace.root.attributes["intent"] = intent or "UNCLASSIFIED"
+            logger.info(
+                f"Task {task.id} classified as {intent or 'UNCLASSIFIED'} "
+                f"({classification.label} {classification.confidence:.2f}, {classification.elapsed_ms:.3f} ms)"
+            )
+            client_id = context.call_context.state.get("client_id", "anonymous") if context.call_context else "anonymous"
+            slot = nullcontext()
+            if self._admission is not None:
+                slot = self._admission.slot(client_id, INTENT_PRIORITIES.get(intent, DEFAULT_PRIORITY))
+            try:
+                # The task stays submitted while it waits for a slot
+                async with slot:
+                    await updater.start_work()
+                    await self._run(text, intent, task, updater, event_queue, trace)
+            except Overloaded as e:
+                logger.warning(f"Task {task.id} from {client_id} rejected: {e}")
+                trace.root.attributes["status"] = "rejected"
+                await updater.reject(updater.new_agent_message([Part(root=TextPart(text=f"{e}; retry later"))]))
+
+    async def _run(self, text, intent, task, updater, event_queue, trace):
+        if intent in FLOW_INTENTS:
+            self._prefetch_root_group()
+
+        runner = self._runner
+        if intent in FAST_PATH_INTENTS and self._fast_runner is not None:
+            runner = self._fast_runner
+
+        stream = TaskEventStream(
+            event_queue,
+            task.id,
+            task.contextId,
+            flush_interval=config.STREAM_FLUSH_INTERVAL,
+            preview_chars=config.STREAM_TOOL_PREVIEW_CHARS,
+        )
+        cacheable = intent in FAST_PATH_INTENTS and self._response_cache is not None
+        try:
+            session = await self._get_session(task.contextId, intent)
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            # Only first turns are looked up and stored, so a cached answer never depends on (or ignores)
+            # earlier conversation
+            first_turn = not any(event.content for event in session.events)
+            cached = await self._response_cache.lookup(text, intent) if cacheable and first_turn else None
+            if cached is not None:
+                logger.info(f"Task {task.id} answered from the response cache")
+                await self._record_cached_turn(session, runner.agent.name, message, cached)
+                trace.root.attributes["response_cache"] = "hit"
+                answer = cached
+            else:
+                parts = []
+                async for event in runner.run_async(
+                    user_id=USER_ID, session_id=session.id, new_message=message, run_config=self._run_config
+                ):
+                    await stream.publish(event)
+                    if event.is_final_response() and event.content and event.content.parts:
+                        parts.extend(part.text for part in event.content.parts if part.text)
+                answer = "\n".join(parts)
+                if cacheable and first_turn:
+                    await self._response_cache.store(text, intent, answer)
+            await stream.finish(answer)
+            await updater.complete()
+            trace.root.attributes["status"] = "completed"
+        except Exception as e:
+            logger.error(f"Task {task.id} failed: {e}")
+            trace.root.attributes["status"] = "failed"
+            await updater.failed(updater.new_agent_message([Part(root=TextPart(text=f"Agent error: {e}"))]))
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        raise ServerError(error=UnsupportedOperationError())
+
+    async def _get_session(self, context_id, intent):
+        """Session for the A2A context, with the context ID and the request's intent written to its state."""
+        session = await self._session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=context_id)
+        if session is None:
+            session = await self._session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=context_id)
+        # Always written, so a previous request's intent never leaks into this one
+        await self._session_service.append_event(session, Event(
+            invocation_id=f"intent-{uuid.uuid4()}",
+            author="user",
+            actions=EventActions(state_delta={CONTEXT_ID_STATE_KEY: context_id, INTENT_STATE_KEY: intent}),
+        ))
+        return session
+
+    async def _record_cached_turn(self, session, author, message, answer):
+        """Add a cached question and answer to the session, as if the agent had answered it."""
+        invocation_id = f"cached-{uuid.uuid4()}"
+        await self._session_service.append_event(session, Event(invocation_id=invocation_id, author="user", content=message))
+        await self._session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=types.Content(role="model", parts=[types.Part(text=answer)]),
+        ))
+
+    def _prefetch_root_group(self):
+        # The agent's first flow call is always get_root_process_group_id; fetch it now so it is cached
+        task = asyncio.create_task(self._prefetch("get_root_process_group_id"))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, name):
+        try:
+            await self._client.call_tool(name, {})
+        except Exception as e:
+            logger.debug(f"Prefetch of {name} failed: {e}")
+
+
+def create_nifi_agent_executor():
+    """Executor for the A2A server, with the intent classifier configured from the environment."""
+    classifier = IntentClassifier(
+        threshold=config.INTENT_CONFIDENCE_THRESHOLD,
+        log_path=config.INTENT_LOG_PATH or None,
+    )
+    if config.INTENT_TRAINING_PATH:
+        classifier.train_from_log(config.INTENT_TRAINING_PATH)
+    return NiFiAgentExecutor(
+        root_agent,
+        classifier,
+        mcp_client,
+        fast_agent=fast_agent if config.FAST_PATH_ENABLED else None,
+        response_cache=response_cache if config.RESPONSE_CACHE_ENABLED else None,
+        streaming=config.STREAMING_ENABLED,
+        admission=admission,
+    )
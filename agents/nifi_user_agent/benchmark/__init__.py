@@ -0,0 +1,5 @@
+"""
+Offline benchmark of the A2A server: the real app from __main__.py, a stub NiFi MCP server
+and a scripted model, driven by concurrent A2A clients.
+Run with: python -m agents.nifi_user_agent.benchmark --help
+"""
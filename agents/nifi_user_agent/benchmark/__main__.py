@@ -0,0 +1,308 @@
+"""
+Offline end-to-end benchmark of the NiFi A2A agent server.
+
+Starts the stub NiFi MCP server and the real A2A app (with the scripted model) as
+subprocesses. Then, for every intent category, it sends concurrent A2A requests and
+reports latency percentiles, requests per second, server RSS and event-loop lag. Nothing
+leaves localhost.
+
+    python -m agents.nifi_user_agent.benchmark --requests 200 --concurrency 20
+    python -m agents.nifi_user_agent.benchmark --json current.json --baseline baseline.json
+    python -m agents.nifi_user_agent.benchmark --push
+
+With --push, every request is a non-blocking message/send with a webhook on a local receiver
+(webhook.py), and its latency runs until the final state is pushed.
+
+With --baseline, the run fails (exit code 1) when an intent's p95 latency or throughput
+is worse than the baseline by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from ..prompt import INTENTS
+from .fake_llm import SCENARIOS
+from .webhook import WebhookReceiver
+
+
+def percentile_ms(values, q):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+def wait_for_port(port, timeout, process):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode} before listening on port {port}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def start_processes(args, workdir):
+    mcp_ports = [args.mcp_port + i for i in range(max(args.mcp_replicas, 1))]
+    # Replicas of one NiFi instance, routed by mcp_router.py
+    endpoints = ",".join(f"stub=http://127.0.0.1:{port}/sse" for port in mcp_ports) if len(mcp_ports) > 1 else ""
+    env = dict(
+        os.environ,
+        NIFI_MCP_URL=f"http://127.0.0.1:{args.mcp_port}/sse",
+        NIFI_MCP_ENDPOINTS=endpoints,
+        A2A_HOST="127.0.0.1",
+        A2A_PORT=str(args.port),
+        A2A_PUBLIC_URL=f"http://127.0.0.1:{args.port}/",
+        A2A_WORKERS="1",
+        TASK_STORE_PATH=os.path.join(workdir, "tasks.db"),
+        RESPONSE_CACHE_PATH="",
+        RESPONSE_CACHE_ENABLED="true" if args.response_cache else "false",
+        STREAMING_ENABLED="true" if args.stream else "false",
+        LITELLM_LOCAL_MODEL_COST_MAP="True",
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "benchmark"),
+    )
+    package = __package__
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", f"{package}.stub_mcp", "--port", str(port),
+             "--latency-ms", str(args.mcp_latency_ms), "--payload-kb", str(args.mcp_payload_kb)],
+            env=env,
+        )
+        for port in mcp_ports
+    ]
+    try:
+        for port, stub in zip(mcp_ports, processes):
+            wait_for_port(port, 30, stub)
+        server = subprocess.Popen(
+            [sys.executable, "-m", f"{package}.server", "--llm-ttft-ms", str(args.llm_ttft_ms),
+             "--llm-token-ms", str(args.llm_token_ms), "--llm-answer-tokens", str(args.llm_answer_tokens),
+             "--llm-stall-rate", str(args.llm_stall_rate), "--llm-stall-ms", str(args.llm_stall_ms)],
+            env=env,
+        )
+        processes.append(server)
+        wait_for_port(args.port, 60, server)
+    except Exception:
+        stop_processes(processes)
+        raise
+    return processes
+
+
+def stop_processes(processes):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def request_body(text, stream, webhook=None):
+    body = {
+        "jsonrpc": "2.0",
+        "id": str(uuid.uuid4()),
+        "method": "message/stream" if stream else "message/send",
+        "params": {"message": {"role": "user", "parts": [{"kind": "text", "text": text}], "messageId": str(uuid.uuid4())}},
+    }
+    if webhook is not None:
+        body["params"]["configuration"] = {"acceptedOutputModes": ["text"], "blocking": False, "pushNotificationConfig": webhook}
+    return body
+
+
+async def send(client, url, text, stream, receiver=None, timeout=None):
+    """(latency, time to first event, final task state) for one A2A request."""
+    start = time.perf_counter()
+    if receiver is not None:
+        # Answered as soon as the task exists; the final state arrives at the webhook
+        webhook = {"url": receiver.url, "token": receiver.token}
+        response = await client.post(url, json=request_body(text, False, webhook))
+        result = response.json().get("result") or {}
+        accepted = time.perf_counter() - start
+        if "id" not in result:
+            return accepted, accepted, None
+        try:
+            task = await receiver.wait(result["id"], timeout)
+        except asyncio.TimeoutError:
+            return time.perf_counter() - start, accepted, None
+        return time.perf_counter() - start, accepted, task["status"]["state"]
+
+    body = request_body(text, stream)
+    if not stream:
+        response = await client.post(url, json=body)
+        result = response.json().get("result") or {}
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed, (result.get("status") or {}).get("state")
+
+    first_event, state = None, None
+    async with client.stream("POST", url, json=body, headers={"Accept": "text/event-stream"}) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            if first_event is None:
+                first_event = time.perf_counter() - start
+            result = json.loads(line[5:]).get("result") or {}
+            state = (result.get("status") or {}).get("state", state)
+    return time.perf_counter() - start, first_event, state
+
+
+async def run_intent(client, args, intent, receiver=None):
+    url = f"http://127.0.0.1:{args.port}/"
+    text = SCENARIOS[intent][0]
+    for _ in range(args.warmup):
+        await send(client, url, text, args.stream, receiver, args.timeout)
+    await client.get(f"{url}benchmark/stats", params={"reset": "1"})
+
+    latencies, first_events, errors, rejected = [], [], 0, 0
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining, errors, rejected
+        while remaining > 0:
+            remaining -= 1
+            try:
+                latency, first_event, state = await send(client, url, text, args.stream, receiver, args.timeout)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if state == "rejected":
+                # Turned away by admission control; not part of the latency figures
+                rejected += 1
+                continue
+            if state != "completed":
+                errors += 1
+            latencies.append(latency)
+            first_events.append(first_event)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - start
+    server = (await client.get(f"{url}benchmark/stats")).json()
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rejected": rejected,
+        "rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile_ms(latencies, 0.50),
+        "p95_ms": percentile_ms(latencies, 0.95),
+        "p99_ms": percentile_ms(latencies, 0.99),
+        "first_event_p50_ms": percentile_ms(first_events, 0.50),
+        "loop_lag_p99_ms": server["loop_lag"].get("p99_ms"),
+        "loop_lag_max_ms": server["loop_lag"].get("max_ms"),
+        "rss_mb": server["rss_bytes"] / 2**20,
+        "max_rss_mb": server["max_rss_bytes"] / 2**20,
+    }
+
+
+async def run(args):
+    results = {}
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    receiver = None
+    if args.push:
+        receiver = WebhookReceiver(token=str(uuid.uuid4()))
+        await receiver.start(args.webhook_port)
+    try:
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            for intent in args.intents:
+                results[intent] = await run_intent(client, args, intent, receiver)
+                print_row(intent, results[intent])
+    finally:
+        if receiver is not None:
+            await receiver.stop()
+    return results
+
+
+# (result key, header, width, format)
+COLUMNS = [
+    ("requests", "requests", 9, "d"), ("errors", "errors", 7, "d"), ("rejected", "rejected", 9, "d"),
+    ("rps", "req/s", 8, ".1f"), ("p50_ms", "p50 ms", 8, ".0f"), ("p95_ms", "p95 ms", 8, ".0f"), ("p99_ms", "p99 ms", 8, ".0f"),
+    ("first_event_p50_ms", "1st event", 10, ".0f"), ("loop_lag_p99_ms", "lag p99", 9, ".1f"), ("rss_mb", "RSS MB", 8, ".1f"),
+]
+
+
+def print_header():
+    print(f"{'intent':<18}" + "".join(f"{header:>{width}}" for _, header, width, _ in COLUMNS))
+
+
+def print_row(intent, row):
+    print(f"{intent:<18}" + "".join(f"{row[key] or 0:>{width}{fmt}}" for key, _, width, fmt in COLUMNS))
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a baseline run: p95 latency up or throughput down by more than tolerance."""
+    regressions = []
+    for intent, row in results.items():
+        base = baseline.get(intent)
+        if not base or row["p95_ms"] is None or base.get("p95_ms") is None:
+            continue
+        if row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{intent}: p95 {row['p95_ms']:.0f} ms vs baseline {base['p95_ms']:.0f} ms")
+        if row["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{intent}: {row['rps']:.1f} req/s vs baseline {base['rps']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per intent")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent A2A clients")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests per intent")
+    parser.add_argument("--intents", nargs="+", choices=INTENTS, default=list(INTENTS))
+    parser.add_argument("--stream", action="store_true", help="use message/stream instead of message/send")
+    parser.add_argument("--push", action="store_true",
+                        help="non-blocking message/send with the final state pushed to a local webhook")
+    parser.add_argument("--webhook-port", type=int, default=9100)
+    parser.add_argument("--response-cache", action="store_true", help="leave the semantic response cache on")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--mcp-port", type=int, default=8050)
+    parser.add_argument("--mcp-latency-ms", type=float, default=20.0)
+    parser.add_argument("--mcp-payload-kb", type=float, default=8.0)
+    parser.add_argument("--mcp-replicas", type=int, default=1,
+                        help="stub MCP servers on consecutive ports from --mcp-port, routed as replicas")
+    parser.add_argument("--llm-ttft-ms", type=float, default=200.0)
+    parser.add_argument("--llm-token-ms", type=float, default=2.0)
+    parser.add_argument("--llm-answer-tokens", type=int, default=100)
+    parser.add_argument("--llm-stall-rate", type=float, default=0.0,
+                        help="share of model calls that stall before answering, to exercise failover and hedging")
+    parser.add_argument("--llm-stall-ms", type=float, default=5000.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression against the baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        processes = start_processes(args, workdir)
+        try:
+            print_header()
+            results = asyncio.run(run(args))
+        finally:
+            stop_processes(processes)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
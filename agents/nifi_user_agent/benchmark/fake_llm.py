@@ -0,0 +1,100 @@
+"""
+Scripted model that stands in for LiteLlm in benchmarks.
+
+Each benchmark request text maps to a script: the tool calls to make, in order, then a
+text answer. The model waits --llm-ttft-ms before every turn and --llm-token-ms per answer
+token, and streams the answer token by token when ADK asks for streaming. A share of the
+turns (--llm-stall-rate) first stalls for --llm-stall-ms, like a slow provider.
+"""
+
+import asyncio
+import random
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from ..prompt import DISCOVERY, FLOW_CONSTRUCTION, FLOW_INSPECTION, FLOW_MANAGEMENT, INFORMATION_ONLY
+from .stub_mcp import ROOT_ID
+
+FLOW_PLAN = {
+    "process_group_id": ROOT_ID,
+    "processors": [
+        {"ref": "gen", "processor_type": "org.apache.nifi.processors.standard.GenerateFlowFile", "name": "Generate"},
+        {"ref": "log", "processor_type": "org.apache.nifi.processors.standard.LogAttribute", "name": "Log"},
+    ],
+    "connections": [{"source": "gen", "target": "log", "relationships": ["success"]}],
+}
+
+# intent -> (request text, [(tool name, arguments), ...])
+SCENARIOS = {
+    INFORMATION_ONLY: ("How should I tune back pressure between processors?", []),
+    DISCOVERY: ("Which processors are available for reading from Kafka?", [("get_processor_types", {})]),
+    FLOW_INSPECTION: (
+        "Show me the processors in the root process group",
+        [("get_root_process_group_id", {}), ("list_processors", {"process_group_id": ROOT_ID})],
+    ),
+    FLOW_CONSTRUCTION: (
+        "Create a pipeline that generates flowfiles and logs their attributes",
+        [("get_root_process_group_id", {}), ("execute_flow_plan", {"plan": FLOW_PLAN})],
+    ),
+    FLOW_MANAGEMENT: (
+        "Delete the processor proc-1",
+        [("get_processor_details", {"processor_id": "proc-1"}),
+         ("delete_processor", {"processor_id": "proc-1", "version": 1})],
+    ),
+}
+
+_SCRIPTS = {text: calls for text, calls in SCENARIOS.values()}
+
+
+class ScriptedLlm(BaseLlm):
+    """Replays the scripted tool calls for the current request, then answers."""
+
+    ttft: float = 0.2
+    token_delay: float = 0.01
+    answer_tokens: int = 100
+    stall_rate: float = 0.0
+    stall: float = 5.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        text, step = _current_turn(llm_request.contents)
+        calls = _SCRIPTS.get(text, [])
+        if self.stall_rate and random.random() < self.stall_rate:
+            await asyncio.sleep(self.stall)
+        await asyncio.sleep(self.ttft)
+        if step < len(calls):
+            name, args = calls[step]
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))]),
+                usage_metadata=_usage(llm_request),
+            )
+            return
+
+        tokens = [f"token{i} " for i in range(self.answer_tokens)]
+        if stream:
+            for token in tokens:
+                await asyncio.sleep(self.token_delay)
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=token)]), partial=True)
+        else:
+            await asyncio.sleep(self.token_delay * len(tokens))
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="".join(tokens))]),
+            usage_metadata=_usage(llm_request),
+        )
+
+
+def _current_turn(contents):
+    """Text of the latest user message and the number of tool results that followed it."""
+    results = 0
+    for content in reversed(contents or []):
+        parts = content.parts or []
+        if content.role == "user" and any(part.text for part in parts) and not any(part.function_response for part in parts):
+            return next(part.text for part in parts if part.text), results
+        results += sum(1 for part in parts if part.function_response)
+    return "", results
+
+
+def _usage(llm_request):
+    chars = sum(len(part.text or "") for content in llm_request.contents or [] for part in content.parts or [])
+    return types.GenerateContentResponseUsageMetadata(prompt_token_count=chars // 4, candidates_token_count=0)
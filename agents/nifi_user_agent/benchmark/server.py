@@ -0,0 +1,112 @@
+"""
+A2A server for benchmarks: the app from __main__.create_app() with the scripted model
+in place of LiteLlm and a /benchmark/stats route reporting RSS and event-loop lag. With
+model routing on, every configured model is replaced by a scripted model of the same name,
+so routing, failover and hedging run as in production.
+Started by the benchmark harness; the MCP URL and port come from the usual environment settings.
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from collections import deque
+
+import uvicorn
+from starlette.responses import JSONResponse
+
+from .. import agent, config
+from ..model_router import create_model_router
+from ..models import limit_llm_calls
+from .fake_llm import ScriptedLlm
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps for `interval` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._samples = deque(maxlen=100_000)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._samples.append(time.perf_counter() - start - self.interval)
+
+    def reset(self):
+        self._samples.clear()
+
+    def stats(self):
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p99_ms": samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
+
+def rss_bytes():
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ttft-ms", type=float, default=200.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--llm-answer-tokens", type=int, default=100)
+    parser.add_argument("--llm-stall-rate", type=float, default=0.0)
+    parser.add_argument("--llm-stall-ms", type=float, default=5000.0)
+    args = parser.parse_args()
+
+    def scripted(name):
+        return ScriptedLlm(
+            model=name,
+            ttft=args.llm_ttft_ms / 1000,
+            token_delay=args.llm_token_ms / 1000,
+            answer_tokens=args.llm_answer_tokens,
+            stall_rate=args.llm_stall_rate,
+            stall=args.llm_stall_ms / 1000,
+        )
+
+    if config.MODEL_ROUTING_ENABLED:
+        model = limit_llm_calls(create_model_router(scripted))
+    else:
+        model = limit_llm_calls(scripted("benchmark/scripted"))
+    agent.root_agent.model = model
+    agent.fast_agent.model = model
+
+    from ..__main__ import create_app
+
+    monitor = LoopLagMonitor()
+
+    async def benchmark_stats(request):
+        monitor.start()
+        if request.query_params.get("reset"):
+            monitor.reset()
+        return JSONResponse({
+            "rss_bytes": rss_bytes(),
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "loop_lag": monitor.stats(),
+        })
+
+    app = create_app()
+    app.add_route('/benchmark/stats', benchmark_stats, methods=['GET'])
+    uvicorn.run(app, host=config.A2A_HOST, port=config.A2A_PORT, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
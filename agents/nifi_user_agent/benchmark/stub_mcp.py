@@ -0,0 +1,114 @@
+"""
+Stub NiFi MCP server (SSE) for benchmarks.
+
+Serves the tools the agent uses with NiFi-shaped payloads. Every call waits
+--latency-ms, and list responses are padded to about --payload-kb.
+Run with: python -m agents.nifi_user_agent.benchmark.stub_mcp --port 8050
+"""
+
+import argparse
+import asyncio
+import itertools
+
+from mcp.server.fastmcp import FastMCP
+
+ROOT_ID = "root"
+
+_ids = itertools.count(1)
+
+
+def entity(component_id, name, group_id=ROOT_ID, version=1, **component):
+    return {
+        "id": component_id,
+        "revision": {"version": version},
+        "component": {"id": component_id, "name": name, "parentGroupId": group_id, **component},
+    }
+
+
+def create_server(port, latency, payload_bytes):
+    mcp = FastMCP("nifi-stub", host="127.0.0.1", port=port, log_level="WARNING")
+    # About 500 bytes per padded list item
+    items = max(payload_bytes // 500, 1)
+    padding = "x" * 400
+
+    async def wait():
+        if latency:
+            await asyncio.sleep(latency)
+
+    @mcp.tool()
+    async def get_root_process_group_id() -> str:
+        await wait()
+        return ROOT_ID
+
+    @mcp.tool()
+    async def get_processor_types() -> dict:
+        await wait()
+        return {"processorTypes": [
+            {"type": f"org.apache.nifi.processors.standard.Processor{i}", "description": padding}
+            for i in range(items)
+        ]}
+
+    @mcp.tool()
+    async def list_processors(process_group_id: str) -> dict:
+        await wait()
+        return {"processors": [
+            entity(f"proc-{i}", f"Processor {i}", process_group_id, type="org.apache.nifi.processors.standard.LogAttribute",
+                   comments=padding)
+            for i in range(items)
+        ]}
+
+    @mcp.tool()
+    async def get_process_groups(process_group_id: str) -> dict:
+        await wait()
+        return {"processGroups": [entity(f"pg-{i}", f"Group {i}", process_group_id, comments=padding) for i in range(items)]}
+
+    @mcp.tool()
+    async def get_processor_details(processor_id: str) -> dict:
+        await wait()
+        return entity(processor_id, processor_id, type="org.apache.nifi.processors.standard.LogAttribute", comments=padding)
+
+    @mcp.tool()
+    async def create_processor(process_group_id: str, processor_type: str, name: str, position: dict, config: dict = None) -> dict:
+        await wait()
+        return entity(f"proc-new-{next(_ids)}", name, process_group_id, version=0, type=processor_type, position=position)
+
+    @mcp.tool()
+    async def create_process_group(process_group_id: str, name: str, position: dict) -> dict:
+        await wait()
+        return entity(f"pg-new-{next(_ids)}", name, process_group_id, version=0, position=position)
+
+    @mcp.tool()
+    async def create_connection(process_group_id: str, source_id: str, target_id: str, relationships: list) -> dict:
+        await wait()
+        return entity(f"conn-new-{next(_ids)}", "", process_group_id, version=0, source={"id": source_id},
+                      destination={"id": target_id}, selectedRelationships=relationships)
+
+    @mcp.tool()
+    async def delete_processor(processor_id: str, version: int) -> dict:
+        await wait()
+        return entity(processor_id, processor_id, version=version + 1)
+
+    @mcp.tool()
+    async def delete_connection(connection_id: str, version: int) -> dict:
+        await wait()
+        return entity(connection_id, "", version=version + 1)
+
+    @mcp.tool()
+    async def delete_process_group(process_group_id: str, version: int) -> dict:
+        await wait()
+        return entity(process_group_id, process_group_id, version=version + 1)
+
+    return mcp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--payload-kb", type=float, default=8.0)
+    args = parser.parse_args()
+    create_server(args.port, args.latency_ms / 1000, int(args.payload_kb * 1024)).run("sse")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Local webhook receiver for A2A push notifications.
+
+The benchmark's --push mode runs it inside its own event loop and waits on it for the final
+state of every task. On its own it logs each notification it receives, and the whole task
+once it reaches a final state:
+
+    python -m agents.nifi_user_agent.benchmark.webhook --port 9100
+
+and a client registers http://127.0.0.1:9100/ as the task's pushNotificationConfig URL.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import Response
+
+from ..push_notifications import FINAL_STATES, TOKEN_HEADER
+
+logger = logging.getLogger(__name__)
+
+_FINAL = {state.value for state in FINAL_STATES}
+
+
+class WebhookReceiver:
+    """Collects pushed tasks; wait(task_id) resolves with the task in its final state."""
+
+    def __init__(self, token=None, collect=True):
+        self.token = token
+        self.collect = collect
+        self.notifications = 0
+        self.rejected = 0
+        self._final = {}
+        self._waiters = {}
+        self.url = None
+        self._server = None
+        self._serving = None
+        self.app = Starlette()
+        self.app.add_route('/', self.receive, methods=['POST'])
+
+    async def receive(self, request):
+        if self.token is not None and request.headers.get(TOKEN_HEADER) != self.token:
+            self.rejected += 1
+            return Response(status_code=401)
+        task = await request.json()
+        self.notifications += 1
+        state = (task.get("status") or {}).get("state")
+        logger.info(f"Task {task.get('id')}: {state}")
+        if state in _FINAL:
+            waiter = self._waiters.pop(task["id"], None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(task)
+            elif self.collect:
+                self._final[task["id"]] = task
+            else:
+                logger.info(json.dumps(task, indent=2))
+        return Response(status_code=204)
+
+    async def wait(self, task_id, timeout):
+        """The task in its final state; the notification may arrive before the caller asks."""
+        if task_id in self._final:
+            return self._final.pop(task_id)
+        waiter = self._waiters[task_id] = asyncio.get_running_loop().create_future()
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._waiters.pop(task_id, None)
+
+    async def start(self, port, host="127.0.0.1"):
+        self.url = f"http://{host}:{port}/"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._serving = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._serving.done():
+                self._serving.result()
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--token", help="expected X-A2A-Notification-Token; others are answered with 401")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+
+    receiver = WebhookReceiver(args.token, collect=False)
+    uvicorn.run(receiver.app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
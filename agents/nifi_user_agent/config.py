@@ -0,0 +1,179 @@
+"""
+Runtime settings for the NiFi A2A agent.
+Values are read from the environment (and the .env file) with sensible local defaults.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+# NiFi MCP server
+NIFI_MCP_URL = os.getenv("NIFI_MCP_URL", "http://127.0.0.1:8050/sse")
+
+# A2A server
+A2A_HOST = os.getenv("A2A_HOST", "localhost")
+A2A_PORT = _env_int("A2A_PORT", 9999)
+A2A_PUBLIC_URL = os.getenv("A2A_PUBLIC_URL", f"http://{A2A_HOST}:{A2A_PORT}/")
+A2A_WORKERS = max(_env_int("A2A_WORKERS", 1), 1)
+# Build the agent in the background as soon as the server starts; otherwise on the first task
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "true").lower() == "true"
+# How often a worker polls the shared task store when following a task it does not run
+RESUBSCRIBE_POLL_INTERVAL = _env_float("RESUBSCRIBE_POLL_INTERVAL", 0.5)
+# Seconds without a change after which a followed task is reported as unknown (0 follows forever)
+RESUBSCRIBE_STALL_TIMEOUT = _env_float("RESUBSCRIBE_STALL_TIMEOUT", 600.0)
+
+# Several MCP servers as "instance=url" entries, comma separated; endpoints of one NiFi instance are
+# replicas and the first instance is the default. Empty uses NIFI_MCP_URL alone
+NIFI_MCP_ENDPOINTS = os.getenv("NIFI_MCP_ENDPOINTS", "")
+# An endpoint leaves the rotation for MCP_ENDPOINT_EJECT_SECONDS after this many consecutive failures, or when
+# its average call latency exceeds MCP_ENDPOINT_SLOW_AFTER seconds (0 disables) and twice its fastest replica's
+MCP_ENDPOINT_MAX_FAILURES = _env_int("MCP_ENDPOINT_MAX_FAILURES", 3)
+MCP_ENDPOINT_SLOW_AFTER = _env_float("MCP_ENDPOINT_SLOW_AFTER", 10.0)
+MCP_ENDPOINT_EJECT_SECONDS = _env_float("MCP_ENDPOINT_EJECT_SECONDS", 30.0)
+
+# MCP session pool (limits are per worker process and endpoint)
+MCP_POOL_MIN_SIZE = _env_int("MCP_POOL_MIN_SIZE", 2)
+MCP_POOL_MAX_SIZE = _env_int("MCP_POOL_MAX_SIZE", 8)
+# Optional cap on MCP sessions across all workers, split evenly between them
+if os.getenv("MCP_POOL_TOTAL_MAX_SIZE"):
+    MCP_POOL_MAX_SIZE = max(_env_int("MCP_POOL_TOTAL_MAX_SIZE", 8) // A2A_WORKERS, 1)
+    MCP_POOL_MIN_SIZE = min(MCP_POOL_MIN_SIZE, MCP_POOL_MAX_SIZE)
+MCP_POOL_CONNECT_TIMEOUT = _env_float("MCP_POOL_CONNECT_TIMEOUT", 10.0)
+MCP_POOL_HEALTH_CHECK_INTERVAL = _env_float("MCP_POOL_HEALTH_CHECK_INTERVAL", 30.0)
+
+# Read-through cache for inspection tool results
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_MAX_ENTRIES = _env_int("TOOL_CACHE_MAX_ENTRIES", 512)
+
+# Identical concurrent read-only tool calls share one request to NiFi
+MCP_SINGLE_FLIGHT_ENABLED = os.getenv("MCP_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Large inspection and discovery results reach the model as a projection; full payloads are kept by handle
+PROJECTION_ENABLED = os.getenv("PROJECTION_ENABLED", "true").lower() == "true"
+# Results shorter than this (characters) are passed through unchanged
+PROJECTION_MIN_CHARS = _env_int("PROJECTION_MIN_CHARS", 2000)
+# Items of a listing shown per projection or fetch_tool_result page
+PROJECTION_PAGE_SIZE = _env_int("PROJECTION_PAGE_SIZE", 100)
+PROJECTION_STORE_MAX_ENTRIES = _env_int("PROJECTION_STORE_MAX_ENTRIES", 256)
+
+# Plan-then-execute flow construction
+PLAN_EXECUTION_ENABLED = os.getenv("PLAN_EXECUTION_ENABLED", "true").lower() == "true"
+PLAN_MAX_CONCURRENCY = _env_int("PLAN_MAX_CONCURRENCY", 8)
+# Lay out planned components without a position along their connections (layout.py)
+PLAN_AUTO_LAYOUT = os.getenv("PLAN_AUTO_LAYOUT", "true").lower() == "true"
+
+# Bulk deletion of a process group's contents or a list of processors in one tool call
+TEARDOWN_ENABLED = os.getenv("TEARDOWN_ENABLED", "true").lower() == "true"
+TEARDOWN_MAX_CONCURRENCY = _env_int("TEARDOWN_MAX_CONCURRENCY", 8)
+# Retries of a delete rejected for a stale revision, each with the re-read revision
+TEARDOWN_MAX_RETRIES = _env_int("TEARDOWN_MAX_RETRIES", 3)
+
+# Concurrent inspection of a whole process-group tree in one tool call
+FLOW_INSPECTION_ENABLED = os.getenv("FLOW_INSPECTION_ENABLED", "true").lower() == "true"
+INSPECTION_MAX_CONCURRENCY = _env_int("INSPECTION_MAX_CONCURRENCY", 8)
+# Process groups visited per inspection; larger trees are reported as truncated
+INSPECTION_MAX_GROUPS = _env_int("INSPECTION_MAX_GROUPS", 500)
+
+# In-memory flow graph kept in sync from tool results, with local query tools
+FLOW_INDEX_ENABLED = os.getenv("FLOW_INDEX_ENABLED", "true").lower() == "true"
+# Seconds before the query tools walk the whole flow again; tool results keep it current in between
+FLOW_INDEX_MAX_AGE = _env_float("FLOW_INDEX_MAX_AGE", 300.0)
+
+# A2A task store: "sqlite" (durable, bounded) or "memory"
+TASK_STORE = os.getenv("TASK_STORE", "sqlite").lower()
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "nifi_agent_tasks.db")
+TASK_STORE_MAX_CACHED_TASKS = _env_int("TASK_STORE_MAX_CACHED_TASKS", 1000)
+# Unfinished tasks kept in memory; older ones (and those idle for an hour) are read from SQLite
+TASK_STORE_MAX_ACTIVE_TASKS = _env_int("TASK_STORE_MAX_ACTIVE_TASKS", 10000)
+TASK_STORE_FLUSH_INTERVAL = _env_float("TASK_STORE_FLUSH_INTERVAL", 0.5)
+TASK_STORE_RETENTION_DAYS = _env_float("TASK_STORE_RETENTION_DAYS", 7)
+
+# Push notifications: webhooks registered per task receive every task state change
+PUSH_NOTIFICATIONS_ENABLED = os.getenv("PUSH_NOTIFICATIONS_ENABLED", "true").lower() == "true"
+# Notifications waiting for delivery; further ones are dropped while it is full
+PUSH_QUEUE_SIZE = _env_int("PUSH_QUEUE_SIZE", 10000)
+# Notifications taken from the queue at once, and the most delivered concurrently
+PUSH_BATCH_SIZE = _env_int("PUSH_BATCH_SIZE", 50)
+# Retries of a failed delivery, with exponential backoff from PUSH_RETRY_DELAY seconds
+PUSH_MAX_RETRIES = _env_int("PUSH_MAX_RETRIES", 5)
+PUSH_RETRY_DELAY = _env_float("PUSH_RETRY_DELAY", 0.5)
+PUSH_TIMEOUT = _env_float("PUSH_TIMEOUT", 10.0)
+
+# Send only the prompt sections relevant to the classified intent
+PROMPT_COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION_ENABLED", "true").lower() == "true"
+
+# Local intent classification ahead of the model call
+INTENT_CONFIDENCE_THRESHOLD = _env_float("INTENT_CONFIDENCE_THRESHOLD", 0.6)
+# JSONL of labelled requests ({"text": ..., "intent": ...}) to train the classifier model on
+INTENT_TRAINING_PATH = os.getenv("INTENT_TRAINING_PATH", "")
+# Append every classified request to this JSONL file, for review and retraining
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "")
+# Lighter agent for INFORMATION_ONLY and DISCOVERY requests
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_MODEL = os.getenv("FAST_PATH_MODEL", "openai/gpt-4o-mini")
+
+# Model tiers by intent and step (model_router.py); each tier lists LiteLLM models, the first preferred
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+MODEL_TIER_FAST = os.getenv("MODEL_TIER_FAST", FAST_PATH_MODEL)
+MODEL_TIER_STANDARD = os.getenv("MODEL_TIER_STANDARD", "openai/gpt-4o-mini")
+# "INTENT=tier" or "INTENT:step=tier" (step: request or tool_result); everything else uses standard
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "INFORMATION_ONLY=fast,DISCOVERY=fast")
+# Seconds to wait for a model's first response before failing over to the next model of the tier
+MODEL_TIMEOUT = _env_float("MODEL_TIMEOUT", 30.0)
+# Send a second request when the first has not answered after this many seconds; 0 disables hedging
+MODEL_HEDGE_AFTER = _env_float("MODEL_HEDGE_AFTER", 0.0)
+
+# Semantic cache of INFORMATION_ONLY and DISCOVERY answers
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# "local" (hashed n-grams, no network) or a LiteLLM embedding model such as openai/text-embedding-3-small
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "local")
+# Minimum cosine similarity of a hit; with "local" the content words must also match
+RESPONSE_CACHE_THRESHOLD = _env_float("RESPONSE_CACHE_THRESHOLD", 0.92)
+RESPONSE_CACHE_MAX_ENTRIES = _env_int("RESPONSE_CACHE_MAX_ENTRIES", 1000)
+RESPONSE_CACHE_TTL = _env_float("RESPONSE_CACHE_TTL", 24 * 3600)
+# Saved on shutdown and reloaded on startup; empty keeps the cache in memory only
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "nifi_response_cache.npz")
+
+# Conversation history sent to the model per A2A context: older turns are compacted beyond this budget
+MEMORY_ENABLED = os.getenv("MEMORY_ENABLED", "true").lower() == "true"
+MEMORY_MAX_HISTORY_TOKENS = _env_int("MEMORY_MAX_HISTORY_TOKENS", 8000)
+# Turns before the current one that are always sent verbatim
+MEMORY_RECENT_TURNS = _env_int("MEMORY_RECENT_TURNS", 2)
+
+# Incremental streaming of model tokens and tool progress over message/stream
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+# Events buffered per task before the agent waits for the client
+STREAM_QUEUE_SIZE = _env_int("STREAM_QUEUE_SIZE", 64)
+# Token chunks are sent at most this often (seconds)
+STREAM_FLUSH_INTERVAL = _env_float("STREAM_FLUSH_INTERVAL", 0.05)
+# Model chunks buffered between the streaming thread and the agent
+STREAM_MODEL_BUFFER = _env_int("STREAM_MODEL_BUFFER", 32)
+# Characters of each tool result included in the streamed Tool Results sections
+STREAM_TOOL_PREVIEW_CHARS = _env_int("STREAM_TOOL_PREVIEW_CHARS", 2000)
+
+# Share of tasks that record a full span tree (0.0-1.0); metrics are always collected
+TRACE_SAMPLE_RATE = _env_float("TRACE_SAMPLE_RATE", 0.0)
+# Sampled traces kept in memory for GET /traces
+TRACE_MAX_TRACES = _env_int("TRACE_MAX_TRACES", 100)
+
+# Admission control: tasks over the limits wait in a priority queue, then are rejected as busy
+ADMISSION_MAX_CONCURRENT_TASKS = _env_int("ADMISSION_MAX_CONCURRENT_TASKS", 16)
+ADMISSION_MAX_TASKS_PER_CLIENT = _env_int("ADMISSION_MAX_TASKS_PER_CLIENT", 4)
+# Comma-separated addresses of proxies whose X-Client-Id header names the client; from anyone else it is ignored
+ADMISSION_TRUSTED_PROXIES = os.getenv("ADMISSION_TRUSTED_PROXIES", "")
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 64)
+# Seconds a task may wait for admission before it is rejected
+ADMISSION_QUEUE_TIMEOUT = _env_float("ADMISSION_QUEUE_TIMEOUT", 30.0)
+# Concurrent model calls and MCP tool calls per worker, across all tasks
+LLM_MAX_CONCURRENT_CALLS = _env_int("LLM_MAX_CONCURRENT_CALLS", 8)
+MCP_MAX_CONCURRENT_CALLS = _env_int("MCP_MAX_CONCURRENT_CALLS", MCP_POOL_MAX_SIZE * 2)
@@ -0,0 +1,493 @@
+"""
+In-memory index of the NiFi flow, kept in sync from the agent's own tool calls.
+
+IndexingClient sits in the MCP client chain and feeds every tool result to the FlowIndex:
+- listings and details upsert processors and process groups;
+- create_* results add components, delete_* calls remove them;
+- connection entities found in any payload are added to the graph;
+- a list_connections result (on servers that have it) also makes a group's connections complete.
+
+The MCP tools have no connection listing otherwise, so the index only knows every connection
+of processors the agent created itself or whose group's connections were listed. The query
+tools say when an answer depends on connections that may be missing.
+
+An update only applies when its revision is not older than the one already indexed. A group
+listing removes the processors or child groups that are missing from it, unless they
+changed after the listing call started. Local query tools (find_processors,
+get_flow_neighbors, find_unconnected_relationships) answer from the adjacency maps without
+NiFi round trips. A full walk with the FlowInspector runs only when the index is empty or
+older than FLOW_INDEX_MAX_AGE.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .tool_cache import parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 100
+
+
+@dataclass
+class ProcessorNode:
+    id: str
+    name: str = ""
+    type: str = ""
+    group_id: str = None
+    state: str = None
+    version: int = None
+    # Relationship name -> auto-terminated; None until the processor's relationships are known
+    relationships: dict = None
+    updated: int = 0
+
+    def summary(self):
+        return {"id": self.id, "name": self.name, "type": self.type.rsplit(".", 1)[-1], "group_id": self.group_id,
+                "state": self.state}
+
+
+@dataclass
+class GroupNode:
+    id: str
+    name: str = ""
+    parent_id: str = None
+    version: int = None
+    updated: int = 0
+
+
+@dataclass
+class ConnectionNode:
+    id: str
+    source_id: str
+    target_id: str
+    group_id: str = None
+    relationships: list = field(default_factory=list)
+    version: int = None
+    updated: int = 0
+
+
+def _component(entity):
+    return entity.get("component") or {}
+
+
+def _version(entity):
+    return (entity.get("revision") or {}).get("version")
+
+
+def _entity_list(payload, key):
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    return [item for item in items or [] if isinstance(item, dict) and item.get("id")]
+
+
+def _iter_connections(payload):
+    """Connection entities anywhere in a payload (NiFi ConnectionEntity or its component)."""
+    if isinstance(payload, list):
+        for item in payload:
+            yield from _iter_connections(item)
+    elif isinstance(payload, dict):
+        component = _component(payload)
+        if payload.get("id") and (
+            ("sourceId" in payload and "destinationId" in payload) or ("source" in component and "destination" in component)
+        ):
+            yield payload
+            return
+        for value in payload.values():
+            if isinstance(value, (dict, list)):
+                yield from _iter_connections(value)
+
+
+class FlowIndex:
+    """Processors, process groups and connections of the NiFi flow as an adjacency structure."""
+
+    def __init__(self, max_age=300.0, clock=time.monotonic):
+        self.max_age = max_age
+        self._clock = clock
+        self._sequence = itertools.count(1)
+        self.processors = {}
+        self.groups = {}
+        self.connections = {}
+        self._outgoing = defaultdict(set)
+        self._incoming = defaultdict(set)
+        self._by_name = defaultdict(set)
+        self._by_type = defaultdict(set)
+        self._synced_at = None
+        self._observed = 0
+        # Processors whose connections are all known: created by the agent, or in a group whose
+        # connections were listed
+        self._created = set()
+        self._listed_groups = set()
+
+    # -- Sync --------------------------------------------------------------------------
+
+    def begin(self):
+        """Sequence number for a tool call about to start; pass it to observe() with the result."""
+        return next(self._sequence)
+
+    def observe(self, name, arguments, result, sequence):
+        """Apply one tool result to the index."""
+        if getattr(result, "isError", False):
+            return
+        self._observed += 1
+        if name.startswith("delete_"):
+            self._apply_delete(name, arguments)
+            return
+        payload = parse_tool_result(result)
+        if payload is None:
+            return
+        group_id = arguments.get("process_group_id")
+        if name == "list_processors":
+            entities = _entity_list(payload, "processors")
+            for entity in entities:
+                self._upsert_processor(entity, sequence, group_id)
+            self._drop_missing(self.processors, "group_id", group_id, {e["id"] for e in entities}, sequence, self._remove_processor)
+        elif name == "get_process_groups":
+            entities = _entity_list(payload, "processGroups")
+            for entity in entities:
+                self._upsert_group(entity, sequence, group_id)
+            self._drop_missing(self.groups, "parent_id", group_id, {e["id"] for e in entities}, sequence, self._remove_group)
+        elif name in ("get_processor_details", "create_processor") and isinstance(payload, dict):
+            self._upsert_processor(payload, sequence, group_id)
+            if name == "create_processor" and payload.get("id") in self.processors:
+                self._created.add(payload["id"])
+        elif name == "list_connections" and group_id:
+            entities = list(_iter_connections(payload))
+            for entity in entities:
+                self._upsert_connection(entity, sequence, group_id)
+            self._drop_missing(self.connections, "group_id", group_id, {e["id"] for e in entities}, sequence,
+                               self._remove_connection)
+            self._listed_groups.add(group_id)
+            return
+        elif name == "create_process_group" and isinstance(payload, dict):
+            self._upsert_group(payload, sequence, group_id)
+        elif name == "create_connection" and isinstance(payload, dict) and payload.get("id"):
+            self._upsert_connection(payload, sequence, group_id, arguments)
+            return
+        for entity in _iter_connections(payload):
+            self._upsert_connection(entity, sequence, group_id)
+
+    def mark_synced(self):
+        self._synced_at = self._clock()
+
+    def needs_sync(self):
+        return self._synced_at is None or self._clock() - self._synced_at > self.max_age
+
+    def _is_stale(self, node, version):
+        return node is not None and version is not None and node.version is not None and version < node.version
+
+    def _upsert_processor(self, entity, sequence, group_id=None):
+        component = _component(entity)
+        node = self.processors.get(entity["id"])
+        version = _version(entity)
+        if self._is_stale(node, version):
+            return
+        if node is None:
+            node = self.processors[entity["id"]] = ProcessorNode(entity["id"])
+        else:
+            self._unindex_processor(node)
+        node.name = component.get("name") or entity.get("name") or node.name
+        node.type = component.get("type") or entity.get("type") or node.type
+        node.group_id = component.get("parentGroupId") or group_id or node.group_id
+        state = (entity.get("status") or {}).get("runStatus") or component.get("state")
+        node.state = state.upper() if state else node.state
+        node.version = version if version is not None else node.version
+        if component.get("relationships") is not None:
+            node.relationships = {
+                r.get("name"): bool(r.get("autoTerminate")) for r in component["relationships"] if isinstance(r, dict)
+            }
+        node.updated = sequence
+        self._by_name[node.name.lower()].add(node.id)
+        self._by_type[node.type.lower()].add(node.id)
+        self._by_type[node.type.rsplit(".", 1)[-1].lower()].add(node.id)
+
+    def _upsert_group(self, entity, sequence, parent_id=None):
+        node = self.groups.get(entity["id"])
+        version = _version(entity)
+        if self._is_stale(node, version):
+            return
+        if node is None:
+            node = self.groups[entity["id"]] = GroupNode(entity["id"])
+        component = _component(entity)
+        node.name = component.get("name") or entity.get("name") or node.name
+        node.parent_id = component.get("parentGroupId") or parent_id or node.parent_id
+        node.version = version if version is not None else node.version
+        node.updated = sequence
+
+    def _upsert_connection(self, entity, sequence, group_id=None, arguments=None):
+        arguments = arguments or {}
+        component = _component(entity)
+        source_id = (entity.get("sourceId") or (component.get("source") or {}).get("id") or arguments.get("source_id"))
+        target_id = (entity.get("destinationId") or (component.get("destination") or {}).get("id")
+                     or arguments.get("target_id"))
+        if not source_id or not target_id:
+            return
+        node = self.connections.get(entity["id"])
+        version = _version(entity)
+        if self._is_stale(node, version):
+            return
+        if node is not None:
+            self._outgoing[node.source_id].discard(node.id)
+            self._incoming[node.target_id].discard(node.id)
+        relationships = component.get("selectedRelationships") or arguments.get("relationships") or []
+        node = self.connections[entity["id"]] = ConnectionNode(
+            entity["id"],
+            source_id,
+            target_id,
+            component.get("parentGroupId") or group_id,
+            list(relationships),
+            version,
+            sequence,
+        )
+        self._outgoing[source_id].add(node.id)
+        self._incoming[target_id].add(node.id)
+
+    def _drop_missing(self, nodes, parent_attr, group_id, present, sequence, remove):
+        # Only what changed before this listing started; newer changes win over the listing
+        if not group_id:
+            return
+        missing = [
+            node_id for node_id, node in nodes.items()
+            if getattr(node, parent_attr) == group_id and node_id not in present and node.updated < sequence
+        ]
+        for node_id in missing:
+            remove(node_id)
+
+    def _apply_delete(self, name, arguments):
+        if name == "delete_processor":
+            self._remove_processor(arguments.get("processor_id"))
+        elif name == "delete_connection":
+            self._remove_connection(arguments.get("connection_id"))
+        elif name == "delete_process_group":
+            self._remove_group(arguments.get("process_group_id"))
+
+    def _unindex_processor(self, node):
+        self._by_name[node.name.lower()].discard(node.id)
+        self._by_type[node.type.lower()].discard(node.id)
+        self._by_type[node.type.rsplit(".", 1)[-1].lower()].discard(node.id)
+
+    def _remove_processor(self, processor_id):
+        node = self.processors.pop(processor_id, None)
+        self._created.discard(processor_id)
+        if node is None:
+            return
+        self._unindex_processor(node)
+        for connection_id in list(self._outgoing.pop(processor_id, ())) + list(self._incoming.pop(processor_id, ())):
+            self._remove_connection(connection_id)
+
+    def _remove_connection(self, connection_id):
+        node = self.connections.pop(connection_id, None)
+        if node is not None:
+            self._outgoing[node.source_id].discard(connection_id)
+            self._incoming[node.target_id].discard(connection_id)
+
+    def _remove_group(self, group_id):
+        self.groups.pop(group_id, None)
+        self._listed_groups.discard(group_id)
+        for child_id in [g.id for g in self.groups.values() if g.parent_id == group_id]:
+            self._remove_group(child_id)
+        for processor_id in [p.id for p in self.processors.values() if p.group_id == group_id]:
+            self._remove_processor(processor_id)
+        for connection_id in [c.id for c in self.connections.values() if c.group_id == group_id]:
+            self._remove_connection(connection_id)
+
+    # -- Queries -----------------------------------------------------------------------
+
+    def resolve(self, processor):
+        """Processor IDs matching an ID or an exact (case-insensitive) name."""
+        if processor in self.processors:
+            return [processor]
+        return sorted(self._by_name.get(processor.lower(), ()))
+
+    def connections_known(self, processor_id):
+        """Whether every connection of a processor is in the index."""
+        node = self.processors.get(processor_id)
+        return processor_id in self._created or (node is not None and node.group_id in self._listed_groups)
+
+    def find_processors(self, name=None, processor_type=None, group_id=None, state=None):
+        if processor_type:
+            ids = self._by_type.get(processor_type.lower(), set())
+        else:
+            ids = self.processors.keys()
+        name = name.lower() if name else None
+        state = state.upper() if state else None
+        return [
+            self.processors[i] for i in ids
+            if (not name or name in self.processors[i].name.lower())
+            and (not group_id or self.processors[i].group_id == group_id)
+            and (not state or self.processors[i].state == state)
+        ]
+
+    def neighbors(self, processor_id, direction="upstream", depth=1):
+        """(processor, hops, relationships) reachable from a processor, breadth-first."""
+        edges, end = (self._incoming, "source_id") if direction == "upstream" else (self._outgoing, "target_id")
+        seen = {processor_id}
+        queue = deque([(processor_id, 0)])
+        found = []
+        while queue:
+            current, hops = queue.popleft()
+            if depth is not None and hops >= depth:
+                continue
+            for connection_id in edges.get(current, ()):
+                connection = self.connections[connection_id]
+                other = getattr(connection, end)
+                if other in seen:
+                    continue
+                seen.add(other)
+                found.append((other, hops + 1, connection.relationships))
+                queue.append((other, hops + 1))
+        return found
+
+    def unconnected_relationships(self, group_id=None):
+        """(processor, [relationship names]) that are neither connected nor auto-terminated, and the
+        number of processors skipped because their connections are not all known."""
+        found, unknown = [], 0
+        for node in self.processors.values():
+            if node.relationships is None or (group_id and node.group_id != group_id):
+                continue
+            if not self.connections_known(node.id):
+                unknown += 1
+                continue
+            connected = set()
+            for connection_id in self._outgoing.get(node.id, ()):
+                connected.update(self.connections[connection_id].relationships)
+            missing = sorted(name for name, auto in node.relationships.items() if not auto and name not in connected)
+            if missing:
+                found.append((node, missing))
+        return found, unknown
+
+    def stats(self):
+        return {
+            "processors": len(self.processors),
+            "process_groups": len(self.groups),
+            "connections": len(self.connections),
+            "groups_with_listed_connections": len(self._listed_groups),
+            "observed_results": self._observed,
+            "synced_seconds_ago": None if self._synced_at is None else round(self._clock() - self._synced_at, 1),
+        }
+
+
+class IndexingClient:
+    """Feeds every tool result passing through the wrapped MCP client into a FlowIndex."""
+
+    def __init__(self, client, index):
+        self._client = client
+        self._index = index
+
+    async def call_tool(self, name, arguments):
+        sequence = self._index.begin()
+        result = await self._client.call_tool(name, arguments)
+        try:
+            self._index.observe(name, arguments or {}, result, sequence)
+        except Exception as e:
+            logger.warning(f"Flow index could not apply {name} result: {e}")
+        return result
+
+    async def list_tools(self):
+        return await self._client.list_tools()
+
+
+def create_flow_index_tools(index, inspector):
+    """Build the local flow query tools; `inspector` runs the full walk when the index needs a sync."""
+
+    lock = asyncio.Lock()
+
+    async def ensure_synced():
+        async with lock:
+            if not index.needs_sync():
+                return
+            # The walk's results reach the index through IndexingClient
+            report = await inspector.inspect()
+            index.mark_synced()
+            logger.info(f"Flow index synced in {report['elapsed_seconds']}s: {index.stats()}"
+                        f"{' (truncated)' if report['truncated'] else ''}, {len(report['errors'])} errors")
+
+    def with_index_stats(results, total):
+        return {"results": results[:MAX_RESULTS], "total": total, "index": index.stats()}
+
+    def incomplete(result, note):
+        return {**result, "connections_complete": False, "note": note}
+
+    async def find_processors(
+        name: Optional[str] = None,
+        processor_type: Optional[str] = None,
+        process_group_id: Optional[str] = None,
+        state: Optional[str] = None,
+    ) -> dict:
+        """Finds processors in the local flow index without calling NiFi.
+
+        Args:
+            name: Part of the processor name (case-insensitive). Optional.
+            processor_type: Full or short processor type, e.g. "PutKafka" or
+                "org.apache.nifi.processors.standard.LogAttribute". Optional.
+            process_group_id: Only processors directly in this group. Optional.
+            state: RUNNING, STOPPED, INVALID or DISABLED. Optional.
+
+        Returns:
+            dict: matching processors (ID, name, type, group ID, state) and the index size.
+        """
+        await ensure_synced()
+        found = index.find_processors(name, processor_type, process_group_id, state)
+        return with_index_stats([node.summary() for node in found], len(found))
+
+    async def get_flow_neighbors(processor: str, direction: Optional[str] = None, depth: Optional[int] = None) -> dict:
+        """Lists the processors upstream or downstream of a processor, from the local flow index.
+
+        Args:
+            processor: Processor ID or exact processor name.
+            direction: "upstream" (processors feeding it, the default) or "downstream" (processors it feeds).
+            depth: How many connection hops to follow. Optional, 1 when omitted; -1 follows every hop.
+
+        Returns:
+            dict: for each neighbour, the processor, its distance in hops and the relationships of the
+            connection that reached it. connections_complete is false when some connections may be
+            missing from the index; then check with list_processors/get_processor_details.
+        """
+        await ensure_synced()
+        ids = index.resolve(processor)
+        if not ids:
+            return {"error": f"no processor with ID or name '{processor}' in the flow index", "index": index.stats()}
+        if len(ids) > 1:
+            return {"error": f"'{processor}' matches {len(ids)} processors; use an ID",
+                    "candidates": [index.processors[i].summary() for i in ids[:MAX_RESULTS]]}
+        depth = 1 if depth is None else depth
+        found = index.neighbors(ids[0], "downstream" if direction == "downstream" else "upstream",
+                                None if depth < 0 else depth)
+        results = [
+            {**(index.processors[other].summary() if other in index.processors else {"id": other}),
+             "hops": hops, "relationships": relationships}
+            for other, hops, relationships in found
+        ]
+        result = {"processor": index.processors[ids[0]].summary(), **with_index_stats(results, len(results))}
+        if not all(index.connections_known(i) for i in [ids[0], *(other for other, _, _ in found)]):
+            return incomplete(result, "The index only knows connections created by this agent or listed by the "
+                                      "server, so neighbours may be missing. Confirm with the NiFi inspection tools.")
+        return {**result, "connections_complete": True}
+
+    async def find_unconnected_relationships(process_group_id: Optional[str] = None) -> dict:
+        """Lists processor relationships that are neither connected nor auto-terminated, from the local index.
+
+        Only processors whose relationships are known (seen in a listing or get_processor_details) and whose
+        connections are all in the index (created by the agent or listed by the server) are checked.
+
+        Args:
+            process_group_id: Only processors directly in this group. Optional.
+
+        Returns:
+            dict: processors with their unconnected relationship names. connections_complete is false when
+            some processors were skipped because their connections are unknown.
+        """
+        await ensure_synced()
+        found, unknown = index.unconnected_relationships(process_group_id)
+        results = [{**node.summary(), "unconnected": missing} for node, missing in found]
+        result = with_index_stats(results, len(results))
+        if unknown:
+            return incomplete({**result, "skipped_processors": unknown},
+                              f"{unknown} processor(s) were not checked because their connections are not in the "
+                              "index. Check them with get_processor_details and the NiFi inspection tools.")
+        return {**result, "connections_complete": True}
+
+    return [find_processors, get_flow_neighbors, find_unconnected_relationships]
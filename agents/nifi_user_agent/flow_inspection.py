@@ -0,0 +1,187 @@
+"""
+Fan-out inspection of a whole process-group hierarchy for FLOW_INSPECTION.
+
+Instead of one list_processors/get_process_groups call per LLM turn, the model calls
+inspect_flow once. The inspector walks the process-group tree breadth-first and issues
+the listing calls of every discovered group concurrently, up to a concurrency cap. It
+returns one compact summary: counts by state and type, a per-group overview, invalid
+processors, and optionally the processors in a requested state.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Optional
+
+from .flow_plan import tool_result_text
+from .tool_cache import parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds on the lists in a summary, so one result stays small on large canvases
+MAX_LISTED_GROUPS = 50
+MAX_LISTED_PROCESSORS = 100
+MAX_LISTED_INVALID = 20
+
+
+def _entity_list(payload, key):
+    """Entities under `key` ("processors", "processGroups") of a listing payload."""
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    return [item for item in items or [] if isinstance(item, dict) and item.get("id")]
+
+
+def _processor_state(entity):
+    component = entity.get("component") or {}
+    status = entity.get("status") or {}
+    state = (status.get("runStatus") or component.get("state") or "UNKNOWN").upper()
+    if state == "STOPPED" and (component.get("validationErrors") or component.get("validationStatus") == "INVALID"):
+        return "INVALID"
+    return state
+
+
+class _Group:
+    __slots__ = ("id", "name", "path", "depth", "states")
+
+    def __init__(self, group_id, name, path, depth):
+        self.id = group_id
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.states = Counter()
+
+
+class FlowInspector:
+    """Breadth-first, concurrent inspection of a process-group tree through an MCP client."""
+
+    def __init__(self, client, max_concurrency=8, max_groups=500):
+        self._client = client
+        self._max_concurrency = max_concurrency
+        self._max_groups = max_groups
+
+    async def inspect(self, process_group_id=None, max_depth=None, processor_state=None):
+        start = time.perf_counter()
+        if not process_group_id:
+            result = await self._client.call_tool("get_root_process_group_id", {})
+            if getattr(result, "isError", False):
+                error = tool_result_text(result) or "tool returned an error"
+                logger.warning(f"Inspection could not read the root process group ID: {error}")
+                return {
+                    "process_group_id": None,
+                    "groups_inspected": 0,
+                    "errors": [{"tool": "get_root_process_group_id", "error": error}],
+                    "elapsed_seconds": round(time.perf_counter() - start, 3),
+                }
+            process_group_id = tool_result_text(result).strip()
+        wanted_state = processor_state.upper() if processor_state else None
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        groups = [_Group(process_group_id, "", "/", 0)]
+        seen = {process_group_id}
+        states, types = Counter(), Counter()
+        matching, invalid, errors = [], [], []
+        truncated = False
+
+        async def call(name, group):
+            async with semaphore:
+                result = await self._client.call_tool(name, {"process_group_id": group.id})
+            if getattr(result, "isError", False):
+                raise RuntimeError(tool_result_text(result) or "tool returned an error")
+            return parse_tool_result(result)
+
+        async def list_processors(group):
+            for entity in _entity_list(await call("list_processors", group), "processors"):
+                component = entity.get("component") or {}
+                state = _processor_state(entity)
+                processor_type = (component.get("type") or "unknown").rsplit(".", 1)[-1]
+                group.states[state] += 1
+                states[state] += 1
+                types[processor_type] += 1
+                summary = {"id": entity["id"], "name": component.get("name"), "type": processor_type, "group": group.path}
+                if state == "INVALID" and len(invalid) < MAX_LISTED_INVALID:
+                    invalid.append({**summary, "errors": (component.get("validationErrors") or [])[:2]})
+                if wanted_state and state == wanted_state and len(matching) < MAX_LISTED_PROCESSORS:
+                    matching.append(summary)
+
+        async def list_children(group):
+            nonlocal truncated
+            if max_depth is not None and group.depth >= max_depth:
+                return []
+            children = []
+            for entity in _entity_list(await call("get_process_groups", group), "processGroups"):
+                if entity["id"] in seen:
+                    continue
+                if len(seen) >= self._max_groups:
+                    truncated = True
+                    break
+                seen.add(entity["id"])
+                name = (entity.get("component") or {}).get("name") or entity["id"]
+                children.append(_Group(entity["id"], name, f"{group.path.rstrip('/')}/{name}", group.depth + 1))
+            return children
+
+        async def visit(group):
+            # Both listings of a group run concurrently; failures are reported, not fatal
+            processors, children = await asyncio.gather(list_processors(group), list_children(group), return_exceptions=True)
+            for tool, outcome in (("list_processors", processors), ("get_process_groups", children)):
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Inspection of group {group.id} failed in {tool}: {outcome}")
+                    errors.append({"process_group_id": group.id, "tool": tool, "error": str(outcome)})
+            return [] if isinstance(children, Exception) else children
+
+        # One level at a time, with every group of the level inspected concurrently
+        level = groups
+        while level:
+            results = await asyncio.gather(*(visit(group) for group in level))
+            level = [child for children in results for child in children]
+            groups.extend(level)
+
+        summary = {
+            "process_group_id": process_group_id,
+            "groups_inspected": len(groups),
+            "max_depth": max(group.depth for group in groups),
+            "processor_count": sum(states.values()),
+            "processors_by_state": dict(states),
+            "processor_types": dict(types.most_common(20)),
+            "groups": [
+                {"id": group.id, "name": group.name, "path": group.path, "processors": dict(group.states)}
+                for group in groups[:MAX_LISTED_GROUPS]
+            ],
+            "invalid_processors": invalid,
+            "errors": errors,
+            "truncated": truncated,
+        }
+        if len(groups) > MAX_LISTED_GROUPS:
+            summary["groups_omitted"] = len(groups) - MAX_LISTED_GROUPS
+        if wanted_state:
+            summary["processors"] = matching
+            summary["processors_omitted"] = max(states[wanted_state] - len(matching), 0)
+        summary["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+
+def create_flow_inspection_tool(client, max_concurrency=8, max_groups=500):
+    """Build the inspect_flow function tool bound to an MCP client."""
+    inspector = FlowInspector(client, max_concurrency=max_concurrency, max_groups=max_groups)
+
+    async def inspect_flow(
+        process_group_id: Optional[str] = None, max_depth: Optional[int] = None, processor_state: Optional[str] = None
+    ) -> dict:
+        """Inspects a process group and every process group nested in it in one call.
+
+        Use this for FLOW_INSPECTION questions about more than one process group, such as what is running,
+        stopped or invalid across the flow. All groups are listed concurrently.
+
+        Args:
+            process_group_id: Group to start from. Optional, the root group is used when omitted.
+            max_depth: How many levels of nested groups to include. Optional, all levels when omitted.
+            processor_state: Optional state (RUNNING, STOPPED, INVALID or DISABLED). When set, the processors in
+                that state are listed with their IDs and group paths.
+
+        Returns:
+            dict: processor counts by state and type, each group's path and processor counts by state,
+            invalid processors with their first validation errors, the processors in processor_state if
+            requested, and any groups that could not be listed.
+        """
+        return await inspector.inspect(process_group_id, max_depth=max_depth, processor_state=processor_state)
+
+    return inspect_flow
@@ -0,0 +1,361 @@
+"""
+Plan-then-execute support for FLOW_CONSTRUCTION.
+
+Instead of one create_* call per LLM turn, the model submits the whole construction
+plan once as a small DAG (process groups, processors, connections). The executor creates
+independent components concurrently, adds each connection as soon as both endpoint IDs
+are known, and rolls back what it created if any step fails. Components the plan gives no
+position are laid out on their canvas first (layout.py), so the model never picks coordinates.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from .layout import entity_position, layered_layout, origin_below
+from .tool_cache import iter_entities, parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+
+class PlanError(ValueError):
+    """The submitted plan is malformed; nothing was created."""
+
+
+class DependencyFailed(Exception):
+    """A step was skipped because a component it depends on was not created."""
+
+
+def tool_result_text(result):
+    """Plain text of an MCP CallToolResult."""
+    return "".join(getattr(item, "text", "") or "" for item in getattr(result, "content", None) or [])
+
+
+def _created_entity(result):
+    """(id, revision version) of the component returned by a create_* tool."""
+    if getattr(result, "isError", False):
+        raise RuntimeError(tool_result_text(result) or "tool returned an error")
+    for component_id, version, _ in iter_entities(parse_tool_result(result)):
+        return component_id, version
+    raise RuntimeError(f"could not find the created component ID in: {tool_result_text(result)[:200]}")
+
+
+class _Step:
+    def __init__(self, kind, ref, spec, group, endpoints=()):
+        self.kind = kind
+        self.ref = ref
+        self.spec = spec
+        # Parent process group (plan ref or NiFi ID, None for the plan's top-level group)
+        self.group = group
+        self.deps = [dep for dep in (group, *endpoints) if dep]
+
+
+def _items(plan, key, string_fields):
+    """The plan's list under `key`, checked to hold objects whose `string_fields` are strings when set."""
+    items = plan.get(key) or []
+    if not isinstance(items, list):
+        raise PlanError(f"'{key}' must be a list")
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise PlanError(f"{key} #{i} must be an object, got {item!r}")
+        for field in string_fields:
+            if item.get(field) is not None and not isinstance(item[field], str):
+                raise PlanError(f"{key} #{i}: '{field}' must be a string, got {item[field]!r}")
+    return items
+
+
+def _group_depths(steps):
+    """Nesting depth of each process group of the plan, 0 for those not inside another plan group."""
+    parents = {step.ref: step.group for step in steps if step.kind == "process_group"}
+    depths = {}
+
+    def depth(ref):
+        if ref not in depths:
+            depths[ref] = depth(parents[ref]) + 1 if parents[ref] in parents else 0
+        return depths[ref]
+
+    for ref in parents:
+        depth(ref)
+    return depths
+
+
+def _check_position(spec):
+    position = spec.get("position")
+    if position is None:
+        return
+    valid = isinstance(position, dict) and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in (position.get("x", 0.0), position.get("y", 0.0)))
+    if not valid:
+        raise PlanError(f"'{spec.get('ref')}' has an invalid position {position!r}: expected an object with numeric x and y")
+
+
+def _check_acyclic(steps):
+    """Reject refs that depend on themselves, e.g. a group whose parent is a processor in that group."""
+    deps = {step.ref: step.deps for step in steps}
+    done = set()
+    for start in deps:
+        if start in done:
+            continue
+        # Depth-first; `path` is the chain of refs from `start` being visited
+        path, stack = [start], [iter(deps[start])]
+        while stack:
+            dep = next((d for d in stack[-1] if d in deps and d not in done), None)
+            if dep is None:
+                done.add(path.pop())
+                stack.pop()
+            elif dep in path:
+                cycle = path[path.index(dep):] + [dep]
+                raise PlanError(f"plan refs form a cycle: {' -> '.join(cycle)}")
+            else:
+                path.append(dep)
+                stack.append(iter(deps[dep]))
+
+
+class FlowPlanExecutor:
+    """Executes a construction plan against an MCP client (pool or cache wrapper)."""
+
+    def __init__(self, client, max_concurrency=8, rollback_on_failure=True, auto_layout=True):
+        self._client = client
+        self._max_concurrency = max_concurrency
+        self._rollback_on_failure = rollback_on_failure
+        self._auto_layout = auto_layout
+
+    async def execute(self, plan):
+        start = time.perf_counter()
+        steps = self._build_steps(plan)
+        refs = {step.ref for step in steps if step.kind != "connection"}
+
+        root_id = plan.get("process_group_id")
+        if not root_id:
+            result = await self._client.call_tool("get_root_process_group_id", {})
+            if getattr(result, "isError", False):
+                raise PlanError(f"could not read the root process group ID: {tool_result_text(result)}")
+            root_id = tool_result_text(result).strip()
+        positions = await self._layout(steps, refs, root_id) if self._auto_layout else {}
+
+        futures = {step.ref: asyncio.get_running_loop().create_future() for step in steps}
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        created = []
+        errors = []
+
+        async def resolve(value):
+            # Plan refs resolve to the IDs NiFi returned; anything else is an existing NiFi ID
+            if value in refs:
+                return await futures[value]
+            return value
+
+        async def run(step):
+            try:
+                ids = {dep: await resolve(dep) for dep in step.deps}
+                async with semaphore:
+                    component_id, version = await self._create(step, ids, root_id, positions)
+                created.append({"ref": step.ref, "kind": step.kind, "id": component_id, "version": version})
+                futures[step.ref].set_result(component_id)
+            except DependencyFailed as e:
+                errors.append({"ref": step.ref, "kind": step.kind, "error": str(e), "skipped": True})
+                futures[step.ref].set_exception(DependencyFailed(f"{step.ref} was not created"))
+            except Exception as e:
+                logger.warning(f"Plan step {step.ref} ({step.kind}) failed: {e}")
+                errors.append({"ref": step.ref, "kind": step.kind, "error": str(e)})
+                futures[step.ref].set_exception(DependencyFailed(f"{step.ref} was not created"))
+
+        await asyncio.gather(*(run(step) for step in steps))
+        for future in futures.values():
+            # Failures were already recorded; mark them retrieved so asyncio does not warn
+            if future.done() and not future.cancelled():
+                future.exception()
+
+        report = {
+            "status": "success" if not errors else "failed",
+            "process_group_id": root_id,
+            "created": created,
+            "errors": errors,
+        }
+        if positions:
+            report["auto_positioned"] = len(positions)
+        if errors and self._rollback_on_failure and created:
+            report["rolled_back"], report["rollback_errors"] = await self._rollback(created, _group_depths(steps))
+            report["status"] = "rolled_back" if not report["rollback_errors"] else "partially_rolled_back"
+            report["created"] = [c for c in created if c["ref"] not in {r["ref"] for r in report["rolled_back"]}]
+        report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return report
+
+    def _build_steps(self, plan):
+        if not isinstance(plan, dict):
+            raise PlanError("plan must be an object with process_groups, processors and connections")
+        steps = []
+        seen = set()
+        processor_groups = {}
+
+        def add(kind, ref, spec, group, endpoints=()):
+            if not ref:
+                raise PlanError(f"every {kind} needs a 'ref'")
+            if ref in seen:
+                raise PlanError(f"duplicate ref '{ref}'")
+            seen.add(ref)
+            steps.append(_Step(kind, ref, spec, group, endpoints))
+
+        for spec in _items(plan, "process_groups", ("ref", "parent")):
+            _check_position(spec)
+            add("process_group", spec.get("ref"), spec, spec.get("parent"))
+        for spec in _items(plan, "processors", ("ref", "processor_type", "name", "process_group")):
+            for key in ("processor_type", "name"):
+                if not spec.get(key):
+                    raise PlanError(f"processor '{spec.get('ref')}' is missing '{key}'")
+            _check_position(spec)
+            add("processor", spec.get("ref"), spec, spec.get("process_group"))
+            processor_groups[spec["ref"]] = spec.get("process_group")
+        for i, spec in enumerate(_items(plan, "connections", ("ref", "source", "target", "process_group"))):
+            if not spec.get("source") or not spec.get("target") or not isinstance(spec.get("relationships"), list) \
+                    or not spec["relationships"]:
+                raise PlanError(f"connection #{i} needs source, target and relationships")
+            # Connections live in the source processor's group unless the plan says otherwise
+            group = spec.get("process_group") or processor_groups.get(spec["source"])
+            add("connection", spec.get("ref") or f"connection-{i}", spec, group, (spec["source"], spec["target"]))
+
+        _check_acyclic(steps)
+        return steps
+
+    async def _layout(self, steps, refs, root_id):
+        """Positions by ref for the plan's process groups and processors that have none, per canvas."""
+        canvases = defaultdict(lambda: {"nodes": [], "edges": [], "fixed": {}})
+        for step in steps:
+            canvas = canvases[step.group or root_id]
+            if step.kind == "connection":
+                canvas["edges"].append((step.spec["source"], step.spec["target"]))
+            elif step.spec.get("position"):
+                position = step.spec["position"]
+                canvas["fixed"][step.ref] = (float(position.get("x", 0.0)), float(position.get("y", 0.0)))
+            else:
+                canvas["nodes"].append(step.ref)
+
+        async def existing(group_id):
+            # Groups created by the plan start empty; existing ones are listed (usually from the tool cache)
+            if group_id in refs:
+                return {}
+            listings = (("list_processors", "processors"), ("get_process_groups", "processGroups"))
+            results = await asyncio.gather(
+                *(self._client.call_tool(tool, {"process_group_id": group_id}) for tool, _ in listings),
+                return_exceptions=True)
+            found = {}
+            for (_, key), result in zip(listings, results):
+                if isinstance(result, Exception) or getattr(result, "isError", False):
+                    logger.warning(f"Could not list {key} of {group_id} for the layout: {result}")
+                    continue
+                payload = parse_tool_result(result)
+                items = payload.get(key) if isinstance(payload, dict) else payload
+                for entity in items or []:
+                    position = entity_position(entity) if isinstance(entity, dict) else None
+                    if position and entity.get("id"):
+                        found[entity["id"]] = position
+            return found
+
+        pending = {group_id: canvas for group_id, canvas in canvases.items() if canvas["nodes"]}
+        listed = await asyncio.gather(*(existing(group_id) for group_id in pending))
+        positions = {}
+        for canvas, components in zip(pending.values(), listed):
+            anchors = {**components, **canvas["fixed"]}
+            positions.update(layered_layout(canvas["nodes"], canvas["edges"], anchors, origin_below(anchors.values())))
+        return positions
+
+    async def _create(self, step, ids, root_id, positions):
+        spec = step.spec
+        group_id = ids.get(step.group) or root_id
+        if step.kind == "process_group":
+            arguments = {
+                "process_group_id": group_id,
+                "name": spec.get("name") or step.ref,
+                "position": spec.get("position") or positions.get(step.ref) or {"x": 0.0, "y": 0.0},
+            }
+            result = await self._client.call_tool("create_process_group", arguments)
+        elif step.kind == "processor":
+            arguments = {
+                "process_group_id": group_id,
+                "processor_type": spec["processor_type"],
+                "name": spec["name"],
+                "position": spec.get("position") or positions.get(step.ref) or {"x": 0.0, "y": 0.0},
+            }
+            if spec.get("config"):
+                arguments["config"] = spec["config"]
+            result = await self._client.call_tool("create_processor", arguments)
+        else:
+            arguments = {
+                "process_group_id": group_id,
+                "source_id": ids[spec["source"]],
+                "target_id": ids[spec["target"]],
+                "relationships": list(spec["relationships"]),
+            }
+            result = await self._client.call_tool("create_connection", arguments)
+        return _created_entity(result)
+
+    async def _rollback(self, created, group_depths):
+        rolled_back, rollback_errors = [], []
+        # Connections, then processors, then process groups deepest first: a group is deleted once it is empty
+        phases = [[c for c in created if c["kind"] == "connection"], [c for c in created if c["kind"] == "processor"]]
+        groups = [c for c in created if c["kind"] == "process_group"]
+        for depth in sorted({group_depths.get(c["ref"], 0) for c in groups}, reverse=True):
+            phases.append([c for c in groups if group_depths.get(c["ref"], 0) == depth])
+        tools = {"connection": "delete_connection", "processor": "delete_processor", "process_group": "delete_process_group"}
+        id_args = {"connection": "connection_id", "processor": "processor_id", "process_group": "process_group_id"}
+        available = {tool.name for tool in getattr(await self._client.list_tools(), "tools", [])}
+
+        for batch in phases:
+            if not batch:
+                continue
+            kind = batch[0]["kind"]
+            if available and tools[kind] not in available:
+                rollback_errors.extend({"ref": c["ref"], "id": c["id"], "error": f"{tools[kind]} is not available"} for c in batch)
+                continue
+
+            async def delete(component, kind=kind):
+                arguments = {id_args[kind]: component["id"], "version": component["version"]}
+                result = await self._client.call_tool(tools[kind], arguments)
+                if getattr(result, "isError", False):
+                    raise RuntimeError(tool_result_text(result))
+
+            results = await asyncio.gather(*(delete(c) for c in batch), return_exceptions=True)
+            for component, outcome in zip(batch, results):
+                if isinstance(outcome, Exception):
+                    rollback_errors.append({"ref": component["ref"], "id": component["id"], "error": str(outcome)})
+                else:
+                    rolled_back.append({"ref": component["ref"], "id": component["id"]})
+        return rolled_back, rollback_errors
+
+
+def create_flow_plan_tool(client, max_concurrency=8, auto_layout=True):
+    """Build the execute_flow_plan function tool bound to an MCP client."""
+    executor = FlowPlanExecutor(client, max_concurrency=max_concurrency, auto_layout=auto_layout)
+
+    async def execute_flow_plan(plan: dict) -> dict:
+        """Creates a whole NiFi flow in one call from a construction plan.
+
+        Use this for FLOW_CONSTRUCTION whenever more than one component is created.
+        Components are created concurrently; connections are added once both ends exist.
+        If any step fails, everything created by the plan is deleted again and the errors are reported.
+        Leave out positions: components are laid out on the canvas along their connections, below the
+        components already there. This is also the way to add a single processor connected to existing ones.
+
+        Args:
+            plan: Object with these keys:
+                process_group_id: Parent group for top-level components (from get_root_process_group_id()).
+                    Optional, the root group is used when omitted.
+                process_groups: List of {"ref", "name", "parent": ref or ID (optional)}.
+                processors: List of {"ref", "processor_type" (exact type from get_processor_types()), "name",
+                    "config": {"properties": {...}} (optional), "process_group": ref or ID (optional)}.
+                A "position": {"x", "y"} on a group or processor is used as given, only when the user asked for one.
+                connections: List of {"source": ref or ID, "target": ref or ID,
+                    "relationships": [names], "process_group": ref or ID (optional)}.
+                "ref" is any short label you choose, used only to link components inside the plan.
+
+        Returns:
+            dict: status ("success", "failed", "rolled_back" or "partially_rolled_back"), the exact NiFi IDs
+            and revision versions of every created component keyed by ref, and any errors.
+        """
+        try:
+            return await executor.execute(plan)
+        except PlanError as e:
+            return {"status": "invalid_plan", "error": str(e)}
+
+    return execute_flow_plan
@@ -0,0 +1,238 @@
+"""
+Local intent classifier that labels a request before the model is called.
+
+Keyword/regex rules give every intent a score; when labelled requests are available
+(JSONL lines with "text" and "intent"), a hashed bag-of-words naive Bayes model trained
+on them is blended in. Both run on the CPU in well under a millisecond. Classifications
+below the confidence threshold return no intent, and the model classifies the request
+itself as the prompt instructs. So do requests that refer to the user's own flow ("my current
+ConsumeKafka processor") but score highest for an intent that needs no NiFi state: they must not
+be answered by the fast-path agent, which cannot look at the flow.
+"""
+
+import atexit
+import json
+import logging
+import math
+import queue
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener
+
+from .prompt import (
+    DISCOVERY,
+    FLOW_CONSTRUCTION,
+    FLOW_INSPECTION,
+    FLOW_INTENTS,
+    FLOW_MANAGEMENT,
+    INFORMATION_ONLY,
+    INTENTS,
+)
+
+logger = logging.getLogger(__name__)
+
+# (pattern, weight) per intent, matched case-insensitively against the request text
+INTENT_RULES = {
+    INFORMATION_ONLY: [
+        (r"\b(how (do|does|should|can|to)|why|explain|what is|what are|difference between)\b", 1.0),
+        (r"\b(best practices?|recommend\w*|guidance|advice|should i|tuning|tune|when to use)\b", 1.5),
+        (r"\b(back ?pressure|concurrent tasks|scheduling strategy|provenance|clustering)\b", 0.5),
+    ],
+    FLOW_INSPECTION: [
+        (r"\b(show|list|display|inspect|view|describe)\b.*\b(processors?|flows?|process groups?|connections?|canvas)\b", 2.0),
+        (r"\b(what'?s|what is) (running|deployed|on the canvas|in (the|my) (flow|canvas|process group))\b", 2.5),
+        (r"\b(existing|current|currently|status of|details (of|for)|configured)\b", 1.0),
+        (r"\b(my|our)\b", 1.0),
+    ],
+    FLOW_CONSTRUCTION: [
+        (r"\b(create|build|add|set ?up|make|design|deploy|implement)\b.*\b(pipelines?|flows?|processors?|connections?|process groups?)\b", 2.5),
+        (r"\bconnect\b.*\bto\b", 1.0),
+        (r"\b(from|reads? from|ingest\w*)\b.*\b(to|into|writes? to)\b", 0.75),
+    ],
+    FLOW_MANAGEMENT: [
+        (r"\b(delete|remove|drop|tear ?down|clean ?up|get rid of)\b", 3.0),
+        (r"\b(disconnect|unlink)\b", 1.5),
+    ],
+    DISCOVERY: [
+        (r"\b(which|what) (processors?|processor types?|components?)\b.*\b(available|exist|can|support\w*|for|to)\b", 2.5),
+        (r"\b(available|supported) (processors?|processor types?|components?)\b", 2.5),
+        (r"\b(which|what) (processors?|components?)\b.*\b(reads?|writes?|consumes?|publish(es)?|produces?|fetch(es)?|"
+         r"puts?|sends?|receives?|listens?|converts?|handles?)\b", 2.5),
+        (r"\bprocessor types?\b", 1.5),
+        (r"\b(is there a processor|do you have a processor|capabilit\w+)\b", 1.5),
+    ],
+}
+
+# The user's own flow: "my/our/current/existing ... processor/flow/...", or a component named in the request
+OWN_FLOW_PATTERN = (
+    r"\b(my|our|current|existing|deployed|running)\b(\s+[\w-]+){0,2}?\s+"
+    r"(processors?|flows?|pipelines?|connections?|process groups?|groups?|canvas)\b"
+    r"|\b(processors?|process groups?|groups?|connections?)\s+(named|called)\b"
+)
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+
+@dataclass
+class Classification:
+    # None when the confidence is below the threshold
+    intent: str
+    # Best-scoring intent, even when below the threshold
+    label: str
+    confidence: float
+    source: str
+    elapsed_ms: float
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over hashed unigrams and bigrams (NumPy)."""
+
+    def __init__(self, n_features=4096, alpha=0.5):
+        import numpy as np
+
+        self._np = np
+        self.n_features = n_features
+        self.alpha = alpha
+        self.log_prior = None
+        self.log_likelihood = None
+
+    def _features(self, text):
+        tokens = _TOKEN.findall(text.lower())
+        grams = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+        indices = [zlib.crc32(gram.encode()) % self.n_features for gram in grams]
+        return self._np.bincount(indices, minlength=self.n_features).astype(self._np.float32)
+
+    def fit(self, texts, intents):
+        np = self._np
+        counts = np.zeros((len(INTENTS), self.n_features), dtype=np.float32)
+        priors = np.zeros(len(INTENTS), dtype=np.float32)
+        for text, intent in zip(texts, intents):
+            row = INTENTS.index(intent)
+            counts[row] += self._features(text)
+            priors[row] += 1
+        smoothed = counts + self.alpha
+        self.log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self.log_prior = np.log((priors + 1) / (priors.sum() + len(INTENTS)))
+        return self
+
+    def predict_proba(self, text):
+        np = self._np
+        scores = self.log_likelihood @ self._features(text) + self.log_prior
+        scores = np.exp(scores - scores.max())
+        return dict(zip(INTENTS, (scores / scores.sum()).tolist()))
+
+
+class IntentClassifier:
+    """Rule-based classifier with an optional trained model blended in."""
+
+    def __init__(self, threshold=0.6, model_weight=0.5, log_path=None):
+        self.threshold = threshold
+        self.model_weight = model_weight
+        self.log_path = log_path
+        self.model = None
+        self._rules = {
+            intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+            for intent, rules in INTENT_RULES.items()
+        }
+        self._own_flow = re.compile(OWN_FLOW_PATTERN, re.IGNORECASE)
+        self._counts = {intent: 0 for intent in INTENTS}
+        self._fallbacks = 0
+        self._own_flow_fallbacks = 0
+        self._training_log = None
+        if log_path:
+            # Lines are written by a listener thread, so classify() never touches the file
+            file_handler = logging.FileHandler(log_path, encoding="utf-8", delay=True)
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            log_queue = queue.SimpleQueue()
+            self._training_log = logging.getLogger(f"{__name__}.training")
+            self._training_log.handlers = [QueueHandler(log_queue)]
+            self._training_log.setLevel(logging.INFO)
+            self._training_log.propagate = False
+            listener = QueueListener(log_queue, file_handler)
+            listener.start()
+            atexit.register(listener.stop)
+
+    def train_from_log(self, path):
+        """Fit the NumPy model from JSONL lines with "text" and "intent". Returns the example count."""
+        texts, intents = [], []
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    if row.get("text") and row.get("intent") in INTENTS:
+                        texts.append(row["text"])
+                        intents.append(row["intent"])
+        except FileNotFoundError:
+            logger.info(f"No intent training data at {path}; using rules only")
+            return 0
+        if not texts:
+            return 0
+        try:
+            self.model = NaiveBayesIntentModel().fit(texts, intents)
+        except ImportError:
+            logger.warning("numpy is not installed; using rule-based intent classification only")
+            return 0
+        logger.info(f"Trained intent model on {len(texts)} logged requests from {path}")
+        return len(texts)
+
+    def _rule_scores(self, text):
+        scores = {}
+        for intent, rules in self._rules.items():
+            scores[intent] = sum(weight for pattern, weight in rules if pattern.search(text))
+        return scores
+
+    def classify(self, text):
+        start = time.perf_counter()
+        scores = self._rule_scores(text)
+        total = sum(scores.values())
+        # Softmax over rule scores; no rule hit means a uniform (low-confidence) distribution
+        exp = {intent: math.exp(score) for intent, score in scores.items()}
+        norm = sum(exp.values())
+        proba = {intent: value / norm for intent, value in exp.items()}
+        source = "rules"
+        if self.model is not None:
+            model_proba = self.model.predict_proba(text)
+            weight = self.model_weight if total else 1.0
+            proba = {intent: (1 - weight) * proba[intent] + weight * model_proba[intent] for intent in INTENTS}
+            source = "rules+model" if total else "model"
+
+        label = max(proba, key=proba.get)
+        confidence = proba[label]
+        intent = label if confidence >= self.threshold else None
+        if intent and intent not in FLOW_INTENTS and self._own_flow.search(text):
+            # Answering needs the flow itself: leave it to the full agent
+            intent = None
+            self._own_flow_fallbacks += 1
+        if intent:
+            self._counts[intent] += 1
+        else:
+            self._fallbacks += 1
+        result = Classification(intent, label, confidence, source, (time.perf_counter() - start) * 1000)
+        self._log(text, result)
+        return result
+
+    def _log(self, text, result):
+        # Reviewed log lines can be fed back into train_from_log
+        if self._training_log is None:
+            return
+        self._training_log.info(json.dumps({
+            "text": text,
+            "intent": result.label,
+            "confidence": round(result.confidence, 4),
+            "source": result.source,
+            "timestamp": time.time(),
+        }))
+
+    def stats(self):
+        return {
+            "threshold": self.threshold,
+            "model_trained": self.model is not None,
+            "classified": dict(self._counts),
+            "fallbacks_to_llm": self._fallbacks,
+            "own_flow_fallbacks": self._own_flow_fallbacks,
+        }
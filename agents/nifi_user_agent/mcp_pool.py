@@ -0,0 +1,369 @@
+"""
+Pool of warm MCP client sessions to the NiFi MCP server.
+
+Every A2A task used to pay for an SSE connect, the MCP initialize handshake and a
+tools/list round trip. The pool keeps a bounded set of initialized sessions open,
+hands them out to concurrent tool calls, health-checks the idle ones and reconnects
+transparently when the server drops a connection.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, SseServerParams
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
+
+from .tool_cache import is_mutating_tool
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """A single initialized MCP session.
+
+    The SSE client and session contexts are entered and exited inside one background
+    task, since anyio cancel scopes must be closed by the task that opened them.
+    """
+
+    def __init__(self, url, connect_timeout):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.session = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task = None
+        self._error = None
+
+    @property
+    def alive(self):
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def open(self):
+        """Connect and initialize the session. Returns the handshake time in seconds."""
+        start = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise ConnectionError(f"Timed out connecting to MCP server at {self.url}")
+        except asyncio.CancelledError:
+            self._closing.set()  # _run closes the session as soon as the handshake ends
+            raise
+        if not self.alive:
+            await self.close()
+            raise ConnectionError(f"Could not connect to MCP server at {self.url}: {self._error}")
+        return time.perf_counter() - start
+
+    async def _run(self):
+        try:
+            async with sse_client(url=self.url) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            logger.warning(f"MCP session to {self.url} ended: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def ping(self, timeout):
+        await asyncio.wait_for(self.session.send_ping(), timeout)
+
+    async def close(self):
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(self._task, self.connect_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        except Exception:
+            pass
+
+
+class McpSessionPool:
+    """Bounded pool of MCP sessions shared by all agent tasks in this process."""
+
+    def __init__(self, url, min_size=1, max_size=4, connect_timeout=10.0, health_check_interval=30.0):
+        if min_size > max_size:
+            raise ValueError("min_size cannot be larger than max_size")
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._cond = asyncio.Condition()
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._closed = False
+        self._health_task = None
+        self._tools = None
+        # Sessions being closed in the background; kept so the tasks are not garbage-collected
+        self._closers = set()
+
+        # Sizing metrics
+        self._acquisitions = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._reconnects = 0
+        self._failed_health_checks = 0
+        self._handshakes = deque(maxlen=100)
+
+    async def start(self):
+        """Open the warm sessions and start the health checker. Safe to call repeatedly."""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self._closed = False
+            await self._fill_to_min_size()
+            if self.health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_check_loop())
+            logger.info(f"MCP session pool started for {self.url} ({len(self._idle)} warm sessions)")
+
+    async def close(self):
+        """Close every session and stop the health checker."""
+        self._closed = True
+        self._started = False
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        async with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        await asyncio.gather(*(conn.close() for conn in idle), *self._closers, return_exceptions=True)
+        logger.info(f"MCP session pool closed: {self.stats()}")
+
+    async def acquire(self):
+        """Check a session out of the pool, opening a new one if the pool is below max_size."""
+        if not self._started:
+            await self.start()
+        self._acquisitions += 1
+        wait_start = None
+        async with self._cond:
+            while True:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.alive:
+                        if wait_start is None:
+                            self._hits += 1
+                        self._checkout(conn, wait_start)
+                        return conn
+                    self._size -= 1
+                    self._in_background(conn.close())
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._misses += 1
+                    break
+                if wait_start is None:
+                    wait_start = time.perf_counter()
+                    self._waits += 1
+                await self._cond.wait()
+
+        try:
+            conn = await self._connect()
+        except BaseException:
+            # Including cancellation, or the reserved slot would never be given back
+            async with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._checkout(conn, wait_start)
+        return conn
+
+    def _checkout(self, conn, wait_start):
+        self._in_use += 1
+        conn.last_used = time.monotonic()
+        if wait_start is not None:
+            self._wait_time += time.perf_counter() - wait_start
+
+    async def release(self, conn):
+        """Return a session to the pool; dead sessions are dropped instead."""
+        self._in_use -= 1
+        if self._closed or not conn.alive:
+            await self._discard(conn)
+            return
+        async with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    async def _discard(self, conn):
+        async with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        await conn.close()
+
+    def _in_background(self, closing):
+        task = asyncio.create_task(closing)
+        self._closers.add(task)
+        task.add_done_callback(self._closed_in_background)
+
+    def _closed_in_background(self, task):
+        self._closers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Closing an MCP session failed: {task.exception()!r}")
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow an initialized ClientSession for the duration of the block."""
+        conn = await self.acquire()
+        try:
+            yield conn.session
+        finally:
+            await self.release(conn)
+
+    async def call_tool(self, name, arguments=None):
+        """Call an MCP tool on a pooled session.
+
+        If the session was dropped, a read is retried once on a new session. A mutating call is
+        not, since it may already have been applied before the connection failed.
+        """
+        for attempt in range(2):
+            conn = await self.acquire()
+            healthy = False
+            try:
+                result = await conn.session.call_tool(name, arguments=arguments or {})
+                healthy = True
+            except McpError:
+                healthy = True  # the server answered with an error; the session is fine
+                raise
+            except Exception as e:
+                error = e
+            finally:
+                if healthy:
+                    await self.release(conn)
+                else:
+                    # Failed or cancelled mid-call (the answer may still arrive), so the session is not reused
+                    self._in_use -= 1
+                    self._in_background(self._discard(conn))
+            if healthy:
+                return result
+            self._reconnects += 1
+            if attempt or is_mutating_tool(name):
+                raise error
+            logger.warning(f"MCP session failed during {name} ({error}); retrying on a new session")
+
+    async def list_tools(self):
+        """Return the server's tool list, fetched once per pool and reused by every task."""
+        if self._tools is None:
+            async with self.session() as session:
+                self._tools = await session.list_tools()
+        return self._tools
+
+    async def _connect(self):
+        conn = PooledConnection(self.url, self.connect_timeout)
+        handshake = await conn.open()
+        self._handshakes.append(handshake)
+        logger.debug(f"Opened MCP session to {self.url} in {handshake * 1000:.1f} ms")
+        return conn
+
+    async def _fill_to_min_size(self):
+        async with self._cond:
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+        if not missing:
+            return
+        results = await asyncio.gather(*(self._connect() for _ in range(missing)), return_exceptions=True)
+        async with self._cond:
+            for result in results:
+                if isinstance(result, Exception):
+                    self._size -= 1
+                    logger.warning(f"Could not open warm MCP session: {result}")
+                else:
+                    self._idle.append(result)
+            self._cond.notify_all()
+
+    async def _health_check_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            await self.health_check()
+
+    async def health_check(self):
+        """Ping idle sessions, drop the ones that do not answer and top the pool back up."""
+        for conn in list(self._idle):
+            try:
+                await conn.ping(self.connect_timeout)
+                continue
+            except Exception as e:
+                logger.warning(f"MCP session health check failed: {e}")
+                self._failed_health_checks += 1
+            async with self._cond:
+                if conn not in self._idle:
+                    continue
+                self._idle.remove(conn)
+            await self._discard(conn)
+            self._reconnects += 1
+        await self._fill_to_min_size()
+
+    def stats(self):
+        """Pool counters used to size MCP_POOL_MIN_SIZE / MCP_POOL_MAX_SIZE."""
+        handshakes = list(self._handshakes)
+        acquisitions = self._acquisitions
+        return {
+            "url": self.url,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "acquisitions": acquisitions,
+            "hits": self._hits,
+            "misses": self._misses,
+            "waits": self._waits,
+            "hit_ratio": self._hits / acquisitions if acquisitions else 0.0,
+            "wait_time_seconds": self._wait_time,
+            "reconnects": self._reconnects,
+            "failed_health_checks": self._failed_health_checks,
+            "handshake_count": len(handshakes),
+            "handshake_avg_ms": sum(handshakes) / len(handshakes) * 1000 if handshakes else 0.0,
+            "handshake_max_ms": max(handshakes) * 1000 if handshakes else 0.0,
+        }
+
+
+class PooledSessionManager:
+    """Stands in for ADK's MCPSessionManager and hands out the shared pool.
+
+    MCPTool and MCPToolset only call create_session() and then session.call_tool() /
+    session.list_tools(); the pool implements both, so every call goes through it.
+    Any wrapper exposing the same two methods (e.g. a cache in front of the pool)
+    can be handed out instead.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    async def create_session(self):
+        return self._client
+
+    async def close(self):
+        # The pool is owned by the server lifecycle, not by a single toolset or runner.
+        pass
+
+
+class PooledMCPToolset(MCPToolset):
+    """MCPToolset whose tools call NiFi through a shared McpSessionPool.
+
+    `client` optionally wraps the pool with extra layers; calls go to the pool directly otherwise.
+    """
+
+    def __init__(self, *, pool, client=None, tool_filter=None):
+        super().__init__(connection_params=SseServerParams(url=pool.url), tool_filter=tool_filter)
+        self._mcp_session_manager = PooledSessionManager(client or pool)
@@ -0,0 +1,341 @@
+"""
+Routing of MCP tool calls across several NiFi MCP endpoints.
+
+NIFI_MCP_ENDPOINTS lists MCP servers, each labelled with the NiFi instance (cluster or
+environment) it talks to; endpoints of the same instance are replicas. Every endpoint has
+its own McpSessionPool, and McpEndpointRouter stands in for the single pool:
+- a call goes to the instance that owns the components named in its arguments. Owners are
+  learned from every result, and each instance's root process group ID is read on start.
+  Calls that name no known component go to the first (default) instance;
+- read-only tools go to the replica with the fewest calls in flight, and are retried once
+  on another replica when an endpoint fails;
+- mutating tools always go to the instance's primary (its first healthy endpoint), so the
+  writes to one NiFi instance are never spread across replicas;
+- an endpoint is ejected after `max_failures` consecutive failures, or when its average
+  latency exceeds `slow_after` seconds and SLOW_FACTOR times that of its fastest healthy
+  replica (so a load spike that slows every replica ejects none). Once `eject_seconds` have
+  passed, the health check probes it and readmits it if it answers. The last healthy endpoint
+  of an instance is never ejected.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from . import metrics
+from .flow_plan import tool_result_text
+from .tool_cache import is_mutating_tool, iter_entities, parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INSTANCE = "default"
+# Weight of the newest call in an endpoint's average latency
+LATENCY_SMOOTHING = 0.2
+# How many times slower than its fastest healthy replica a slow endpoint must be to be ejected
+SLOW_FACTOR = 2.0
+
+
+def is_endpoint_failure(error):
+    """True when the endpoint itself failed, as opposed to an MCP error answer to a valid call."""
+    return not isinstance(error, McpError) or error.error.code == CONNECTION_CLOSED
+
+
+def parse_endpoints(spec):
+    """[(instance, url)] from "prod=http://a:8050/sse,prod=http://b:8050/sse,http://c:8050/sse"."""
+    endpoints = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        instance, _, url = item.partition("=")
+        if not url or "://" in instance:
+            instance, url = DEFAULT_INSTANCE, item
+        endpoints.append((instance.strip(), url.strip()))
+    return endpoints
+
+
+class Endpoint:
+    """One MCP server with its session pool and the load and health figures routing uses."""
+
+    def __init__(self, instance, pool):
+        self.instance = instance
+        self.pool = pool
+        self.url = pool.url
+        self.outstanding = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        # Exponentially weighted average of call latency in seconds
+        self.latency = None
+        self.ejected_until = None
+        self.ejections = 0
+
+    @property
+    def healthy(self):
+        return self.ejected_until is None
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "ejections": self.ejections,
+            "pool": self.pool.stats(),
+        }
+
+
+class McpEndpointRouter:
+    """Spreads MCP tool calls over several endpoints; has the McpSessionPool interface."""
+
+    def __init__(self, endpoints, make_pool, max_failures=3, slow_after=10.0, eject_seconds=30.0,
+                 health_check_interval=30.0, max_owners=100000, clock=time.monotonic):
+        if not endpoints:
+            raise ValueError("at least one MCP endpoint is needed")
+        self.instances = OrderedDict()
+        for instance, url in endpoints:
+            self.instances.setdefault(instance, []).append(Endpoint(instance, make_pool(url)))
+        self.default_instance = next(iter(self.instances))
+        # PooledMCPToolset needs a URL; the calls themselves go through call_tool
+        self.url = endpoints[0][1]
+        self.max_failures = max_failures
+        self.slow_after = slow_after
+        self.eject_seconds = eject_seconds
+        self.health_check_interval = min(health_check_interval, eject_seconds)
+        self._max_owners = max_owners
+        self._clock = clock
+        # Component ID -> instance, least recently seen first
+        self._owners = OrderedDict()
+        self.roots = {}
+        self._health_task = None
+        self._closed = False
+        self._retries = 0
+        self._turn = 0
+
+    @property
+    def endpoints(self):
+        return [endpoint for endpoints in self.instances.values() for endpoint in endpoints]
+
+    async def start(self):
+        """Open every endpoint's warm sessions, read each instance's root group and start the health checks."""
+        self._closed = False
+        await asyncio.gather(*(endpoint.pool.start() for endpoint in self.endpoints))
+        await self._read_roots()
+        if self._health_task is None and self.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_check_loop())
+        logger.info("MCP router started: " + ", ".join(
+            f"{instance} ({len(endpoints)} endpoints, root {self.roots.get(instance)})"
+            for instance, endpoints in self.instances.items()))
+
+    async def close(self):
+        self._closed = True
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*(endpoint.pool.close() for endpoint in self.endpoints), return_exceptions=True)
+
+    async def list_tools(self):
+        """Tool list of the default instance's primary; every endpoint is expected to run the same server."""
+        return await self._primary(self.default_instance).pool.list_tools()
+
+    # -- Routing -----------------------------------------------------------------------
+
+    def instance_for(self, arguments):
+        """Instance owning the first known component ID in the arguments, else the default one."""
+        if len(self.instances) > 1:
+            for value in (arguments or {}).values():
+                if isinstance(value, str) and value in self._owners:
+                    self._owners.move_to_end(value)
+                    return self._owners[value]
+        return self.default_instance
+
+    def _primary(self, instance):
+        endpoints = self.instances[instance]
+        return next((endpoint for endpoint in endpoints if endpoint.healthy), endpoints[0])
+
+    def _least_loaded(self, instance, exclude=()):
+        candidates = [endpoint for endpoint in self.instances[instance] if endpoint not in exclude]
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+        if not candidates:
+            return None
+        # Fewest calls in flight; ties take turns
+        fewest = min(endpoint.outstanding for endpoint in healthy or candidates)
+        tied = [endpoint for endpoint in healthy or candidates if endpoint.outstanding == fewest]
+        self._turn += 1
+        return tied[self._turn % len(tied)]
+
+    async def call_tool(self, name, arguments=None):
+        instance = self.instance_for(arguments)
+        if is_mutating_tool(name):
+            result = await self._send(self._primary(instance), name, arguments)
+        else:
+            endpoint = self._least_loaded(instance)
+            try:
+                result = await self._send(endpoint, name, arguments)
+            except Exception as e:
+                retry = self._least_loaded(instance, exclude=(endpoint,)) if is_endpoint_failure(e) else None
+                if retry is None:
+                    raise
+                logger.warning(f"MCP endpoint {endpoint.url} failed during {name} ({e}); retrying on {retry.url}")
+                self._retries += 1
+                result = await self._send(retry, name, arguments)
+        if len(self.instances) > 1:
+            self._learn(instance, arguments, result)
+        return result
+
+    async def _send(self, endpoint, name, arguments):
+        endpoint.outstanding += 1
+        endpoint.calls += 1
+        start = time.perf_counter()
+        try:
+            result = await endpoint.pool.call_tool(name, arguments)
+        except Exception as e:
+            if not is_endpoint_failure(e):
+                # The server answered; the call itself was wrong
+                metrics.mcp_endpoint_calls.inc(endpoint=endpoint.url, outcome="error")
+                raise
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            metrics.mcp_endpoint_calls.inc(endpoint=endpoint.url, outcome="failed")
+            if endpoint.consecutive_failures >= self.max_failures:
+                self._eject(endpoint, f"{endpoint.consecutive_failures} consecutive failures")
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        elapsed = time.perf_counter() - start
+        endpoint.consecutive_failures = 0
+        endpoint.latency = elapsed if endpoint.latency is None else (
+            LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * endpoint.latency)
+        metrics.mcp_endpoint_calls.inc(endpoint=endpoint.url, outcome="ok")
+        if self._is_slow(endpoint):
+            self._eject(endpoint, f"average latency {endpoint.latency:.1f}s")
+        return result
+
+    def _learn(self, instance, arguments, result):
+        """Remember the instance of every component in the arguments and the result."""
+        if getattr(result, "isError", False):
+            return
+        ids = [value for key, value in (arguments or {}).items() if key.endswith("_id") and isinstance(value, str)]
+        ids.extend(component_id for component_id, _, _ in iter_entities(parse_tool_result(result)))
+        for component_id in ids:
+            self._owners[component_id] = instance
+            self._owners.move_to_end(component_id)
+        while len(self._owners) > self._max_owners:
+            self._owners.popitem(last=False)
+
+    # -- Health ------------------------------------------------------------------------
+
+    def _is_slow(self, endpoint):
+        if not self.slow_after or endpoint.latency is None or endpoint.latency <= self.slow_after:
+            return False
+        peers = [other.latency for other in self.instances[endpoint.instance]
+                 if other is not endpoint and other.healthy and other.latency is not None]
+        return bool(peers) and endpoint.latency > SLOW_FACTOR * min(peers)
+
+    def _eject(self, endpoint, reason):
+        if not endpoint.healthy:
+            return
+        if sum(other.healthy for other in self.instances[endpoint.instance]) <= 1:
+            logger.debug(f"MCP endpoint {endpoint.url} is unhealthy ({reason}) but is the last one of "
+                         f"{endpoint.instance}; keeping it")
+            return
+        endpoint.ejected_until = self._clock() + self.eject_seconds
+        endpoint.ejections += 1
+        logger.warning(f"Ejected MCP endpoint {endpoint.url} ({endpoint.instance}) for {self.eject_seconds:g}s: {reason}")
+
+    async def _read_roots(self):
+        missing = [instance for instance in self.instances if instance not in self.roots]
+
+        async def read(instance):
+            result = await self._send(self._primary(instance), "get_root_process_group_id", {})
+            if getattr(result, "isError", False):
+                raise RuntimeError(tool_result_text(result))
+            root_id = tool_result_text(result).strip()
+            self.roots[instance] = root_id
+            if len(self.instances) > 1:
+                self._owners[root_id] = instance
+
+        for instance, outcome in zip(missing, await asyncio.gather(*(read(i) for i in missing), return_exceptions=True)):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Could not read the root process group of NiFi instance {instance}: {outcome}")
+
+    async def _health_check_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.warning(f"MCP router health check failed: {e}")
+
+    async def health_check(self):
+        """Probe the endpoints whose ejection has run out and readmit those that answer."""
+        now = self._clock()
+        due = [endpoint for endpoint in self.endpoints if not endpoint.healthy and endpoint.ejected_until <= now]
+
+        async def probe(endpoint):
+            # A real call: the pool drops broken sessions on the way, and NiFi behind the server is checked too
+            try:
+                result = await asyncio.wait_for(
+                    endpoint.pool.call_tool("get_root_process_group_id", {}), endpoint.pool.connect_timeout)
+                if getattr(result, "isError", False):
+                    raise RuntimeError(tool_result_text(result))
+            except Exception as e:
+                endpoint.ejected_until = self._clock() + self.eject_seconds
+                logger.warning(f"MCP endpoint {endpoint.url} is still unhealthy: {e!r}")
+                return
+            endpoint.ejected_until = None
+            endpoint.consecutive_failures = 0
+            endpoint.latency = None
+            logger.info(f"Readmitted MCP endpoint {endpoint.url} ({endpoint.instance})")
+
+        await asyncio.gather(*(probe(endpoint) for endpoint in due))
+        if len(self.roots) < len(self.instances):
+            await self._read_roots()
+
+    def stats(self):
+        return {
+            "default_instance": self.default_instance,
+            "instances": {
+                instance: {
+                    "root_process_group_id": self.roots.get(instance),
+                    "endpoints": [endpoint.stats() for endpoint in endpoints],
+                }
+                for instance, endpoints in self.instances.items()
+            },
+            "known_components": len(self._owners),
+            "read_retries": self._retries,
+        }
+
+
+def create_instances_tool(router):
+    """Build the list_nifi_instances function tool for a router over several NiFi instances."""
+
+    async def list_nifi_instances() -> dict:
+        """Lists the NiFi instances (clusters or environments) this agent can work on.
+
+        Tools called with IDs of an instance's components go to that instance. To start on an instance other
+        than the default one, use its root_process_group_id instead of calling get_root_process_group_id(),
+        which always answers for the default instance.
+
+        Returns:
+            dict: per instance, its name, root process group ID, whether it is the default, and how many of
+            its MCP endpoints are healthy.
+        """
+        return {"instances": [
+            {
+                "instance": instance,
+                "root_process_group_id": router.roots.get(instance),
+                "default": instance == router.default_instance,
+                "healthy_endpoints": sum(endpoint.healthy for endpoint in endpoints),
+                "endpoints": len(endpoints),
+            }
+            for instance, endpoints in router.instances.items()
+        ]}
+
+    return list_nifi_instances
@@ -0,0 +1,256 @@
+"""
+Bounded conversation history for the model calls of a multi-turn A2A context.
+
+ADK sends the whole session history on every model call, so in a long NiFi session every
+turn is slower and more expensive than the one before. Before each model call the
+history in the request is compacted to a token budget; the session itself is unchanged:
+- the current turn and the last `recent_turns` turns are sent verbatim;
+- in older turns, tool results are reduced to the IDs and names of the components in them;
+- if that is still over budget, the oldest turns are replaced by one summary listing each
+  turn's request, tools, components and the start of its answer.
+The history size before and after compaction is kept for every model call, per context.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+
+from google.genai import types
+
+from . import config
+from .prompt_builder import contents_tokens, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Session state key holding the A2A context ID, written by the executor on every request
+CONTEXT_ID_STATE_KEY = "nifi_context_id"
+SUMMARY_HEADER = "Summary of earlier turns in this conversation (their tool results are omitted):"
+# Text ADK puts in front of replies of another agent (e.g. the fast path) in the history
+FOREIGN_REPLY_PREFIX = "For context:"
+# Tool results up to this size (JSON characters) are kept as they are in older turns
+KEEP_RESULT_CHARS = 300
+MAX_ENTITIES = 30
+REQUEST_CHARS = 200
+ANSWER_CHARS = 300
+
+
+def _shorten(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _is_user_turn(content):
+    """True for a user message, as opposed to tool results and other agents' replies."""
+    if content.role != "user" or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    first = content.parts[0].text
+    return bool(first) and first != FOREIGN_REPLY_PREFIX
+
+
+def split_turns(contents):
+    """Group the history into turns, each starting with a user message."""
+    turns = []
+    for content in contents:
+        if not turns or _is_user_turn(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _response_payload(response):
+    """Decoded payload of a function response, including MCP CallToolResults."""
+    value = response.get("result", response) if isinstance(response, dict) else response
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json")
+    if isinstance(value, dict) and isinstance(value.get("content"), list):
+        text = "".join(item.get("text") or "" for item in value["content"] if isinstance(item, dict))
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+    return value
+
+
+def produced_entities(payload, limit=MAX_ENTITIES):
+    """{"id", "name", "type"} of the NiFi components in a tool result, in order of appearance."""
+    found, seen = [], set()
+
+    def walk(value):
+        if len(found) >= limit:
+            return
+        if isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, dict):
+            entity_id = value.get("id")
+            if isinstance(entity_id, str) and entity_id not in seen:
+                seen.add(entity_id)
+                component = value.get("component") if isinstance(value.get("component"), dict) else value
+                entity = {"id": entity_id}
+                for key in ("name", "type"):
+                    if isinstance(component.get(key), str) and component[key]:
+                        entity[key] = component[key]
+                found.append(entity)
+            for item in value.values():
+                if isinstance(item, (dict, list)):
+                    walk(item)
+
+    walk(payload)
+    return found
+
+
+def _reduce_part(part):
+    response = part.function_response.response if part.function_response else None
+    if response is None or len(json.dumps(response, default=str)) <= KEEP_RESULT_CHARS:
+        return part, False
+    payload = _response_payload(response)
+    reduced = {"compacted": True, "components": produced_entities(payload)}
+    if isinstance(payload, dict) and isinstance(payload.get("status"), str):
+        reduced["status"] = payload["status"]
+    elif isinstance(payload, str):
+        reduced["text"] = _shorten(payload, KEEP_RESULT_CHARS)
+    function_response = types.FunctionResponse(
+        id=part.function_response.id, name=part.function_response.name, response=reduced)
+    return types.Part(function_response=function_response), True
+
+
+def reduce_turn(turn):
+    """The turn with its large tool results reduced to the components they mention."""
+    reduced_turn, reduced = [], 0
+    for content in turn:
+        parts = []
+        for part in content.parts or []:
+            part, was_reduced = _reduce_part(part)
+            parts.append(part)
+            reduced += was_reduced
+        reduced_turn.append(types.Content(role=content.role, parts=parts) if parts else content)
+    return reduced_turn, reduced
+
+
+def summarize_turn(turn):
+    """One summary entry: the request, the tools called, the components seen and the start of the answer."""
+    request = " ".join(part.text for part in turn[0].parts if part.text) if _is_user_turn(turn[0]) else ""
+    tools, entities, answer = [], {}, ""
+    for content in turn:
+        texts = []
+        for part in content.parts or []:
+            if part.function_call:
+                tools.append(part.function_call.name)
+            elif part.function_response:
+                for entity in produced_entities(_response_payload(part.function_response.response)):
+                    entities.setdefault(entity["id"], entity.get("name") or entity.get("type"))
+            elif part.text and content.role == "model":
+                texts.append(part.text)
+        if texts:
+            answer = "".join(texts)
+    lines = [f"- Request: {_shorten(request, REQUEST_CHARS)}"]
+    if tools:
+        lines.append(f"  Tools: {', '.join(dict.fromkeys(tools))}")
+    if entities:
+        listed = list(entities.items())[:MAX_ENTITIES]
+        lines.append("  Components: " + ", ".join(f"{entity_id} ({name})" if name else entity_id
+                                                 for entity_id, name in listed))
+    if answer:
+        lines.append(f"  Answer: {_shorten(answer, ANSWER_CHARS)}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Compacts the history of each model request to max_tokens and keeps per-turn sizes by context."""
+
+    def __init__(self, max_tokens=8000, recent_turns=2, max_contexts=200, history=50):
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self._max_contexts = max_contexts
+        self._history = history
+        self._contexts = OrderedDict()
+        self._compactions = 0
+
+    def compact(self, contents):
+        """Return the compacted contents and a record of the sizes before and after."""
+        before = contents_tokens(contents)
+        turns = split_turns(contents)
+        record = {"turn": len(turns), "history_tokens": before, "sent_tokens": before,
+                  "reduced_results": 0, "summarized_turns": 0}
+        keep = self.recent_turns + 1
+        if before <= self.max_tokens or len(turns) <= keep:
+            return contents, record
+
+        older, recent = turns[:-keep], turns[-keep:]
+        reduced_older = []
+        for turn in older:
+            reduced_turn, reduced = reduce_turn(turn)
+            reduced_older.append(reduced_turn)
+            record["reduced_results"] += reduced
+        older_tokens = [contents_tokens(turn) for turn in reduced_older]
+        recent_tokens = sum(contents_tokens(turn) for turn in recent)
+
+        # Fold the oldest turns into the summary until the rest fits the budget
+        folded, entries, summary, summary_tokens = 0, [], None, 0
+        while folded < len(older) and summary_tokens + sum(older_tokens[folded:]) + recent_tokens > self.max_tokens:
+            entry = summarize_turn(older[folded])
+            entries.append((entry, count_tokens(entry)))
+            folded += 1
+            summary = self._summary(entries)
+            summary_tokens = count_tokens(summary)
+
+        compacted = [types.Content(role="user", parts=[types.Part(text=summary)])] if summary else []
+        for turn in reduced_older[folded:] + recent:
+            compacted.extend(turn)
+        record["summarized_turns"] = folded
+        record["sent_tokens"] = contents_tokens(compacted)
+        self._compactions += 1
+        return compacted, record
+
+    def _summary(self, entries):
+        """Summary text of the folded turns; the newest entries are kept within a quarter of the budget."""
+        kept, tokens = [], count_tokens(SUMMARY_HEADER)
+        for entry, entry_tokens in reversed(entries):
+            if kept and tokens + entry_tokens > self.max_tokens // 4:
+                break
+            kept.append(entry)
+            tokens += entry_tokens
+        lines = [SUMMARY_HEADER]
+        if len(kept) < len(entries):
+            lines.append(f"- {len(entries) - len(kept)} earlier turns omitted")
+        return "\n".join(lines + kept[::-1])
+
+    def record(self, context_id, record):
+        records = self._contexts.pop(context_id, None) or deque(maxlen=self._history)
+        records.append({**record, "timestamp": time.time()})
+        self._contexts[context_id] = records
+        while len(self._contexts) > self._max_contexts:
+            self._contexts.popitem(last=False)
+
+    def stats(self):
+        return {
+            "max_tokens": self.max_tokens,
+            "recent_turns": self.recent_turns,
+            "contexts": len(self._contexts),
+            "compactions": self._compactions,
+            # The 20 most recently active contexts, newest first
+            "by_context": {
+                context_id: list(records)
+                for context_id, records in list(reversed(self._contexts.items()))[:20]
+            },
+        }
+
+
+conversation_memory = ConversationMemory(
+    max_tokens=config.MEMORY_MAX_HISTORY_TOKENS,
+    recent_turns=config.MEMORY_RECENT_TURNS,
+)
+
+
+def compact_history(callback_context, llm_request):
+    """before_model_callback: fit the request's history into the memory budget."""
+    contents, record = conversation_memory.compact(llm_request.contents)
+    if contents is not llm_request.contents:
+        logger.info(f"History compacted from {record['history_tokens']} to {record['sent_tokens']} tokens "
+                    f"(turn {record['turn']}, {record['summarized_turns']} turns summarized)")
+        llm_request.contents = contents
+    conversation_memory.record(callback_context.state.get(CONTEXT_ID_STATE_KEY), record)
+    return None
@@ -0,0 +1,149 @@
+"""
+Prometheus metrics for tasks, LLM calls and MCP tool calls, served at /metrics.
+
+A small dependency-free implementation of counters, gauges and histograms with labels,
+rendered in the Prometheus text exposition format (version 0.0.4).
+"""
+
+from bisect import bisect_left
+
+# Seconds; covers cached tool calls (ms) up to long model generations and pipeline builds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket counts (non-cumulative; the last slot is +Inf), sum, count
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def _samples(self):
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+tasks_in_flight = registry.register(Gauge("nifi_agent_tasks_in_flight", "A2A tasks currently running"))
+task_duration = registry.register(Histogram(
+    "nifi_agent_task_duration_seconds", "A2A task duration", ["intent", "status"]))
+llm_calls_in_flight = registry.register(Gauge("nifi_agent_llm_calls_in_flight", "Model calls in progress", ["model"]))
+llm_call_duration = registry.register(Histogram(
+    "nifi_agent_llm_call_duration_seconds", "Duration of one model turn", ["model", "outcome"]))
+llm_tokens = registry.register(Counter("nifi_agent_llm_tokens_total", "Tokens reported by the model", ["model", "kind"]))
+model_route_calls = registry.register(Counter(
+    "nifi_agent_model_route_calls_total", "Model requests by tier, model and outcome", ["tier", "model", "outcome"]))
+model_first_response = registry.register(Histogram(
+    "nifi_agent_model_first_response_seconds", "Time to a model's first response", ["tier", "model"]))
+model_cost = registry.register(Counter(
+    "nifi_agent_model_cost_usd_total", "Estimated model cost from LiteLLM prices", ["tier", "model"]))
+mcp_calls_in_flight = registry.register(Gauge("nifi_agent_mcp_calls_in_flight", "MCP tool calls in progress"))
+mcp_call_duration = registry.register(Histogram(
+    "nifi_agent_mcp_call_duration_seconds", "Duration of one MCP tool call", ["tool", "outcome"]))
+mcp_response_bytes = registry.register(Counter(
+    "nifi_agent_mcp_response_bytes_total", "Bytes of text returned by MCP tools", ["tool"]))
+mcp_endpoint_calls = registry.register(Counter(
+    "nifi_agent_mcp_endpoint_calls_total", "MCP tool calls per endpoint by outcome (ok, error, failed)",
+    ["endpoint", "outcome"]))
+mcp_single_flight_calls = registry.register(Counter(
+    "nifi_agent_mcp_single_flight_calls_total",
+    "Read-only MCP calls that reached the single-flight layer, sent to NiFi or coalesced", ["tool", "outcome"]))
+push_notifications = registry.register(Counter(
+    "nifi_agent_push_notifications_total",
+    "Push notifications by outcome (delivered, retried, failed, dropped)", ["outcome"]))
+admission_queued = registry.register(Gauge("nifi_agent_admission_queued", "A2A tasks waiting for admission"))
+admission_wait = registry.register(Histogram(
+    "nifi_agent_admission_wait_seconds", "Time an admitted task waited in the queue", ["priority"]))
+admission_rejections = registry.register(Counter(
+    "nifi_agent_admission_rejections_total", "A2A tasks rejected as overloaded", ["reason"]))
@@ -0,0 +1,283 @@
+"""
+Model routing by intent and step, with failover and hedged requests.
+
+A ModelRouter stands in for the agents' model. Every model call is routed to a tier
+(e.g. "fast" or "standard") by the request's classified intent and its step: "request"
+for the first call of a turn, "tool_result" for a call that follows tool results (picking
+the next tool arguments or writing the answer). Each tier is a list of models, the first
+preferred and the rest fallbacks:
+- a model that fails, or gives no first response within `timeout` seconds, is dropped and
+  the next one is tried. Once a response has been passed on there is no failover;
+- with `hedge_after` set, a second request (to the next model, or the same one) is sent
+  when the first has not answered after that many seconds. The first to respond wins and
+  the other is cancelled.
+Latency, token and cost figures are kept per tier and model (GET /models), and the task's
+metrics and trace are labelled with the model called rather than the router. Models are any
+BaseLlm, so the router runs unchanged against local stand-ins such as the benchmark's
+scripted model.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+
+import litellm
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.lite_llm import LiteLlm
+
+from . import config, metrics
+from .prompt_builder import INTENT_STATE_KEY
+from .tracing import set_llm_model
+
+logger = logging.getLogger(__name__)
+
+REQUEST_STEP = "request"
+TOOL_RESULT_STEP = "tool_result"
+
+# Intent of the current model call, set by route_by_intent
+_intent = contextvars.ContextVar("nifi_model_route_intent", default=None)
+
+_prices = {}
+
+
+def route_by_intent(callback_context, llm_request):
+    """before_model_callback: make the request's intent available to the router."""
+    _intent.set(callback_context.state.get(INTENT_STATE_KEY))
+    return None
+
+
+def request_step(llm_request):
+    contents = llm_request.contents or []
+    if contents and any(part.function_response for part in contents[-1].parts or []):
+        return TOOL_RESULT_STEP
+    return REQUEST_STEP
+
+
+def parse_routes(spec):
+    """{"INTENT" or "INTENT:step": tier} from "INFORMATION_ONLY=fast,FLOW_INSPECTION:tool_result=fast"."""
+    routes = {}
+    for item in spec.split(","):
+        if "=" in item:
+            key, tier = item.split("=", 1)
+            routes[key.strip()] = tier.strip()
+    return routes
+
+
+def _unit_prices(llm):
+    """(prompt, completion) USD per token from LiteLLM's cost map; zero for local stand-ins."""
+    if not isinstance(llm, LiteLlm):
+        return 0.0, 0.0
+    if llm.model not in _prices:
+        try:
+            _prices[llm.model] = litellm.cost_per_token(model=llm.model, prompt_tokens=1, completion_tokens=1)
+        except Exception:
+            logger.warning(f"No price known for {llm.model}; its cost is reported as 0")
+            _prices[llm.model] = (0.0, 0.0)
+    return _prices[llm.model]
+
+
+def _percentile(samples, share):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)] * 1000 if ordered else None
+
+
+class RouteStats:
+    """Calls, latencies, tokens and cost per tier and model."""
+
+    def __init__(self, history=500):
+        self._history = history
+        self._routes = {}
+
+    def _route(self, tier, model):
+        key = f"{tier}/{model}"
+        if key not in self._routes:
+            self._routes[key] = {
+                "tier": tier, "model": model, "calls": 0, "ok": 0, "errors": 0, "timeouts": 0, "cancelled": 0,
+                "hedges": 0, "hedge_wins": 0, "fallbacks": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cost_usd": 0.0, "latency": deque(maxlen=self._history), "first_response": deque(maxlen=self._history),
+            }
+        return self._routes[key]
+
+    def record_attempt(self, tier, model, outcome, hedge=False):
+        """An attempt that lost: failed, timed out, or was cancelled for a faster one."""
+        route = self._route(tier, model)
+        route["calls"] += 1
+        route["hedges"] += hedge
+        route[{"error": "errors", "timeout": "timeouts"}.get(outcome, "cancelled")] += 1
+        metrics.model_route_calls.inc(tier=tier, model=model, outcome=outcome)
+
+    def record_call(self, tier, model, outcome, latency, first_response, hedge, fallback,
+                    prompt_tokens, completion_tokens, cost):
+        route = self._route(tier, model)
+        route["calls"] += 1
+        route["hedges"] += hedge
+        route["hedge_wins"] += hedge
+        route["fallbacks"] += fallback
+        route[{"ok": "ok", "error": "errors"}.get(outcome, "cancelled")] += 1
+        route["latency"].append(latency)
+        route["first_response"].append(first_response)
+        route["prompt_tokens"] += prompt_tokens
+        route["completion_tokens"] += completion_tokens
+        route["cost_usd"] += cost
+        metrics.model_route_calls.inc(tier=tier, model=model, outcome=outcome)
+        metrics.model_first_response.observe(first_response, tier=tier, model=model)
+        if cost:
+            metrics.model_cost.inc(cost, tier=tier, model=model)
+
+    def stats(self):
+        routes = []
+        for route in self._routes.values():
+            latency, first = route["latency"], route["first_response"]
+            routes.append({
+                **{key: value for key, value in route.items() if key not in ("latency", "first_response")},
+                "latency_p50_ms": _percentile(latency, 0.5),
+                "latency_p95_ms": _percentile(latency, 0.95),
+                "first_response_p50_ms": _percentile(first, 0.5),
+                "first_response_p95_ms": _percentile(first, 0.95),
+            })
+        return {"routes": routes}
+
+
+route_stats = RouteStats()
+
+
+class _Attempt:
+    """One request to one model, with its first response being awaited in a task."""
+
+    def __init__(self, llm, llm_request, stream, hedge=False, fallback=False):
+        self.llm = llm
+        self.hedge = hedge
+        self.fallback = fallback
+        self.started = time.perf_counter()
+        self.responses = llm.generate_content_async(llm_request, stream=stream)
+        self.first = asyncio.ensure_future(anext(self.responses))
+
+    async def close(self):
+        if not self.first.done():
+            self.first.cancel()
+        try:
+            await self.first
+        except (Exception, asyncio.CancelledError):
+            pass
+        await self.responses.aclose()
+
+
+class ModelRouter(BaseLlm):
+    """Routes each model call to a tier of models by intent and step; see the module docstring."""
+
+    tiers: dict[str, list[BaseLlm]]
+    routes: dict[str, str] = {}
+    default_tier: str = "standard"
+    timeout: float = 30.0
+    hedge_after: float = 0.0
+
+    def select_tier(self, intent, step):
+        for key in (f"{intent}:{step}", intent, f"*:{step}"):
+            if key in self.routes:
+                return self.routes[key]
+        return self.default_tier
+
+    async def generate_content_async(self, llm_request, stream=False):
+        tier = self.select_tier(_intent.get(), request_step(llm_request))
+        if self.tiers[tier]:
+            set_llm_model(self.tiers[tier][0].model)
+        started = time.perf_counter()
+        attempt, response = await self._first_response(tier, llm_request, stream)
+        # A fallback or hedge may have answered instead
+        set_llm_model(attempt.llm.model)
+        first_response = time.perf_counter() - attempt.started
+        usage, outcome = None, "cancelled"
+        try:
+            while response is not None:
+                usage = response.usage_metadata or usage
+                yield response
+                response = await anext(attempt.responses, None)
+            outcome = "ok"
+        except Exception:
+            # Part of the answer may already be out, so there is no failover from here
+            outcome = "error"
+            raise
+        finally:
+            await attempt.responses.aclose()
+            prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+            completion_tokens = (usage.candidates_token_count or 0) if usage else 0
+            prompt_price, completion_price = _unit_prices(attempt.llm)
+            route_stats.record_call(
+                tier, attempt.llm.model, outcome, time.perf_counter() - started, first_response,
+                attempt.hedge, attempt.fallback, prompt_tokens, completion_tokens,
+                prompt_tokens * prompt_price + completion_tokens * completion_price,
+            )
+
+    async def _first_response(self, tier, llm_request, stream):
+        """Start the tier's models until one gives a first response; return it with its attempt."""
+        candidates = list(self.tiers[tier])
+        running, errors, hedged = [], [], False
+        try:
+            while True:
+                if not running:
+                    if not candidates:
+                        raise errors[-1] if errors else RuntimeError(f"no model configured for tier {tier!r}")
+                    running.append(_Attempt(candidates.pop(0), llm_request, stream, fallback=bool(errors)))
+
+                now = time.perf_counter()
+                wake_at = min(attempt.started + self.timeout for attempt in running)
+                hedge_at = running[0].started + self.hedge_after if self.hedge_after and not hedged else None
+                if hedge_at is not None:
+                    wake_at = min(wake_at, hedge_at)
+                done, _ = await asyncio.wait(
+                    [attempt.first for attempt in running], timeout=max(wake_at - now, 0),
+                    return_when=asyncio.FIRST_COMPLETED)
+
+                for attempt in [attempt for attempt in running if attempt.first in done]:
+                    running.remove(attempt)
+                    try:
+                        return attempt, attempt.first.result()
+                    except StopAsyncIteration:
+                        return attempt, None
+                    except Exception as e:
+                        logger.warning(f"Model {attempt.llm.model} ({tier}) failed, trying the next one: {e}")
+                        route_stats.record_attempt(tier, attempt.llm.model, "error", attempt.hedge)
+                        errors.append(e)
+                        await attempt.close()
+                if done:
+                    continue
+
+                now = time.perf_counter()
+                for attempt in [attempt for attempt in running if attempt.started + self.timeout <= now]:
+                    logger.warning(f"Model {attempt.llm.model} ({tier}) gave no response within {self.timeout:g}s")
+                    route_stats.record_attempt(tier, attempt.llm.model, "timeout", attempt.hedge)
+                    errors.append(TimeoutError(f"{attempt.llm.model} gave no response within {self.timeout:g}s"))
+                    running.remove(attempt)
+                    await attempt.close()
+                if hedge_at is not None and now >= hedge_at and running:
+                    hedged = True
+                    llm = candidates.pop(0) if candidates else running[0].llm
+                    logger.info(f"Hedging a slow {running[0].llm.model} ({tier}) call with {llm.model}")
+                    running.append(_Attempt(llm, llm_request, stream, hedge=True, fallback=llm is not running[0].llm))
+        finally:
+            # The losers of a hedge, or everything when the call itself is cancelled
+            for attempt in running:
+                route_stats.record_attempt(tier, attempt.llm.model, "cancelled", attempt.hedge)
+                await attempt.close()
+
+
+def create_model_router(make_llm):
+    """Router over the configured tiers; make_llm(model name) builds each model, e.g. StreamingLiteLlm."""
+    tiers = {
+        tier: [make_llm(name.strip()) for name in models.split(",") if name.strip()]
+        for tier, models in (("fast", config.MODEL_TIER_FAST), ("standard", config.MODEL_TIER_STANDARD))
+    }
+    routes = parse_routes(config.MODEL_ROUTES)
+    unknown = set(routes.values()) - set(tiers)
+    if unknown:
+        raise ValueError(f"MODEL_ROUTES refers to unknown tiers {sorted(unknown)}; use {sorted(tiers)}")
+    name = "router(" + ";".join(f"{tier}={','.join(llm.model for llm in llms)}" for tier, llms in tiers.items()) + ")"
+    return ModelRouter(
+        model=name,
+        tiers=tiers,
+        routes=routes,
+        timeout=config.MODEL_TIMEOUT,
+        hedge_after=config.MODEL_HEDGE_AFTER,
+    )
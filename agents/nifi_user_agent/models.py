@@ -0,0 +1,98 @@
+"""
+Model wrappers used by the agents.
+
+StreamingLiteLlm is needed because ADK's LiteLlm reads streamed completions with a
+blocking iterator on the event loop, which would stall every other task while a model
+is generating. It drives that iterator on a worker thread and hands chunks back through
+a bounded queue. ConcurrencyLimitedLlm caps concurrent generations across all tasks.
+
+Importing this module imports litellm, so only agent.py and the benchmark server do.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.lite_llm import LiteLlm
+
+from . import config
+
+_DONE = object()
+
+
+class StreamingLiteLlm(LiteLlm):
+    """LiteLlm that streams without blocking the event loop."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if not stream:
+            async for response in super().generate_content_async(llm_request, stream=False):
+                yield response
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=config.STREAM_MODEL_BUFFER)
+        stopped = threading.Event()
+        agen = super().generate_content_async(llm_request, stream=True)
+        loop.run_in_executor(None, _drive_stream, agen, loop, queue, stopped)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            # Unblock a worker waiting for room in the queue; it exits after its current chunk
+            while not queue.empty():
+                queue.get_nowait()
+
+
+def _drive_stream(agen, loop, queue, stopped):
+    """Iterate LiteLlm's streaming generator on this worker thread, with its own event loop."""
+    thread_loop = asyncio.new_event_loop()
+    try:
+        while not stopped.is_set():
+            try:
+                item = thread_loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                item = _DONE
+            except BaseException as e:
+                item = e
+            if not _put(loop, queue, item, stopped) or item is _DONE or isinstance(item, BaseException):
+                return
+    finally:
+        thread_loop.run_until_complete(agen.aclose())
+        thread_loop.close()
+
+
+def _put(loop, queue, item, stopped):
+    future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+    while True:
+        try:
+            future.result(timeout=0.5)
+            return True
+        except FutureTimeoutError:
+            if stopped.is_set():
+                future.cancel()
+                return False
+
+
+_llm_semaphore = asyncio.Semaphore(config.LLM_MAX_CONCURRENT_CALLS)
+
+
+class ConcurrencyLimitedLlm(BaseLlm):
+    """Wraps a model so that at most LLM_MAX_CONCURRENT_CALLS generations run at once."""
+
+    llm: BaseLlm
+
+    async def generate_content_async(self, llm_request, stream=False):
+        async with _llm_semaphore:
+            async for response in self.llm.generate_content_async(llm_request, stream=stream):
+                yield response
+
+
+def limit_llm_calls(llm):
+    return ConcurrencyLimitedLlm(model=llm.model, llm=llm)
@@ -0,0 +1,232 @@
+"""
+Projection of large MCP tool results before they reach the model.
+
+get_processor_types() returns every processor type with its description, and
+get_processor_details() the whole NiFi entity. Passed through whole, they stay in the
+context window for every later turn of the task. Results of the tools in PROJECTIONS that
+are larger than a threshold are replaced with a projection: a few fields of the entity or
+of each listed item, the first page of a listing, and a handle. The full payload is kept
+in a PayloadStore, and fetch_tool_result selects fields, searches and pages through it by
+handle. A projection only leaves out fields and items. Every value it keeps (IDs, revision
+versions, type names) is copied unchanged.
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from mcp.types import TextContent
+
+from .flow_plan import tool_result_text
+from .tool_cache import parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+# Per tool: the key of the listed items (None for a single entity) and the dotted fields the model sees
+PROJECTIONS = {
+    "get_processor_types": ("processorTypes", ("type",)),
+    "list_processors": ("processors", (
+        "id", "revision.version", "component.name", "component.type", "component.state",
+        "component.validationErrors", "status.runStatus",
+    )),
+    "get_process_groups": ("processGroups", (
+        "id", "revision.version", "component.name", "runningCount", "stoppedCount", "invalidCount", "disabledCount",
+    )),
+    "get_processor_details": (None, (
+        "id", "revision.version", "component.name", "component.type", "component.state",
+        "component.parentGroupId", "component.relationships", "component.validationErrors",
+        "component.config.properties", "status.runStatus",
+    )),
+}
+
+_MISSING = object()
+
+
+def _lookup(value, keys):
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def select_fields(value, fields):
+    """Copy of a dict with only the dotted paths in `fields`, nested as in the original."""
+    if not isinstance(value, dict):
+        return value
+    selected = {}
+    for path in fields:
+        keys = path.split(".")
+        found = _lookup(value, keys)
+        if found is _MISSING:
+            continue
+        target = selected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = found
+    return selected
+
+
+def _matches(value, needle):
+    """True if any string in `value` contains `needle` (lower case)."""
+    if isinstance(value, str):
+        return needle in value.lower()
+    if isinstance(value, dict):
+        return any(_matches(item, needle) for item in value.values())
+    if isinstance(value, list):
+        return any(_matches(item, needle) for item in value)
+    return False
+
+
+def _items(payload, items_key):
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict) and isinstance(payload.get(items_key), list):
+        return payload[items_key]
+    return None
+
+
+def query_payload(payload, items_key, fields=None, search=None, offset=0, limit=50):
+    """Fields of a single entity, or a page of the (searched) items of a listing."""
+    items = _items(payload, items_key)
+    if items is None:
+        return select_fields(payload, fields) if fields else payload
+    matched = [item for item in items if _matches(item, search.lower())] if search else items
+    page = matched[offset:offset + limit]
+    view = {
+        "total": len(items),
+        "matched": len(matched),
+        "offset": offset,
+        items_key or "items": [select_fields(item, fields) if fields else item for item in page],
+    }
+    if offset + len(page) < len(matched):
+        view["next_offset"] = offset + len(page)
+    return view
+
+
+class PayloadStore:
+    """Full tool payloads by handle; the least recently used are dropped beyond max_entries."""
+
+    def __init__(self, max_entries=256):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._fetches = 0
+        self._unknown = 0
+
+    def put(self, tool, text, payload):
+        # The same payload always gets the same handle, e.g. when it is served from the tool cache
+        handle = f"{tool}-{hashlib.sha1(text.encode()).hexdigest()[:10]}"
+        self._entries[handle] = (tool, payload)
+        self._entries.move_to_end(handle)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return handle
+
+    def get(self, handle):
+        entry = self._entries.get(handle)
+        if entry is None:
+            self._unknown += 1
+            return None
+        self._entries.move_to_end(handle)
+        self._fetches += 1
+        return entry
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "fetches": self._fetches,
+            "unknown_handles": self._unknown,
+        }
+
+
+class ProjectingClient:
+    """Wraps an MCP client (anything with call_tool/list_tools) and projects large results for the model."""
+
+    def __init__(self, client, store, min_chars=2000, page_size=50):
+        self._client = client
+        self._store = store
+        self._min_chars = min_chars
+        self._page_size = page_size
+        self._projected = 0
+        self._chars_in = 0
+        self._chars_out = 0
+
+    async def list_tools(self):
+        return await self._client.list_tools()
+
+    async def call_tool(self, name, arguments=None):
+        result = await self._client.call_tool(name, arguments)
+        projection = PROJECTIONS.get(name)
+        if projection is None or getattr(result, "isError", False):
+            return result
+        text = tool_result_text(result)
+        payload = parse_tool_result(result) if len(text) >= self._min_chars else None
+        if payload is None:
+            return result
+
+        items_key, fields = projection
+        handle = self._store.put(name, text, payload)
+        view = query_payload(payload, items_key, fields=fields, limit=self._page_size)
+        view["projection"] = {
+            "handle": handle,
+            "fields": list(fields),
+            "note": "Values shown are exact. Call fetch_tool_result with this handle for other fields, "
+                    "a search or the next page.",
+        }
+        projected = json.dumps(view)
+        self._projected += 1
+        self._chars_in += len(text)
+        self._chars_out += len(projected)
+        logger.debug(f"Projected {name} result from {len(text)} to {len(projected)} chars ({handle})")
+        return result.model_copy(update={"content": [TextContent(type="text", text=projected)]})
+
+    def stats(self):
+        return {
+            "projected": self._projected,
+            "chars_in": self._chars_in,
+            "chars_out": self._chars_out,
+            "reduction": 1 - self._chars_out / self._chars_in if self._chars_in else 0.0,
+            "store": self._store.stats(),
+        }
+
+
+def create_fetch_tool(store, page_size=50):
+    """Build the fetch_tool_result function tool reading from a PayloadStore."""
+
+    async def fetch_tool_result(
+        handle: str,
+        fields: Optional[list[str]] = None,
+        search: Optional[str] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> dict:
+        """Reads the full result of an earlier tool call that was returned as a projection with a handle.
+
+        Use this instead of calling the original tool again when the projection does not show what you need:
+        another field, a processor type matching a name, or the next page of a listing.
+
+        Args:
+            handle: The "handle" from the result's "projection" object.
+            fields: Optional dotted field paths to return, e.g. ["type", "description"] for processor types or
+                ["component.config.properties"] for processor details. All fields when omitted.
+            search: Optional case-insensitive text; only listed items containing it are returned
+                (e.g. "kafka" for the Kafka processor types).
+            offset: Optional index of the first listed item to return, such as "next_offset" of a previous page.
+            limit: Optional number of listed items to return.
+
+        Returns:
+            dict: the selected fields of the entity, or "total", "matched", "offset", the page of items and
+            "next_offset" when more items match. Values are exactly as returned by NiFi.
+        """
+        entry = store.get(handle)
+        if entry is None:
+            return {"error": f"Unknown or expired handle {handle!r}; call the original tool again."}
+        tool, payload = entry
+        items_key = PROJECTIONS.get(tool, (None, ()))[0]
+        return query_payload(payload, items_key, fields=fields, search=search, offset=offset or 0,
+                             limit=limit or page_size)
+
+    return fetch_tool_result
@@ -0,0 +1,160 @@
+"""
+Intent-aware assembly of the agent instruction and prompt token accounting.
+
+The full agent_prompt is sent on every model call. When the request's intent is known
+(session state key INTENT_STATE_KEY), only the sections that apply to that intent are
+included. Sections shared by every request always come first in a fixed order, so the
+provider sees an identical prefix and can serve it from its prompt cache.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from functools import lru_cache
+
+from .prompt import INTENTS, PROMPT_SECTIONS, agent_prompt, classification_section, classified_intent_template
+
+logger = logging.getLogger(__name__)
+
+# Session state key holding the classified intent of the current request
+INTENT_STATE_KEY = "nifi_intent"
+
+_encoder = None
+
+
+def count_tokens(text):
+    """Token count for the OpenAI models; falls back to ~4 characters per token without tiktoken."""
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=None)
+def section_token_counts():
+    """Token cost of every prompt section, measured once."""
+    counts = {name: count_tokens(text) for name, _, text in PROMPT_SECTIONS}
+    counts["classification"] = count_tokens(classification_section)
+    return counts
+
+
+@lru_cache(maxsize=None)
+def assemble_prompt(intent=None):
+    """Instruction for one intent, or the full prompt when the intent is unknown.
+
+    Results are cached so every request with the same intent sends byte-identical text.
+    """
+    if intent not in INTENTS:
+        return agent_prompt
+    shared = "".join(text for _, intents, text in PROMPT_SECTIONS if intents is None)
+    specific = "".join(text for _, intents, text in PROMPT_SECTIONS if intents is not None and intent in intents)
+    return shared + specific + classified_intent_template.format(intent=intent)
+
+
+def instruction_provider(context):
+    """ADK InstructionProvider: pick the prompt sections for the request's intent."""
+    return assemble_prompt(context.state.get(INTENT_STATE_KEY))
+
+
+class PromptStats:
+    """Per-request prompt sizes: local estimates before the call, provider usage after it."""
+
+    def __init__(self, history=200):
+        self._requests = deque(maxlen=history)
+        self._pending = {}
+        self._totals = {}
+
+    def record_request(self, invocation_id, intent, system_tokens, history_tokens, tools_tokens):
+        record = {
+            "invocation_id": invocation_id,
+            "intent": intent or "UNCLASSIFIED",
+            "system_tokens": system_tokens,
+            "history_tokens": history_tokens,
+            "tools_tokens": tools_tokens,
+            "estimated_prompt_tokens": system_tokens + history_tokens + tools_tokens,
+            "timestamp": time.time(),
+        }
+        self._requests.append(record)
+        self._pending[invocation_id] = record
+        if len(self._pending) > self._requests.maxlen:
+            # Calls that never reported usage (errors, cancellations)
+            self._pending.pop(next(iter(self._pending)))
+        totals = self._totals.setdefault(record["intent"], {"requests": 0, "estimated_prompt_tokens": 0})
+        totals["requests"] += 1
+        totals["estimated_prompt_tokens"] += record["estimated_prompt_tokens"]
+        return record
+
+    def record_usage(self, invocation_id, prompt_tokens, cached_tokens):
+        record = self._pending.pop(invocation_id, None)
+        if record is None:
+            return
+        record["prompt_tokens"] = prompt_tokens
+        record["cached_prompt_tokens"] = cached_tokens
+        totals = self._totals[record["intent"]]
+        totals["prompt_tokens"] = totals.get("prompt_tokens", 0) + (prompt_tokens or 0)
+        totals["cached_prompt_tokens"] = totals.get("cached_prompt_tokens", 0) + (cached_tokens or 0)
+
+    def stats(self):
+        return {
+            "sections": section_token_counts(),
+            "by_intent": self._totals,
+            "recent": list(self._requests)[-20:],
+        }
+
+
+prompt_stats = PromptStats()
+
+
+def contents_tokens(contents):
+    """Estimated tokens of the history (texts, function call arguments and responses)."""
+    total = 0
+    for content in contents or []:
+        for part in content.parts or []:
+            if part.text:
+                total += count_tokens(part.text)
+            elif part.function_call:
+                total += count_tokens(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                total += count_tokens(json.dumps(part.function_response.response or {}, default=str))
+    return total
+
+
+def record_prompt_tokens(callback_context, llm_request):
+    """before_model_callback: estimate the size of the prompt about to be sent."""
+    request_config = llm_request.config
+    system = ""
+    declarations = []
+    if request_config:
+        if isinstance(request_config.system_instruction, str):
+            system = request_config.system_instruction
+        for tool in request_config.tools or []:
+            declarations.extend(d.model_dump(exclude_none=True, mode="json") for d in tool.function_declarations or [])
+    tools_tokens = count_tokens(json.dumps(declarations)) if declarations else 0
+    record = prompt_stats.record_request(
+        callback_context.invocation_id,
+        callback_context.state.get(INTENT_STATE_KEY),
+        count_tokens(system),
+        contents_tokens(llm_request.contents),
+        tools_tokens,
+    )
+    logger.debug(f"Prompt for {record['intent']} ({record['invocation_id']}): ~{record['estimated_prompt_tokens']} tokens")
+    return None
+
+
+def record_prompt_usage(callback_context, llm_response):
+    """after_model_callback: keep the provider-reported prompt and cached token counts."""
+    usage = llm_response.usage_metadata
+    if usage is not None:
+        prompt_stats.record_usage(
+            callback_context.invocation_id,
+            usage.prompt_token_count,
+            getattr(usage, "cached_content_token_count", None),
+        )
+    return None
@@ -0,0 +1,294 @@
+"""
+Push notifications for A2A tasks (tasks/pushNotificationConfig/*).
+
+A client registers a webhook per task, in the message/send configuration or with
+tasks/pushNotificationConfig/set, and receives the task every time its state changes. With
+`"blocking": false`, message/send answers as soon as the task exists (request_handler.py), so an
+orchestrator waiting on a long pipeline build neither holds a stream open nor polls tasks/get.
+
+PushDispatcher never sends on the request path. A state change puts the task on a bounded
+queue and returns; a background loop drains the queue in batches of up to `batch_size` and
+delivers them concurrently (at most `batch_size` at once) over one keep-alive HTTP client.
+Failed deliveries are retried with exponential backoff. A task that changes again while its
+notification waits is sent once, in its latest state, and notifications of one task are never
+sent concurrently, so they arrive in order. Registrations are dropped once the final state is
+delivered.
+
+Registrations live in this process only. With several workers, a webhook set with
+tasks/pushNotificationConfig/set, and a tasks/pushNotificationConfig/get, only reach the task if they land on
+the worker running it; one passed in the message/send that starts the task always does.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import httpx
+from a2a.server.tasks.push_notifier import PushNotifier
+from a2a.server.tasks.task_store import TaskStore
+from a2a.types import InvalidParamsError, PushNotificationConfig, Task, TaskState
+from a2a.utils.errors import ServerError
+
+from .metrics import push_notifications
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "X-A2A-Notification-Token"
+FINAL_STATES = {TaskState.completed, TaskState.canceled, TaskState.failed, TaskState.rejected}
+# Answers worth another attempt; any other 4xx means the receiver will not accept the notification
+RETRY_STATUSES = {408, 425, 429}
+
+
+class _Registration:
+    __slots__ = ("config", "state", "sequence")
+
+    def __init__(self, config):
+        self.config = config
+        self.state = None  # last state queued for delivery
+        self.sequence = 0
+
+
+class _Notification:
+    __slots__ = ("task_id", "sequence", "url", "headers", "payload", "final", "attempts", "queued_at")
+
+    def __init__(self, task_id, sequence, url, headers, payload, final):
+        self.task_id = task_id
+        self.sequence = sequence
+        self.url = url
+        self.headers = headers
+        self.payload = payload
+        self.final = final
+        self.attempts = 0
+        self.queued_at = time.perf_counter()
+
+
+def _headers(config):
+    headers = {}
+    if config.token:
+        headers[TOKEN_HEADER] = config.token
+    authentication = config.authentication
+    if authentication and authentication.credentials:
+        schemes = {scheme.lower() for scheme in authentication.schemes}
+        if "bearer" in schemes:
+            headers["Authorization"] = f"Bearer {authentication.credentials}"
+        elif "basic" in schemes:
+            headers["Authorization"] = f"Basic {authentication.credentials}"
+    return headers
+
+
+class PushDispatcher(PushNotifier):
+    """PushNotifier delivering task state changes through a bounded, batched, retrying queue."""
+
+    def __init__(self, queue_size=10000, batch_size=50, max_retries=5, retry_delay=0.5, timeout=10.0,
+                 max_tasks=10000):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+
+        self._registrations = OrderedDict()
+        self._pending = {}  # task id -> latest notification not yet sent
+        self._queue = asyncio.Queue()  # task ids of _pending, bounded by queue_size
+        self._sending = set()
+        self._deliveries = set()
+        self._client = None
+        self._loop_task = None
+
+        self._queued = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._delivered = 0
+        self._retries = 0
+        self._failed = 0
+        self._superseded = 0
+        self._batches = 0
+        self._latency_total = 0.0
+
+    async def start(self):
+        """Open the HTTP client and start the delivery loop."""
+        if self._loop_task is not None:
+            return
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        self._loop_task = asyncio.create_task(self._run())
+
+    async def close(self, timeout=5.0):
+        """Deliver what is queued (for at most `timeout` seconds), then stop."""
+        if self._loop_task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._deliveries) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._loop_task.cancel()
+        for delivery in list(self._deliveries):
+            delivery.cancel()
+        await asyncio.gather(self._loop_task, *self._deliveries, return_exceptions=True)
+        self._loop_task = None
+        await self._client.aclose()
+        if self._pending:
+            logger.warning(f"{len(self._pending)} push notification(s) not delivered before shutdown")
+
+    # --- PushNotifier ---
+
+    async def set_info(self, task_id: str, notification_config: PushNotificationConfig) -> None:
+        url = urlparse(notification_config.url)
+        if url.scheme not in ("http", "https") or not url.netloc:
+            raise ServerError(error=InvalidParamsError(message=f"Invalid push notification URL: {notification_config.url}"))
+        registration = self._registrations.get(task_id)
+        if registration is None:
+            self._registrations[task_id] = _Registration(notification_config)
+            while len(self._registrations) > self.max_tasks:
+                self._registrations.popitem(last=False)
+        else:
+            registration.config = notification_config
+            self._registrations.move_to_end(task_id)
+
+    async def get_info(self, task_id: str) -> PushNotificationConfig | None:
+        registration = self._registrations.get(task_id)
+        return registration.config if registration else None
+
+    async def delete_info(self, task_id: str) -> None:
+        self._registrations.pop(task_id, None)
+
+    async def send_notification(self, task: Task) -> None:
+        """Queue the task if it has a webhook and its state changed since the last notification."""
+        registration = self._registrations.get(task.id)
+        if registration is None or task.status is None or task.status.state == registration.state:
+            return
+        registration.state = task.status.state
+        registration.sequence += 1
+        config = registration.config
+        notification = _Notification(
+            task.id, registration.sequence, config.url, _headers(config),
+            task.model_dump(mode="json", exclude_none=True), task.status.state in FINAL_STATES)
+        if task.id in self._pending:
+            # Still waiting: send the latest state instead
+            notification.queued_at = self._pending[task.id].queued_at
+            self._pending[task.id] = notification
+            self._coalesced += 1
+            return
+        if len(self._pending) >= self.queue_size:
+            registration.state = None  # the next save of this task tries again
+            self._dropped += 1
+            push_notifications.inc(outcome="dropped")
+            logger.warning(f"Push notification queue full; dropped the {task.status.state.value} notification of task {task.id}")
+            return
+        self._pending[task.id] = notification
+        self._queued += 1
+        if task.id not in self._sending:
+            self._queue.put_nowait(task.id)
+
+    # --- Delivery ---
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._batches += 1
+            for task_id in batch:
+                # At most batch_size deliveries in flight, including those waiting to retry
+                while len(self._deliveries) >= self.batch_size:
+                    await asyncio.wait(set(self._deliveries), return_when=asyncio.FIRST_COMPLETED)
+                notification = self._pending.pop(task_id, None)
+                if notification is None:
+                    continue
+                self._sending.add(task_id)
+                delivery = asyncio.create_task(self._deliver(notification))
+                self._deliveries.add(delivery)
+                delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, notification):
+        task_id = notification.task_id
+        try:
+            while True:
+                notification.attempts += 1
+                retry = await self._post(notification)
+                if not retry:
+                    return
+                if notification.attempts > self.max_retries:
+                    self._failed += 1
+                    push_notifications.inc(outcome="failed")
+                    logger.warning(f"Gave up on the push notification of task {task_id} to {notification.url} "
+                                   f"after {notification.attempts} attempts")
+                    return
+                if task_id in self._pending:
+                    # A newer state is queued; it replaces this one
+                    self._superseded += 1
+                    return
+                self._retries += 1
+                push_notifications.inc(outcome="retried")
+                delay = self.retry_delay * 2 ** (notification.attempts - 1)
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                if task_id in self._pending:
+                    self._superseded += 1
+                    return
+        finally:
+            self._sending.discard(task_id)
+            if task_id in self._pending:
+                self._queue.put_nowait(task_id)
+            elif notification.final:
+                registration = self._registrations.get(task_id)
+                if registration is not None and registration.sequence == notification.sequence:
+                    del self._registrations[task_id]
+
+    async def _post(self, notification):
+        """Send one notification; True when it is worth another attempt."""
+        try:
+            response = await self._client.post(notification.url, json=notification.payload, headers=notification.headers)
+        except httpx.HTTPError as e:
+            logger.debug(f"Push notification to {notification.url} failed: {e!r}")
+            return True
+        if response.is_success:
+            self._delivered += 1
+            self._latency_total += time.perf_counter() - notification.queued_at
+            push_notifications.inc(outcome="delivered")
+            return False
+        if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+            logger.debug(f"Push notification to {notification.url} answered {response.status_code}")
+            return True
+        self._failed += 1
+        push_notifications.inc(outcome="failed")
+        logger.warning(f"Push notification of task {notification.task_id} rejected by {notification.url} "
+                       f"with {response.status_code}")
+        return False
+
+    def stats(self):
+        return {
+            "registered": len(self._registrations),
+            "queued_now": len(self._pending),
+            "sending_now": len(self._sending),
+            "queue_size": self.queue_size,
+            "queued": self._queued,
+            "coalesced": self._coalesced,
+            "dropped": self._dropped,
+            "delivered": self._delivered,
+            "retries": self._retries,
+            "superseded": self._superseded,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_delivery_ms": round(self._latency_total / self._delivered * 1000, 1) if self._delivered else None,
+        }
+
+
+class NotifyingTaskStore(TaskStore):
+    """Task store wrapper that hands every saved task to the push notifier."""
+
+    def __init__(self, store, notifier):
+        self.store = store
+        self.notifier = notifier
+
+    async def save(self, task: Task) -> None:
+        await self.store.save(task)
+        await self.notifier.send_notification(task)
+
+    async def get(self, task_id: str) -> Task | None:
+        return await self.store.get(task_id)
+
+    async def delete(self, task_id: str) -> None:
+        await self.store.delete(task_id)
+        await self.notifier.delete_info(task_id)
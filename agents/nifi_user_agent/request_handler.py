@@ -0,0 +1,183 @@
+"""
+A2A request handler for running the agent server with several worker processes.
+
+Event queues live in the worker that executes a task, so a `tasks/resubscribe` that
+lands on another worker finds no queue. In that case the handler follows the task
+through the shared task store instead and streams every change until the task stops,
+or ends the stream with an `unknown` state once the task has not changed for
+RESUBSCRIBE_STALL_TIMEOUT seconds (its worker may have died).
+
+With `"blocking": false` in the message/send configuration, the handler answers as soon as
+the task exists and keeps running it in the background; clients learn about its progress from
+push notifications (push_notifications.py) instead of polling tasks/get.
+
+ClientCallContextBuilder tags every request with the client identity used by admission
+control (admission.py). The X-Client-Id header is only believed from a trusted proxy, since
+any other caller could change it on every request to escape its per-client cap.
+"""
+
+import asyncio
+import logging
+import time
+
+from a2a.server.apps.jsonrpc.jsonrpc_app import DefaultCallContextBuilder
+from a2a.server.events import EventConsumer
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.server.tasks import TaskManager
+from a2a.types import InternalError, Message, Task, TaskNotFoundError, TaskState, TaskStatus
+from a2a.utils import new_agent_text_message
+from a2a.utils.errors import ServerError
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# States after which a followed task will not change again without new client input
+STOPPED_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+    TaskState.input_required,
+    TaskState.auth_required,
+}
+
+CLIENT_ID_HEADER = "x-client-id"
+
+
+class NiFiRequestHandler(DefaultRequestHandler):
+    """DefaultRequestHandler that can resubscribe to tasks running in another worker and run tasks detached."""
+
+    def __init__(self, *args, poll_interval=None, stall_timeout=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._poll_interval = poll_interval or config.RESUBSCRIBE_POLL_INTERVAL
+        self._stall_timeout = config.RESUBSCRIBE_STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        self._detached = set()
+
+    async def on_message_send(self, params, context=None):
+        configuration = params.configuration
+        if configuration is None or (configuration.blocking is not False and not self.should_add_push_info(params)):
+            return await super().on_message_send(params, context)
+
+        # DefaultRequestHandler always waits for the final result and only registers the
+        # webhook of tasks that already exist
+        task_manager = TaskManager(
+            task_id=params.message.taskId,
+            context_id=params.message.contextId,
+            task_store=self.task_store,
+            initial_message=params.message,
+        )
+        task = await task_manager.get_task()
+        if task:
+            task = task_manager.update_with_message(params.message, task)
+        request_context = await self._request_context_builder.build(
+            params=params,
+            task_id=task.id if task else None,
+            context_id=params.message.contextId,
+            task=task,
+            context=context,
+        )
+        task_id = request_context.task_id
+        if self.should_add_push_info(params):
+            await self._push_notifier.set_info(task_id, configuration.pushNotificationConfig)
+
+        queue = await self._queue_manager.create_or_tap(task_id)
+        producer_task = asyncio.create_task(self._run_event_stream(request_context, queue))
+        await self._register_producer(task_id, producer_task)
+        consumer = EventConsumer(queue)
+        producer_task.add_done_callback(consumer.agent_task_callback)
+        events = consumer.consume_all()
+
+        result, detached = None, False
+        try:
+            async for event in events:
+                if isinstance(event, Message):
+                    result = event
+                    break
+                await task_manager.process(event)
+                if configuration.blocking is False:
+                    detached = True
+                    break
+            if result is None:
+                result = await task_manager.get_task()
+            if result is None:
+                raise ServerError(error=InternalError())
+            if isinstance(result, Task) and result.id != task_id:
+                logger.error(f"Agent generated task_id={result.id} does not match the RequestContext task_id={task_id}.")
+                raise ServerError(InternalError(message='Task ID mismatch in agent response'))
+        finally:
+            if detached:
+                background = asyncio.create_task(self._finish_detached(events, task_manager, producer_task, task_id))
+                self._detached.add(background)
+                background.add_done_callback(self._detached.discard)
+            else:
+                await self._cleanup_producer(producer_task, task_id)
+        return result
+
+    async def _finish_detached(self, events, task_manager, producer_task, task_id):
+        """Keep saving the events of a task whose message/send already returned."""
+        try:
+            async for event in events:
+                await task_manager.process(event)
+        except Exception as e:
+            logger.error(f"Background task {task_id} failed: {e}")
+        finally:
+            try:
+                await self._cleanup_producer(producer_task, task_id)
+            except Exception as e:
+                logger.error(f"Background task {task_id} failed: {e}")
+
+    async def on_resubscribe_to_task(self, params, context=None):
+        if await self._queue_manager.get(params.id) is not None:
+            async for event in super().on_resubscribe_to_task(params, context):
+                yield event
+            return
+
+        task = await self.task_store.get(params.id)
+        if not task:
+            raise ServerError(error=TaskNotFoundError())
+        logger.debug(f"Following task {params.id} through the shared task store")
+        async for event in self._follow_stored_task(task):
+            yield event
+
+    async def _follow_stored_task(self, task):
+        last = task.model_dump_json(exclude_none=True)
+        changed_at = time.monotonic()
+        yield task
+        while task.status.state not in STOPPED_STATES:
+            if self._stall_timeout and time.monotonic() - changed_at > self._stall_timeout:
+                # The worker running the task has probably died; the stored task is left as it is
+                logger.warning(f"Task {task.id} has not changed for {self._stall_timeout:.0f}s; stopped following it")
+                message = new_agent_text_message(
+                    f"No update for {self._stall_timeout:.0f} seconds; the worker running this task may have "
+                    f"stopped. Check it again with tasks/get.", task.contextId, task.id)
+                yield task.model_copy(update={"status": TaskStatus(state=TaskState.unknown, message=message)})
+                return
+            await asyncio.sleep(self._poll_interval)
+            latest = await self.task_store.get(task.id)
+            if latest is None:
+                return
+            snapshot = latest.model_dump_json(exclude_none=True)
+            if snapshot != last:
+                task, last, changed_at = latest, snapshot, time.monotonic()
+                yield task
+
+
+class ClientCallContextBuilder(DefaultCallContextBuilder):
+    """Adds a client identity (user name, X-Client-Id from a trusted proxy, or remote address) to the call context."""
+
+    def __init__(self, trusted_proxies=None):
+        if trusted_proxies is None:
+            trusted_proxies = config.ADMISSION_TRUSTED_PROXIES
+        self.trusted_proxies = {address.strip() for address in trusted_proxies.split(",") if address.strip()}
+
+    def build(self, request):
+        context = super().build(request)
+        address = request.client.host if request.client else None
+        client_id = context.user.user_name if context.user.is_authenticated else None
+        if not client_id and address in self.trusted_proxies:
+            client_id = request.headers.get(CLIENT_ID_HEADER)
+        if not client_id:
+            client_id = address
+        context.state["client_id"] = client_id or "anonymous"
+        return context
@@ -0,0 +1,240 @@
+"""
+Semantic answer cache for requests that need no NiFi state (INFORMATION_ONLY, DISCOVERY).
+
+Request text is normalized and embedded. Embeddings sit in a NumPy matrix, so a lookup
+is one matrix-vector product over every cached question. A hit needs a cosine similarity
+of at least the threshold. The local hashing embedder scores requests that differ in one word (JSON vs
+Avro, with vs without) about as high as true repeats, so with it a neighbour must also have the same
+content terms: the words left after dropping question and filler words. Every entry records the cache version, which is a hash of the
+prompt and model names. Entries from another version are never served and are dropped
+when the cache is loaded from disk.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# Words that do not change what a request asks for; negations (no, not, without) are deliberately absent
+_FILLER_WORDS = frozenset("""
+    a an the this that these those is are was were be been am do does did can could should would will
+    i me my we our you your it its what which who how why when where please tell explain describe
+    about of for to in on at by from as and or s
+""".split())
+
+
+def normalize(text):
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def content_terms(key):
+    """The words of a normalized request that matter for its answer."""
+    return frozenset(key.split()) - _FILLER_WORDS
+
+
+def cache_version(*parts):
+    """Stable version string for the prompt text and model names an answer was produced with."""
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:16]
+
+
+class HashingEmbedder:
+    """Local embedding: hashed word unigrams/bigrams and character trigrams, L2-normalized."""
+
+    name = "local"
+    # Similarity is lexical: neighbours must also agree on content_terms()
+    lexical = True
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    async def embed(self, text):
+        words = text.split()
+        grams = words + [a + " " + b for a, b in zip(words, words[1:])]
+        grams += ["#" + text[i:i + 3] for i in range(len(text) - 2)]
+        vector = np.bincount(
+            [zlib.crc32(gram.encode()) % self.dim for gram in grams], minlength=self.dim
+        ).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class LiteLlmEmbedder:
+    """Embedding model called through LiteLLM, e.g. openai/text-embedding-3-small."""
+
+    lexical = False
+
+    def __init__(self, model):
+        self.name = model
+
+    async def embed(self, text):
+        import litellm
+
+        response = await litellm.aembedding(model=self.name, input=[text])
+        vector = np.asarray(response.data[0]["embedding"], dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def create_embedder(model):
+    return HashingEmbedder() if model == "local" else LiteLlmEmbedder(model)
+
+
+class SemanticResponseCache:
+    """Bounded nearest-neighbour cache of agent answers, evicting the least recently used entry."""
+
+    def __init__(self, embedder, version, threshold=0.92, max_entries=1000, ttl=24 * 3600, clock=time.monotonic):
+        self.embedder = embedder
+        self.version = cache_version(version, embedder.name)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = asyncio.Lock()
+
+        # Row i of the matrix is the embedding of _entries[i]
+        self._matrix = None
+        self._entries = []
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._exact = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lookup_seconds = 0.0
+
+    async def lookup(self, text, intent):
+        """Cached answer for a request of the same intent whose text is close enough, or None."""
+        start = time.perf_counter()
+        key = normalize(text)
+        now = self._clock()
+        try:
+            row = self._exact.get((intent, key))
+            if row is not None and self._entries[row]["expires_at"] < now:
+                row = None  # an unexpired neighbour may still answer it
+            if row is None and self._entries:
+                row = self._nearest(await self.embedder.embed(key), intent, key, now)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            row = None
+        self._lookup_seconds += time.perf_counter() - start
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._last_used[row] = now
+        return self._entries[row]["answer"]
+
+    def _nearest(self, vector, intent, key, now):
+        n = len(self._entries)
+        similarities = self._matrix[:n] @ vector
+        terms = content_terms(key) if self.embedder.lexical else None
+        for row in np.argsort(similarities)[::-1][:10]:
+            if similarities[row] < self.threshold:
+                return None
+            entry = self._entries[row]
+            if entry["intent"] != intent or entry["expires_at"] < now:
+                continue
+            if terms is not None and content_terms(entry["text"]) != terms:
+                continue
+            return int(row)
+        return None
+
+    async def store(self, text, intent, answer):
+        key = normalize(text)
+        if not key or not answer:
+            return
+        try:
+            vector = await self.embedder.embed(key)
+        except Exception as e:
+            logger.warning(f"Response cache could not embed request: {e}")
+            return
+        async with self._lock:
+            row = self._exact.get((intent, key))
+            if row is None:
+                row = self._free_row(vector.shape[0])
+            now = self._clock()
+            entry = {"text": key, "intent": intent, "answer": answer, "expires_at": now + self.ttl, "version": self.version}
+            if row == len(self._entries):
+                self._entries.append(entry)
+            else:
+                old = self._entries[row]
+                self._exact.pop((old["intent"], old["text"]), None)
+                self._entries[row] = entry
+            self._matrix[row] = vector
+            self._last_used[row] = now
+            self._exact[(intent, key)] = row
+
+    def _free_row(self, dim):
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, dim), dtype=np.float32)
+        if len(self._entries) < self.max_entries:
+            return len(self._entries)
+        self._evictions += 1
+        return int(np.argmin(self._last_used))
+
+    def clear(self):
+        self._matrix = None
+        self._entries = []
+        self._exact = {}
+        self._last_used[:] = 0
+
+    def save(self, path):
+        """Write the entries and their embeddings to an .npz file."""
+        if not self._entries:
+            return
+        n = len(self._entries)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, matrix=self._matrix[:n], entries=np.array(json.dumps(self._entries)))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Load entries saved by save(), dropping those from another prompt/model version."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path) as data:
+                matrix = data["matrix"]
+                entries = json.loads(str(data["entries"]))
+        except Exception as e:
+            logger.warning(f"Could not load response cache from {path}: {e}")
+            return 0
+        # Expiry times are relative to the saving process's monotonic clock, so restart the TTL
+        now = self._clock()
+        self.clear()
+        for vector, entry in zip(matrix, entries):
+            if entry.get("version") != self.version or len(self._entries) >= self.max_entries:
+                continue
+            row = self._free_row(vector.shape[0])
+            entry["expires_at"] = now + self.ttl
+            self._entries.append(entry)
+            self._matrix[row] = vector
+            self._last_used[row] = now
+            self._exact[(entry["intent"], entry["text"])] = row
+        dropped = len(entries) - len(self._entries)
+        logger.info(f"Loaded {len(self._entries)} cached responses from {path} ({dropped} stale)")
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "version": self.version,
+            "embedder": self.embedder.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "avg_lookup_ms": self._lookup_seconds * 1000 / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,72 @@
+"""
+Single-flight coalescing of identical concurrent MCP tool calls.
+
+When several tasks start together they all ask NiFi the same questions (root process
+group ID, processor types, the listing of the same group). A call that arrives while an
+identical one (same tool, same arguments) is still in flight waits for that call and
+shares its result instead of sending another request. Mutating tools are never shared;
+a mutation also detaches the reads in flight, so later reads see its effect.
+"""
+
+import asyncio
+import json
+import logging
+from collections import Counter
+
+from . import metrics
+from .tool_cache import is_mutating_tool
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightClient:
+    """Wraps an MCP client (anything with call_tool/list_tools) and coalesces identical concurrent reads."""
+
+    def __init__(self, client):
+        self._client = client
+        self._flights = {}
+        self._calls = Counter()
+        self._coalesced = Counter()
+
+    async def list_tools(self):
+        return await self._client.list_tools()
+
+    async def call_tool(self, name, arguments=None):
+        arguments = arguments or {}
+        if is_mutating_tool(name):
+            # Reads already in flight may miss the change; later callers must not join them
+            self._flights.clear()
+            return await self._client.call_tool(name, arguments)
+
+        self._calls[name] += 1
+        key = (name, json.dumps(arguments, sort_keys=True, default=str))
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._coalesced[name] += 1
+            metrics.mcp_single_flight_calls.inc(tool=name, outcome="coalesced")
+            logger.debug(f"Joined in-flight {name} call ({len(self._flights)} in flight)")
+        else:
+            metrics.mcp_single_flight_calls.inc(tool=name, outcome="sent")
+            # Runs as its own task, so a cancelled caller does not cancel the call for the others
+            flight = asyncio.ensure_future(self._client.call_tool(name, arguments))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(flight)
+
+    def _finish(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Retrieved here too, in case every caller was cancelled before the call failed
+            flight.exception()
+
+    def stats(self):
+        calls = sum(self._calls.values())
+        coalesced = sum(self._coalesced.values())
+        return {
+            "in_flight": len(self._flights),
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / calls if calls else 0.0,
+            "coalesced_by_tool": dict(self._coalesced.most_common()),
+        }
@@ -0,0 +1,158 @@
+"""
+Lazy startup of the A2A server.
+
+The server starts listening, and serves the agent card, before google.adk, litellm, the
+A2A server and the agent are imported. The heavy imports run on a worker thread and the
+agent and its A2A app are built in the background; requests that need them wait for it. The time of every
+startup phase and the import time of each heavy module are kept for GET /startup.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Imported in this order during warm-up; each entry's time excludes modules loaded by earlier entries
+HEAVY_MODULES = (
+    "numpy",
+    "mcp",
+    "litellm",
+    "google.adk",
+    "google.adk.models.lite_llm",
+    "a2a.server.apps",
+    "a2a.server.request_handlers",
+    f"{__package__}.agent",
+    f"{__package__}.agent_executor",
+    f"{__package__}.request_handler",
+    f"{__package__}.streaming",
+    f"{__package__}.task_store",
+)
+
+# litellm attaches redaction filters to these loggers when it is imported, and the filters
+# import litellm modules lazily. A record logged on the event loop thread while litellm is
+# still being imported on the warm-up thread would deadlock the two imports.
+HELD_LOGGERS = ("asyncio", "httpx", "uvicorn.error", "uvicorn.access")
+
+
+class _HoldRecords(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def filter(self, record):
+        self.records.append(record)
+        return False
+
+
+@contextmanager
+def hold_log_records(names=HELD_LOGGERS):
+    """Keep records of the given loggers back while the block runs, then log them."""
+    hold = _HoldRecords()
+    loggers = [logging.getLogger(name) for name in names]
+    for held in loggers:
+        # First, so that no other filter sees the record while it is held
+        held.filters.insert(0, hold)
+    try:
+        yield
+    finally:
+        for held in loggers:
+            held.removeFilter(hold)
+        for record in hold.records:
+            logging.getLogger(record.name).handle(record)
+
+
+class Startup:
+    """Background warm-up of the agent and the timings of each startup phase."""
+
+    def __init__(self, started):
+        # time.perf_counter() as early in the process as possible
+        self.started = started
+        self.phases = {}
+        self.imports = {}
+        self.app = None
+        self.error = None
+        self._ready = None
+        self._task = None
+
+    def mark(self, phase):
+        elapsed = time.perf_counter() - self.started
+        self.phases[phase] = round(elapsed, 3)
+        logger.info(f"Startup: {phase} after {elapsed:.3f}s")
+
+    def import_modules(self, names=HEAVY_MODULES):
+        for name in names:
+            start = time.perf_counter()
+            importlib.import_module(name)
+            self.imports[name] = round(time.perf_counter() - start, 3)
+
+    async def import_in_background(self, names=HEAVY_MODULES):
+        """Import the heavy modules on a worker thread, so the event loop keeps serving requests."""
+        with hold_log_records():
+            await asyncio.to_thread(self.import_modules, names)
+        self.mark("imported")
+
+    def start(self, warm_up):
+        """Run `warm_up(startup)` in the background once; it must set startup.app."""
+        if self._task is None:
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run(warm_up))
+
+    async def _run(self, warm_up):
+        try:
+            await warm_up(self)
+            self.mark("agent_ready")
+            logger.info(f"Import times (s): {self.imports}")
+        except Exception as e:
+            logger.exception(f"Agent warm-up failed: {e}")
+            self.error = str(e)
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready is not None and self._ready.is_set() and self.error is None
+
+    async def wait(self):
+        await self._ready.wait()
+        if self.error:
+            raise RuntimeError(f"the agent failed to start: {self.error}")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "phases": self.phases,
+            "imports": self.imports,
+        }
+
+
+class DeferredApp:
+    """ASGI app that waits for the warm-up, then passes the request to the A2A app it built."""
+
+    def __init__(self, startup, warm_up):
+        self._startup = startup
+        self._warm_up = warm_up
+
+    async def __call__(self, scope, receive, send):
+        # Without pre-warming, the first request starts the warm-up
+        self._startup.start(self._warm_up)
+        try:
+            await self._startup.wait()
+        except RuntimeError as e:
+            response = JSONResponse({"error": str(e)}, status_code=503)
+            await response(scope, receive, send)
+            return
+        await self._startup.app(scope, receive, send)
@@ -0,0 +1,165 @@
+"""
+Incremental A2A streaming of model tokens and tool progress.
+
+TaskEventStream turns ADK events into A2A events while the agent runs:
+- model tokens are appended to the "response" artifact in coalesced chunks;
+- each tool call and tool result is published as a `working` status update;
+- each tool result is appended as a "Tool Results" section to the "tool_results" artifact.
+
+The task's event queue is bounded. When a slow client lets it fill up, token chunks are
+held back and merged into one buffer (at most the answer text) instead of queueing more
+events. Tool events and the final answer wait for room in the queue.
+"""
+
+import json
+import logging
+import time
+import uuid
+
+from a2a.server.events import InMemoryQueueManager
+from a2a.server.events.event_queue import EventQueue
+from a2a.types import (
+    Artifact,
+    DataPart,
+    Message,
+    Part,
+    Role,
+    TaskArtifactUpdateEvent,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+from .flow_plan import tool_result_text
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_ARTIFACT = "response"
+TOOL_RESULTS_ARTIFACT = "tool_results"
+
+
+class BoundedQueueManager(InMemoryQueueManager):
+    """InMemoryQueueManager whose task event queues hold at most `max_queue_size` events."""
+
+    def __init__(self, max_queue_size):
+        super().__init__()
+        self.max_queue_size = max_queue_size
+
+    async def create_or_tap(self, task_id):
+        async with self._lock:
+            if task_id not in self._task_queue:
+                queue = EventQueue(max_queue_size=self.max_queue_size)
+                self._task_queue[task_id] = queue
+                return queue
+            return self._task_queue[task_id].tap()
+
+
+class TaskEventStream:
+    """Publishes the progress of one running task as A2A events."""
+
+    def __init__(self, event_queue, task_id, context_id, flush_interval=0.05, max_chunk_chars=2000, preview_chars=2000):
+        self.event_queue = event_queue
+        self.task_id = task_id
+        self.context_id = context_id
+        self.flush_interval = flush_interval
+        self.max_chunk_chars = max_chunk_chars
+        self.preview_chars = preview_chars
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = 0.0
+        self._response_started = False
+        self._results_started = False
+
+    async def publish(self, event):
+        """Run one ADK event through the stream."""
+        if event.partial:
+            for part in event.content.parts if event.content else []:
+                if part.text:
+                    await self.text(part.text)
+            return
+        for call in event.get_function_calls():
+            await self.tool_call(call)
+        for response in event.get_function_responses():
+            await self.tool_result(response)
+
+    async def text(self, delta):
+        self._buffer.append(delta)
+        self._buffered += len(delta)
+        due = time.monotonic() - self._last_flush >= self.flush_interval or self._buffered >= self.max_chunk_chars
+        # A full queue means the client is behind; keep merging tokens instead of queueing more events
+        if due and not self.event_queue.queue.full():
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer, self._buffered = [], 0
+        self._last_flush = time.monotonic()
+        await self._artifact(RESPONSE_ARTIFACT, text, append=self._response_started)
+        self._response_started = True
+
+    async def tool_call(self, call):
+        await self.flush()
+        await self._status(f"Calling {call.name}", {"type": "tool_call", "id": call.id, "name": call.name, "args": call.args or {}})
+
+    async def tool_result(self, response):
+        await self.flush()
+        text = _response_text(response.response)
+        failed = _is_error(response.response)
+        await self._status(
+            f"{response.name} {'failed' if failed else 'finished'}",
+            {"type": "tool_result", "id": response.id, "name": response.name, "error": failed},
+        )
+        preview = text if len(text) <= self.preview_chars else text[:self.preview_chars] + "\n... (truncated)"
+        section = f"{'' if self._results_started else '## Tool Results'}\n### {response.name}\n```\n{preview}\n```\n"
+        await self._artifact(TOOL_RESULTS_ARTIFACT, section, append=self._results_started)
+        self._results_started = True
+
+    async def finish(self, answer):
+        """Replace the streamed chunks with the complete answer as a single final chunk."""
+        self._buffer, self._buffered = [], 0
+        await self._artifact(RESPONSE_ARTIFACT, answer, append=False, last_chunk=True)
+
+    async def _artifact(self, artifact_id, text, append, last_chunk=False):
+        await self._enqueue(TaskArtifactUpdateEvent(
+            taskId=self.task_id,
+            contextId=self.context_id,
+            artifact=Artifact(artifactId=artifact_id, name=artifact_id, parts=[Part(root=TextPart(text=text))]),
+            append=append,
+            lastChunk=last_chunk,
+        ))
+
+    async def _status(self, text, data):
+        message = Message(
+            role=Role.agent,
+            parts=[Part(root=TextPart(text=text)), Part(root=DataPart(data=data))],
+            messageId=str(uuid.uuid4()),
+            taskId=self.task_id,
+            contextId=self.context_id,
+        )
+        await self._enqueue(TaskStatusUpdateEvent(
+            taskId=self.task_id,
+            contextId=self.context_id,
+            status=TaskStatus(state=TaskState.working, message=message),
+            final=False,
+        ))
+
+    async def _enqueue(self, event):
+        await self.event_queue.enqueue_event(event)
+
+
+def _response_text(response):
+    # ADK wraps non-dict tool results (MCP CallToolResult) as {"result": ...}
+    result = response.get("result", response) if isinstance(response, dict) else response
+    if hasattr(result, "content"):
+        return tool_result_text(result)
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, default=str, indent=2)
+
+
+def _is_error(response):
+    result = response.get("result", response) if isinstance(response, dict) else response
+    return bool(getattr(result, "isError", False) or (isinstance(result, dict) and result.get("error")))
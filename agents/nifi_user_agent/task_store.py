@@ -0,0 +1,304 @@
+"""
+Durable, bounded task store for the A2A request handler.
+
+InMemoryTaskStore keeps every task for the lifetime of the process and forgets them all
+on restart. SqliteTaskStore keeps unfinished tasks in memory (up to a cap, dropping those
+idle for longer than an hour; they stay readable from the database), holds only an LRU
+window of finished tasks, writes task state to SQLite (WAL mode) in batches from a background
+flusher, and periodically compacts tasks older than the retention window.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from a2a.server.tasks import InMemoryTaskStore
+from a2a.server.tasks.task_store import TaskStore
+from a2a.types import Task, TaskState
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = {TaskState.completed, TaskState.canceled, TaskState.failed, TaskState.rejected}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    context_id TEXT,
+    state TEXT,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_state_updated_at ON tasks (state, updated_at);
+"""
+
+
+def is_terminal(task):
+    return task.status is not None and task.status.state in TERMINAL_STATES
+
+
+class SqliteTaskStore(TaskStore):
+    """TaskStore backed by SQLite with write batching and a bounded in-memory window."""
+
+    def __init__(
+        self,
+        path,
+        max_cached_tasks=1000,
+        flush_interval=0.5,
+        flush_batch_size=200,
+        retention_seconds=7 * 24 * 3600,
+        compaction_interval=3600.0,
+        max_active_tasks=10000,
+        active_idle_seconds=3600.0,
+    ):
+        self.path = path
+        self.max_cached_tasks = max_cached_tasks
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.retention_seconds = retention_seconds
+        self.compaction_interval = compaction_interval
+        self.max_active_tasks = max_active_tasks
+        self.active_idle_seconds = active_idle_seconds
+
+        # Unfinished tasks by last save; abandoned ones (input-required, crashed producers) age out
+        self._active = OrderedDict()
+        self._active_saved_at = {}
+        self._recent = OrderedDict()
+        self._dirty = {}
+        self._inflight = {}
+        self._deleted = set()
+        self._lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._background = []
+
+        # All SQLite work runs on a single thread, so the connection is never shared
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+        self._conn = None
+
+        self._writes = 0
+        self._batches = 0
+        self._db_reads = 0
+        self._compacted = 0
+        self._evicted_active = 0
+
+    async def start(self):
+        """Open the database and start the flusher and compaction loops."""
+        if self._background:
+            return
+        await self._run_db(self._open)
+        self._background = [asyncio.create_task(self._flush_loop())]
+        if self.compaction_interval > 0:
+            self._background.append(asyncio.create_task(self._compaction_loop()))
+        logger.info(f"SQLite task store opened at {self.path}")
+
+    async def close(self):
+        """Flush pending writes, stop background work and close the database."""
+        for task in self._background:
+            task.cancel()
+        self._background = []
+        await self.flush()
+        await self._run_db(self._close)
+        self._db_thread.shutdown(wait=True)
+
+    async def save(self, task: Task) -> None:
+        if not self._background:
+            await self.start()
+        async with self._lock:
+            self._deleted.discard(task.id)
+            self._dirty[task.id] = task
+            if is_terminal(task):
+                self._forget_active(task.id)
+                self._remember(task)
+            else:
+                self._recent.pop(task.id, None)
+                self._active[task.id] = task
+                self._active.move_to_end(task.id)
+                self._active_saved_at[task.id] = time.monotonic()
+                self._evict_active()
+            if len(self._dirty) >= self.flush_batch_size:
+                self._flush_requested.set()
+
+    async def get(self, task_id: str) -> Task | None:
+        async with self._lock:
+            task = self._active.get(task_id) or self._dirty.get(task_id) or self._inflight.get(task_id)
+            if task is None and task_id in self._recent:
+                self._recent.move_to_end(task_id)
+                task = self._recent[task_id]
+            if task is not None or task_id in self._deleted:
+                return task
+        if not self._background:
+            await self.start()
+        data = await self._run_db(self._load, task_id)
+        self._db_reads += 1
+        if data is None:
+            return None
+        task = Task.model_validate_json(data)
+        # Unfinished tasks may belong to another worker and keep changing, so only finished ones are cached
+        if is_terminal(task):
+            async with self._lock:
+                if task_id not in self._active and task_id not in self._deleted:
+                    self._remember(task)
+        return task
+
+    async def delete(self, task_id: str) -> None:
+        async with self._lock:
+            self._forget_active(task_id)
+            self._recent.pop(task_id, None)
+            self._dirty.pop(task_id, None)
+            self._deleted.add(task_id)
+            self._flush_requested.set()
+
+    def _forget_active(self, task_id):
+        self._active.pop(task_id, None)
+        self._active_saved_at.pop(task_id, None)
+
+    def _evict_active(self):
+        """Drop the oldest unfinished tasks over the cap or idle too long; they are still read from SQLite."""
+        cutoff = time.monotonic() - self.active_idle_seconds
+        while self._active:
+            task_id = next(iter(self._active))
+            if len(self._active) <= self.max_active_tasks and self._active_saved_at[task_id] > cutoff:
+                break
+            self._forget_active(task_id)
+            self._evicted_active += 1
+
+    def _remember(self, task):
+        self._recent[task.id] = task
+        self._recent.move_to_end(task.id)
+        while len(self._recent) > self.max_cached_tasks:
+            self._recent.popitem(last=False)
+
+    async def flush(self):
+        """Write every pending save and delete in one transaction."""
+        async with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            deleted, self._deleted = self._deleted, set()
+            self._inflight = dirty
+        if not dirty and not deleted:
+            return
+        now = time.time()
+        rows = [
+            (task.id, task.contextId, task.status.state.value if task.status else None, now, task.model_dump_json(exclude_none=True))
+            for task in dirty.values()
+        ]
+        try:
+            await self._run_db(self._write_batch, rows, list(deleted))
+        except Exception:
+            # Put the batch back so the next flush retries it
+            async with self._lock:
+                for task_id, task in dirty.items():
+                    self._dirty.setdefault(task_id, task)
+                self._deleted |= deleted - set(self._dirty)
+            raise
+        finally:
+            self._inflight = {}
+        self._writes += len(rows)
+        self._batches += 1
+
+    async def compact(self):
+        """Delete finished tasks older than the retention window and checkpoint the WAL."""
+        cutoff = time.time() - self.retention_seconds
+        states = [state.value for state in TERMINAL_STATES]
+        removed = await self._run_db(self._compact, cutoff, states)
+        async with self._lock:
+            for task_id in removed:
+                self._recent.pop(task_id, None)
+            self._evict_active()
+        self._compacted += len(removed)
+        if removed:
+            logger.info(f"Compacted {len(removed)} tasks older than {self.retention_seconds}s from {self.path}")
+        return len(removed)
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Task store flush failed: {e}")
+
+    async def _compaction_loop(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Task store compaction failed: {e}")
+            await asyncio.sleep(self.compaction_interval)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "active": len(self._active),
+            "evicted_active": self._evicted_active,
+            "cached_finished": len(self._recent),
+            "max_cached_tasks": self.max_cached_tasks,
+            "pending_writes": len(self._dirty),
+            "writes": self._writes,
+            "write_batches": self._batches,
+            "db_reads": self._db_reads,
+            "compacted": self._compacted,
+        }
+
+    # --- SQLite thread ---
+
+    async def _run_db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db_thread, fn, *args)
+
+    def _open(self):
+        # Several server workers may share the file; wait on their write locks instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _load(self, task_id):
+        row = self._conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row[0] if row else None
+
+    def _write_batch(self, rows, deleted):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO tasks (id, context_id, state, updated_at, data) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET context_id = excluded.context_id, state = excluded.state, "
+                "updated_at = excluded.updated_at, data = excluded.data",
+                rows,
+            )
+            self._conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in deleted])
+
+    def _compact(self, cutoff, states):
+        placeholders = ",".join("?" * len(states))
+        where = f"updated_at < ? AND state IN ({placeholders})"
+        with self._conn:
+            removed = [row[0] for row in self._conn.execute(f"SELECT id FROM tasks WHERE {where}", (cutoff, *states))]
+            self._conn.execute(f"DELETE FROM tasks WHERE {where}", (cutoff, *states))
+        self._conn.execute("PRAGMA incremental_vacuum")
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+
+def create_task_store():
+    """Task store selected by TASK_STORE ('sqlite' or 'memory')."""
+    if config.TASK_STORE == "memory":
+        return InMemoryTaskStore()
+    return SqliteTaskStore(
+        config.TASK_STORE_PATH,
+        max_cached_tasks=config.TASK_STORE_MAX_CACHED_TASKS,
+        flush_interval=config.TASK_STORE_FLUSH_INTERVAL,
+        retention_seconds=config.TASK_STORE_RETENTION_DAYS * 24 * 3600,
+        max_active_tasks=config.TASK_STORE_MAX_ACTIVE_TASKS,
+    )
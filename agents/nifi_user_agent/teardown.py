@@ -0,0 +1,427 @@
+"""
+Bulk teardown of NiFi components for FLOW_MANAGEMENT.
+
+Deleting a component needs its current revision, so removing a pipeline used to take a
+get_processor_details() turn and a delete_* turn per component. teardown_flow removes the
+contents of a process group (or a list of processors) in one call:
+1. one concurrent sweep reads the revisions: list_processors and get_process_groups of every
+   group in the tree, or get_processor_details of each listed processor;
+2. running processors are stopped and connection queues emptied, when the MCP server has
+   tools for that (STOP_TOOLS, DRAIN_TOOLS);
+3. connections are deleted, then processors, then process groups deepest first, each phase
+   concurrently up to a limit. Connections come from list_connections when the server has
+   it, otherwise from the flow index, which only knows the connections the agent created; the
+   report says when connections may be missing;
+4. a delete rejected because of a stale revision re-reads the revision and is retried. Other
+   rejections (such as a processor that still has connections) are not retried.
+Components that depend on a failed delete are skipped. The model gets one summary.
+"""
+
+import asyncio
+import functools
+import logging
+import re
+import time
+from typing import Optional
+
+from .flow_plan import tool_result_text
+from .tool_cache import iter_entities, parse_tool_result
+
+logger = logging.getLogger(__name__)
+
+# Optional MCP tools, used when the server lists them (first match wins)
+STOP_TOOLS = ("stop_processor", "update_processor_state")
+DRAIN_TOOLS = ("empty_connection_queue", "drop_connection_queue")
+CONNECTION_LISTING_TOOLS = ("list_connections",)
+
+# NiFi answers a stale revision with HTTP 409 "... is not the most up-to-date revision ...". Other 409s,
+# e.g. "... has incoming connections", are not fixed by a newer revision
+_CONFLICT = re.compile(
+    r"not the most up-to-date revision|stale revision|revision (is stale|mismatch|does not match|is not current)",
+    re.IGNORECASE)
+MAX_LISTED = 100
+PAST = {"stop": "stopped", "drain": "drained", "delete": "deleted"}
+
+
+class _Aborted(Exception):
+    """Nothing can be deleted safely; the message is reported as the teardown's error."""
+
+
+class _Component:
+    __slots__ = ("kind", "id", "name", "group_id", "version", "state", "source_id", "target_id", "depth")
+
+    def __init__(self, kind, component_id, name="", group_id=None, version=None, state=None,
+                 source_id=None, target_id=None, depth=0):
+        self.kind = kind
+        self.id = component_id
+        self.name = name
+        self.group_id = group_id
+        self.version = version
+        self.state = state
+        self.source_id = source_id
+        self.target_id = target_id
+        self.depth = depth
+
+    def summary(self):
+        return {"kind": self.kind, "id": self.id, "name": self.name}
+
+
+def _check(outcome):
+    """Payload of a tool call outcome (result or exception from gather); raises for failures."""
+    if isinstance(outcome, Exception):
+        raise outcome
+    if getattr(outcome, "isError", False):
+        raise RuntimeError(tool_result_text(outcome) or "tool returned an error")
+    return parse_tool_result(outcome)
+
+
+def _entities(payload, key):
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    return [item for item in items or [] if isinstance(item, dict) and item.get("id")]
+
+
+def _revision(payload, component_id):
+    for entity_id, version, _ in iter_entities(payload):
+        if entity_id == component_id:
+            return version
+    return None
+
+
+def _processor(entity, group_id=None):
+    component = entity.get("component") or {}
+    state = (entity.get("status") or {}).get("runStatus") or component.get("state")
+    return _Component("processor", entity["id"], component.get("name") or entity.get("name") or "",
+                      component.get("parentGroupId") or group_id, (entity.get("revision") or {}).get("version"),
+                      state.upper() if state else None)
+
+
+def _connection(entity, group_id=None):
+    component = entity.get("component") or {}
+    return _Component(
+        "connection", entity["id"], component.get("name") or "", component.get("parentGroupId") or group_id,
+        (entity.get("revision") or {}).get("version"),
+        source_id=entity.get("sourceId") or (component.get("source") or {}).get("id"),
+        target_id=entity.get("destinationId") or (component.get("destination") or {}).get("id"))
+
+
+class FlowTeardown:
+    """Stops, drains and deletes NiFi components in dependency order through an MCP client."""
+
+    def __init__(self, client, index=None, max_concurrency=8, max_retries=3, retry_delay=0.2, max_groups=500):
+        self._client = client
+        self._index = index
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._max_groups = max_groups
+
+    async def teardown(self, process_group_id=None, processor_ids=None, delete_group=False, dry_run=False):
+        start = time.perf_counter()
+        if not process_group_id and not processor_ids:
+            raise ValueError("give a process_group_id or processor_ids")
+        tools = {tool.name: tool for tool in getattr(await self._client.list_tools(), "tools", [])}
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        report = {"status": "success", "process_group_id": process_group_id, "deleted": [], "stopped": 0,
+                  "drained": 0, "retries": 0, "errors": [], "notes": []}
+
+        async def call(name, arguments):
+            async with semaphore:
+                return await self._client.call_tool(name, arguments)
+
+        list_connections = next((name for name in CONNECTION_LISTING_TOOLS if name in tools), None)
+        refresh = functools.partial(self._refresh, call, list_connections)
+        try:
+            processors, groups, connections = await self._sweep(
+                call, list_connections, report, process_group_id, processor_ids, delete_group)
+        except _Aborted as e:
+            report["status"] = "failed"
+            report["errors"].append({"kind": "process_group", "id": process_group_id, "error": str(e)})
+            report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+            return report
+        report["found"] = {"processors": len(processors), "connections": len(connections),
+                           "process_groups": len(groups)}
+        if dry_run:
+            report["status"] = "dry_run"
+            report["would_delete"] = [c.summary() for c in (connections + processors + groups)][:MAX_LISTED]
+            report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+            return report
+
+        # Component ID -> the action that failed (or was skipped) for it
+        failed = {}
+
+        async def run(components, names, arguments, action, counter=None, blocked_by=None):
+            """One phase: `action` on every component concurrently, skipping those blocked by a failure."""
+            optional = isinstance(names, tuple)
+            name = next((n for n in names if n in tools), None) if optional else names
+            if not components:
+                return
+            if optional and name is None:
+                report["notes"].append(f"The MCP server has no {' or '.join(names)} tool, so {len(components)} "
+                                       f"{components[0].kind}s were not {PAST[action]} first")
+                return
+            if tools and name not in tools:
+                for component in components:
+                    failed[component.id] = action
+                    report["errors"].append({**component.summary(), "error": f"{name} is not available"})
+                return
+            properties = (getattr(tools.get(name), "inputSchema", None) or {}).get("properties")
+
+            async def one(component):
+                blockers = sorted(blocked_by(component) & failed.keys()) if blocked_by else []
+                if blockers:
+                    failed[component.id] = action
+                    report["errors"].append({**component.summary(), "skipped": True,
+                                             "error": f"{blockers[0]} could not be {PAST[failed[blockers[0]]]}"})
+                    return
+                try:
+                    await self._call_with_retries(call, refresh, name, properties, component, arguments(component), report)
+                except Exception as e:
+                    failed[component.id] = action
+                    logger.warning(f"Teardown could not {action} {component.kind} {component.id}: {e}")
+                    report["errors"].append({**component.summary(), "error": f"{action} failed: {e}"})
+                    return
+                if counter:
+                    report[counter] += 1
+                else:
+                    report["deleted"].append(component.summary())
+
+            await asyncio.gather(*(one(component) for component in components))
+
+        running = [p for p in processors if p.state == "RUNNING"]
+        connected, contents = {}, {}
+        for connection in connections:
+            for end in (connection.source_id, connection.target_id):
+                connected.setdefault(end, set()).add(connection.id)
+        for component in processors + connections + groups:
+            contents.setdefault(component.group_id, set()).add(component.id)
+
+        await run(running, STOP_TOOLS, lambda p: {"processor_id": p.id, "version": p.version, "state": "STOPPED"},
+                  "stop", counter="stopped")
+        await run(connections, DRAIN_TOOLS, lambda c: {"connection_id": c.id}, "drain", counter="drained")
+        await run(connections, "delete_connection", lambda c: {"connection_id": c.id, "version": c.version},
+                  "delete", blocked_by=lambda c: {c.id})
+        await run(processors, "delete_processor", lambda p: {"processor_id": p.id, "version": p.version},
+                  "delete", blocked_by=lambda p: connected.get(p.id, set()) | {p.id})
+        for depth in sorted({group.depth for group in groups}, reverse=True):
+            await run([group for group in groups if group.depth == depth], "delete_process_group",
+                      lambda g: {"process_group_id": g.id, "version": g.version}, "delete",
+                      blocked_by=lambda g: contents.get(g.id, set()))
+
+        if report["errors"]:
+            report["status"] = "partial" if report["deleted"] else "failed"
+        report["counts"] = {kind: sum(1 for c in report["deleted"] if c["kind"] == kind)
+                            for kind in ("connection", "processor", "process_group")}
+        report["deleted"] = report["deleted"][:MAX_LISTED]
+        report["errors"] = report["errors"][:MAX_LISTED]
+        report["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return report
+
+    async def _sweep(self, call, list_connections, report, process_group_id, processor_ids, delete_group):
+        """(processors, process groups to delete, connections) with their current revisions."""
+        processors, groups, connections = {}, [], {}
+
+        def failed(kind, component_id, what, outcome):
+            error = outcome if isinstance(outcome, Exception) else tool_result_text(outcome)
+            report["errors"].append({"kind": kind, "id": component_id, "error": f"{what} failed: {error}"})
+
+        if processor_ids:
+            results = await asyncio.gather(
+                *(call("get_processor_details", {"processor_id": p}) for p in processor_ids), return_exceptions=True)
+            for processor_id, result in zip(processor_ids, results):
+                try:
+                    processors[processor_id] = _processor(_check(result))
+                except Exception as e:
+                    failed("processor", processor_id, "reading the processor", e)
+            scanned = {p.group_id for p in processors.values() if p.group_id}
+        else:
+            located = None
+            if delete_group:
+                target = _Component("process_group", process_group_id)
+                groups.append(target)
+                located = asyncio.create_task(self._locate_group(call, target, report))
+            # Breadth-first over the group tree; the listings of each level run concurrently
+            level, depth, scanned = [process_group_id], 0, set()
+            while level:
+                scanned.update(level)
+                listings = await asyncio.gather(*(
+                    call(tool, {"process_group_id": group_id})
+                    for group_id in level for tool in ("list_processors", "get_process_groups")
+                ), return_exceptions=True)
+                next_level = []
+                for i, group_id in enumerate(level):
+                    listed, children = listings[2 * i], listings[2 * i + 1]
+                    try:
+                        for entity in _entities(_check(listed), "processors"):
+                            processors[entity["id"]] = _processor(entity, group_id)
+                    except Exception:
+                        failed("process_group", group_id, "listing processors", listed)
+                    try:
+                        children = _entities(_check(children), "processGroups")
+                    except Exception:
+                        failed("process_group", group_id, "listing process groups", children)
+                        children = []
+                    for entity in children:
+                        component = entity.get("component") or {}
+                        groups.append(_Component("process_group", entity["id"], component.get("name") or "",
+                                                 group_id, (entity.get("revision") or {}).get("version"),
+                                                 depth=depth + 1))
+                        next_level.append(entity["id"])
+                if len(scanned) + len(next_level) > self._max_groups:
+                    report["notes"].append(f"Only the first {self._max_groups} process groups were read")
+                    next_level = next_level[:max(self._max_groups - len(scanned), 0)]
+                level, depth = next_level, depth + 1
+            if located is not None and not await located:
+                groups.remove(target)
+
+        if list_connections:
+            scanned = sorted(scanned)
+            results = await asyncio.gather(
+                *(call(list_connections, {"process_group_id": g}) for g in scanned), return_exceptions=True)
+            for group_id, result in zip(scanned, results):
+                try:
+                    for entity in _entities(_check(result), "connections"):
+                        connections[entity["id"]] = _connection(entity, group_id)
+                except Exception:
+                    failed("process_group", group_id, "listing connections", result)
+        else:
+            if self._index is not None:
+                for node in list(self._index.connections.values()):
+                    connections[node.id] = _Component("connection", node.id, "", node.group_id, node.version,
+                                                      source_id=node.source_id, target_id=node.target_id)
+            unknown = [p for p in processors
+                       if self._index is None or not self._index.connections_known(p)]
+            if unknown:
+                report["connections_complete"] = False
+                report["notes"].append(
+                    f"The MCP server has no connection listing, so only connections created by this agent are "
+                    f"deleted. {len(unknown)} processor(s) may have other connections; their deletes fail until "
+                    f"those connections are removed in NiFi")
+        # Connections of the processors; when a whole group goes, also every other connection inside it
+        connections = [c for c in connections.values() if c.source_id in processors or c.target_id in processors
+                       or (not processor_ids and c.group_id in scanned)]
+        return list(processors.values()), groups, connections
+
+    async def _locate_group(self, call, group, report):
+        """Set the parent, name and current revision of a group to delete, from its parent's listing.
+
+        False (with an error in the report) when the group cannot be deleted; raises _Aborted when the
+        root group ID cannot be read.
+        """
+        known = self._index.groups.get(group.id) if self._index is not None else None
+        try:
+            if known is not None and known.parent_id and await self._find_child(call, group, [known.parent_id], 1):
+                return True
+            result = await call("get_root_process_group_id", {})
+            if getattr(result, "isError", False):
+                raise _Aborted(f"reading the root process group ID failed: "
+                               f"{tool_result_text(result) or 'tool returned an error'}")
+            root_id = tool_result_text(result).strip()
+            if root_id == group.id:
+                report["errors"].append({**group.summary(), "error": "the root process group cannot be deleted"})
+                return False
+            if await self._find_child(call, group, [root_id], self._max_groups):
+                return True
+        except _Aborted:
+            raise
+        except Exception as e:
+            report["errors"].append({**group.summary(), "error": f"reading its revision failed: {e}"})
+            return False
+        report["errors"].append({**group.summary(), "error": "not found in the process group tree"})
+        return False
+
+    async def _find_child(self, call, group, level, max_groups):
+        """Search the group tree breadth-first from `level` for `group`; True once found."""
+        read = 0
+        while level and read < max_groups:
+            listings = await asyncio.gather(
+                *(call("get_process_groups", {"process_group_id": g}) for g in level), return_exceptions=True)
+            read += len(level)
+            next_level = []
+            for parent_id, listing in zip(level, listings):
+                try:
+                    children = _entities(_check(listing), "processGroups")
+                except Exception:
+                    continue
+                for entity in children:
+                    if entity["id"] == group.id:
+                        group.group_id = parent_id
+                        group.name = (entity.get("component") or {}).get("name") or ""
+                        group.version = (entity.get("revision") or {}).get("version")
+                        return True
+                    next_level.append(entity["id"])
+            level = next_level
+        return False
+
+    async def _refresh(self, call, list_connections, component):
+        """Current revision of a component, e.g. after a conflict; None if it cannot be read."""
+        if component.kind == "processor":
+            payload = _check(await call("get_processor_details", {"processor_id": component.id}))
+        elif component.kind == "process_group" and component.group_id:
+            payload = _check(await call("get_process_groups", {"process_group_id": component.group_id}))
+        elif component.kind == "connection" and list_connections:
+            payload = _check(await call(list_connections, {"process_group_id": component.group_id}))
+        elif component.kind == "connection" and self._index is not None:
+            node = self._index.connections.get(component.id)
+            return node.version if node is not None else None
+        else:
+            return None
+        return _revision(payload, component.id)
+
+    async def _call_with_retries(self, call, refresh, name, properties, component, arguments, report):
+        # Only the arguments the tool declares, so optional tools with other signatures work too
+        for attempt in range(self._max_retries + 1):
+            if "version" in arguments:
+                if component.version is None:
+                    component.version = await refresh(component)
+                    if component.version is None:
+                        raise RuntimeError("its current revision could not be read")
+                arguments["version"] = component.version
+            sent = {k: v for k, v in arguments.items() if properties is None or k in properties}
+            result = await call(name, sent)
+            if not getattr(result, "isError", False):
+                # Stopping a processor bumps its revision; the delete needs the new one
+                version = _revision(parse_tool_result(result), component.id)
+                component.version = version if version is not None else component.version
+                return result
+            text = tool_result_text(result) or "tool returned an error"
+            if attempt == self._max_retries or not _CONFLICT.search(text):
+                raise RuntimeError(text)
+            report["retries"] += 1
+            await asyncio.sleep(self._retry_delay * 2 ** attempt)
+            component.version = await refresh(component)
+
+
+def create_teardown_tool(client, index=None, max_concurrency=8, max_retries=3, max_groups=500):
+    """Build the teardown_flow function tool bound to an MCP client."""
+    teardown = FlowTeardown(client, index, max_concurrency=max_concurrency, max_retries=max_retries,
+                            max_groups=max_groups)
+
+    async def teardown_flow(
+        process_group_id: Optional[str] = None,
+        processor_ids: Optional[list[str]] = None,
+        delete_group: Optional[bool] = None,
+        dry_run: Optional[bool] = None,
+    ) -> dict:
+        """Deletes many NiFi components in one call: everything in a process group, or a list of processors.
+
+        Use this instead of get_processor_details() + delete_processor()/delete_connection() per component
+        whenever more than one component is removed. Revisions are read for you; running processors are
+        stopped, queues emptied, and connections deleted before processors. Deletes that hit a stale revision
+        are retried with the current one.
+
+        Args:
+            process_group_id: Remove every processor, connection and child process group inside this group.
+            processor_ids: Remove only these processors and their connections (instead of a whole group).
+            delete_group: Also delete the process group itself. Optional, false when omitted.
+            dry_run: Only report what would be deleted. Optional, false when omitted.
+
+        Returns:
+            dict: status ("success", "partial", "failed" or "dry_run"), the deleted components (kind, exact ID,
+            name), counts per kind, how many processors were stopped, retries, errors and notes.
+        """
+        try:
+            return await teardown.teardown(process_group_id, processor_ids, bool(delete_group), bool(dry_run))
+        except ValueError as e:
+            return {"status": "invalid_request", "error": str(e)}
+
+    return teardown_flow
@@ -0,0 +1,228 @@
+"""
+Read-through cache for NiFi MCP inspection tools.
+
+Sits between the MCP toolset and the session pool. Read-only tools are cached with a
+per-tool TTL in an LRU map; create_*/delete_* calls invalidate the listings and details
+of the process group they touch. Every result is scanned for NiFi revisions, so a
+component seen with a newer revision than a cached answer knows about evicts that answer.
+A read that was in flight while a mutation ran is returned but not cached, since it may
+predate the change.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Seconds a result stays valid. Tools not listed here are never cached.
+DEFAULT_TTLS = {
+    "get_root_process_group_id": 3600.0,
+    "get_processor_types": 3600.0,
+    "get_process_groups": 30.0,
+    "list_processors": 30.0,
+    "get_processor_details": 15.0,
+}
+
+# Cached tools whose answers depend on the contents of a process group
+GROUP_SCOPED_TOOLS = ("list_processors", "get_process_groups", "get_processor_details")
+
+MUTATING_PREFIXES = ("create_", "delete_", "update_", "start_", "stop_")
+
+
+def is_mutating_tool(name):
+    """True for tools that change the NiFi flow and must never be cached or shared."""
+    return name.startswith(MUTATING_PREFIXES)
+
+
+def parse_tool_result(result):
+    """Decode the JSON payload of an MCP CallToolResult, or None if it is not JSON."""
+    if isinstance(result, (dict, list)):
+        return result
+    for item in getattr(result, "content", None) or []:
+        text = getattr(item, "text", None)
+        if not text:
+            continue
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+    return None
+
+
+def iter_entities(payload):
+    """Yield (id, revision version, parent group id) for every NiFi entity in a payload."""
+    if isinstance(payload, list):
+        for item in payload:
+            yield from iter_entities(item)
+    elif isinstance(payload, dict):
+        if "id" in payload and ("revision" in payload or "component" in payload):
+            revision = payload.get("revision") or {}
+            component = payload.get("component") or {}
+            yield (
+                payload["id"],
+                revision.get("version"),
+                component.get("parentGroupId") or payload.get("parentGroupId"),
+            )
+        for value in payload.values():
+            if isinstance(value, (dict, list)):
+                yield from iter_entities(value)
+
+
+def _target_component_id(arguments):
+    for key, value in arguments.items():
+        if key.endswith("_id") and key not in ("process_group_id", "parent_group_id"):
+            return value
+    return None
+
+
+def _target_group_id(arguments):
+    return arguments.get("process_group_id") or arguments.get("parent_group_id")
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    result: object
+    expires_at: float
+    group_id: str = None
+    component_ids: set = field(default_factory=set)
+
+
+class ToolResultCache:
+    """Wraps an MCP client (anything with call_tool/list_tools) with a read-through cache."""
+
+    def __init__(self, client, ttls=None, max_entries=512, clock=time.monotonic):
+        self._client = client
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._revisions = {}
+        self._component_groups = {}
+        # Bumped when a mutation starts and ends; a read that overlapped one is not stored
+        self._epoch = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._skipped_stores = 0
+
+    async def list_tools(self):
+        return await self._client.list_tools()
+
+    async def call_tool(self, name, arguments=None):
+        arguments = arguments or {}
+        if is_mutating_tool(name):
+            self._epoch += 1
+            try:
+                result = await self._client.call_tool(name, arguments)
+            finally:
+                self._epoch += 1
+                self._invalidate_for_mutation(name, arguments)
+            self._observe(parse_tool_result(result))
+            return result
+
+        ttl = self._ttls.get(name)
+        if not ttl:
+            return await self._client.call_tool(name, arguments)
+
+        key = (name, json.dumps(arguments, sort_keys=True, default=str))
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self._clock():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.result
+
+        self._misses += 1
+        epoch = self._epoch
+        result = await self._client.call_tool(name, arguments)
+        if getattr(result, "isError", False):
+            return result
+        if epoch != self._epoch:
+            # A mutation ran while this read was in flight, so the result may predate it
+            self._skipped_stores += 1
+            self._observe(parse_tool_result(result))
+        else:
+            self._store(key, name, arguments, result, ttl)
+        return result
+
+    def _store(self, key, name, arguments, result, ttl):
+        payload = parse_tool_result(result)
+        component_ids = set()
+        group_id = _target_group_id(arguments)
+        for component_id, version, parent_id in self._observe(payload):
+            component_ids.add(component_id)
+            if name == "get_processor_details" and parent_id:
+                group_id = parent_id
+
+        self._entries[key] = _CacheEntry(name, result, self._clock() + ttl, group_id, component_ids)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _observe(self, payload):
+        """Record revisions and owning groups; evict answers made stale by a newer revision."""
+        entities = list(iter_entities(payload)) if payload is not None else []
+        for component_id, version, parent_id in entities:
+            if parent_id:
+                self._component_groups[component_id] = parent_id
+            if version is None:
+                continue
+            known = self._revisions.get(component_id)
+            if known is not None and version > known:
+                self.invalidate_component(component_id)
+            if known is None or version > known:
+                self._revisions[component_id] = version
+        return entities
+
+    def _invalidate_for_mutation(self, name, arguments):
+        group_id = _target_group_id(arguments)
+        component_id = None if name.startswith("create_") else _target_component_id(arguments)
+        if component_id:
+            group_id = group_id or self._component_groups.get(component_id)
+            self.invalidate_component(component_id)
+            self._revisions.pop(component_id, None)
+        if group_id:
+            self.invalidate_group(group_id)
+        else:
+            # We cannot tell which group changed, so drop every group-scoped answer
+            self.invalidate(*GROUP_SCOPED_TOOLS)
+
+    def _drop(self, predicate):
+        stale = [key for key, entry in self._entries.items() if predicate(entry)]
+        for key in stale:
+            del self._entries[key]
+        self._invalidations += len(stale)
+        return len(stale)
+
+    def invalidate_group(self, group_id):
+        """Drop listings and processor details that belong to a process group."""
+        return self._drop(lambda e: e.name in GROUP_SCOPED_TOOLS and e.group_id == group_id)
+
+    def invalidate_component(self, component_id):
+        """Drop every cached answer that mentions a component."""
+        return self._drop(lambda e: component_id in e.component_ids)
+
+    def invalidate(self, *names):
+        """Drop cached answers of the given tools, or everything when no name is given."""
+        if not names:
+            return self._drop(lambda e: True)
+        return self._drop(lambda e: e.name in names)
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "skipped_stores": self._skipped_stores,
+        }
@@ -0,0 +1,197 @@
+"""
+Per-task tracing of LLM turns and MCP tool calls.
+
+Every task updates the Prometheus metrics in metrics.py. A sampled share of tasks
+(TRACE_SAMPLE_RATE) also records a span tree: the task, then each model turn and each
+MCP tool call with its duration, token counts and payload sizes. The most recent traces
+are kept in memory and served at /traces. With sampling off, a call costs a few counter
+and histogram updates and no span objects are created.
+"""
+
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import config, metrics
+from .flow_plan import tool_result_text
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("nifi_task_trace", default=None)
+# Invocation ID of the model call being made, set by trace_llm_start
+_llm_invocation = contextvars.ContextVar("nifi_llm_invocation", default=None)
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attributes")
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.attributes = attributes
+
+    def finish(self, **attributes):
+        self.end = time.perf_counter()
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin):
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(((self.end or time.perf_counter()) - self.start) * 1000, 3),
+            **self.attributes,
+        }
+
+
+class TaskTrace:
+    """Instrumentation state of one running task; spans are only kept when sampled."""
+
+    def __init__(self, task_id, sampled, **attributes):
+        self.root = Span("a2a.task", task_id=task_id, **attributes)
+        self.sampled = sampled
+        self.spans = []
+        # Model calls started but not finished, by invocation ID
+        self.llm_calls = {}
+
+    def start(self, name, **attributes):
+        span = Span(name, **attributes) if self.sampled else None
+        if span is not None:
+            self.spans.append(span)
+        return span
+
+    def to_dict(self):
+        origin = self.root.start
+        return {**self.root.to_dict(origin), "children": [span.to_dict(origin) for span in self.spans]}
+
+
+class Tracer:
+    def __init__(self, sample_rate=0.0, max_traces=100):
+        self.sample_rate = sample_rate
+        self._traces = deque(maxlen=max_traces)
+
+    @contextmanager
+    def task(self, task_id, **attributes):
+        """Instrument one A2A task. Set trace.root.attributes["status"] to label its outcome."""
+        trace = TaskTrace(task_id, self.sample_rate > 0 and random.random() < self.sample_rate, **attributes)
+        token = _current.set(trace)
+        metrics.tasks_in_flight.inc()
+        try:
+            yield trace
+        except BaseException:
+            trace.root.attributes["status"] = "error"
+            raise
+        finally:
+            _current.reset(token)
+            metrics.tasks_in_flight.dec()
+            for model, started, _ in trace.llm_calls.values():
+                _finish_llm_call(model, started, "error")
+            trace.root.finish()
+            metrics.task_duration.observe(
+                trace.root.end - trace.root.start,
+                intent=trace.root.attributes.get("intent", "UNCLASSIFIED"),
+                status=trace.root.attributes.get("status", "unknown"),
+            )
+            if trace.sampled:
+                self._traces.append(trace)
+                logger.debug(f"Trace for task {task_id}: {json.dumps(trace.to_dict(), default=str)}")
+
+    def recent(self):
+        return [trace.to_dict() for trace in self._traces]
+
+
+tracer = Tracer(sample_rate=config.TRACE_SAMPLE_RATE, max_traces=config.TRACE_MAX_TRACES)
+
+
+def _finish_llm_call(model, started, outcome):
+    metrics.llm_calls_in_flight.dec(model=model)
+    metrics.llm_call_duration.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+
+def trace_llm_start(callback_context, llm_request):
+    """before_model_callback: open a model turn."""
+    trace = _current.get()
+    if trace is None:
+        return None
+    model = llm_request.model or "unknown"
+    metrics.llm_calls_in_flight.inc(model=model)
+    span = trace.start("llm.turn", model=model, agent=callback_context.agent_name)
+    trace.llm_calls[callback_context.invocation_id] = (model, time.perf_counter(), span)
+    _llm_invocation.set(callback_context.invocation_id)
+    return None
+
+
+def set_llm_model(model):
+    """Relabel the model call in progress with the model actually called, e.g. the one a router picked."""
+    trace = _current.get()
+    invocation_id = _llm_invocation.get()
+    call = trace.llm_calls.get(invocation_id) if trace is not None else None
+    if call is None or call[0] == model:
+        return
+    previous, started, span = call
+    metrics.llm_calls_in_flight.dec(model=previous)
+    metrics.llm_calls_in_flight.inc(model=model)
+    trace.llm_calls[invocation_id] = (model, started, span)
+    if span is not None:
+        span.attributes["model"] = model
+
+
+def trace_llm_end(callback_context, llm_response):
+    """after_model_callback: close the model turn once its complete (non-partial) response arrives."""
+    trace = _current.get()
+    if trace is None or llm_response.partial:
+        return None
+    call = trace.llm_calls.pop(callback_context.invocation_id, None)
+    if call is None:
+        return None
+    model, started, span = call
+    outcome = "error" if llm_response.error_code else "ok"
+    _finish_llm_call(model, started, outcome)
+    usage = llm_response.usage_metadata
+    prompt_tokens = usage.prompt_token_count if usage else None
+    completion_tokens = usage.candidates_token_count if usage else None
+    if prompt_tokens:
+        metrics.llm_tokens.inc(prompt_tokens, model=model, kind="prompt")
+    if completion_tokens:
+        metrics.llm_tokens.inc(completion_tokens, model=model, kind="completion")
+    if span is not None:
+        calls = [part.function_call.name for part in (llm_response.content.parts if llm_response.content else []) if part.function_call]
+        span.finish(outcome=outcome, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, tool_calls=calls)
+    return None
+
+
+class TracedClient:
+    """Times every tool call made through the wrapped MCP client (pool, cache, ...)."""
+
+    def __init__(self, client):
+        self._client = client
+
+    async def call_tool(self, name, arguments):
+        trace = _current.get()
+        span = trace.start("mcp.call_tool", tool=name) if trace is not None else None
+        metrics.mcp_calls_in_flight.inc()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._client.call_tool(name, arguments)
+            outcome = "error" if getattr(result, "isError", False) else "ok"
+            return result
+        finally:
+            metrics.mcp_calls_in_flight.dec()
+            metrics.mcp_call_duration.observe(time.perf_counter() - started, tool=name, outcome=outcome)
+            if outcome == "ok":
+                size = len(tool_result_text(result))
+                metrics.mcp_response_bytes.inc(size, tool=name)
+            if span is not None:
+                span.finish(
+                    outcome=outcome,
+                    request_bytes=len(json.dumps(arguments, default=str)),
+                    response_bytes=size if outcome == "ok" else None,
+                )
+
+    async def list_tools(self):
+        return await self._client.list_tools()